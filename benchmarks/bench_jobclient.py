@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+"""Benchmark the JobClient hot paths against an in-process fake Cook server
+
+Every scenario is run a number of times and reports the throughput along with the p50/p99 latency of the HTTP
+requests it sent and the peak memory allocated during the runs. Results are printed as JSON so that releases can be
+compared:
+
+    python benchmarks/bench_jobclient.py --output results.json
+    python benchmarks/bench_jobclient.py --quick --scenario query
+"""
+import argparse
+import json
+import logging
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from cook import __version__
+from cook.jobclient import JobClient
+from cook.metrics import Instrumentation
+from cook.testing import FakeCookServer
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+class LatencyRecorder(Instrumentation):
+    """Records the latency of every HTTP request sent by the benchmarked clients"""
+
+    def __init__(self):
+        self.latencies = list()
+
+    def request_finished(self, method, endpoint, status, latency_secs, request_bytes, response_bytes, batch_size):
+        self.latencies.append(latency_secs)
+
+
+RECORDER = LatencyRecorder()
+
+
+def measure(name, params, fn, setup=None, repeat=5):
+    """Run fn repeatedly and collect its statistics
+
+    Latency percentiles are computed over the requests sent by the clients of client_for() during the runs.
+
+    Args:
+        name (str): Scenario name
+        params (dict): Scenario parameters
+        fn (callable): Function to benchmark, called with the result of setup and returning the number of operations
+        setup (callable or None): Function preparing the input of each run, excluded from the measures
+        repeat (int): Number of runs
+
+    Returns:
+        dict: The scenario statistics
+    """
+    durations = list()
+    latencies = list()
+    ops = 0
+    peak = 0
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        first = len(RECORDER.latencies)
+        if tracemalloc:
+            tracemalloc.start()
+        start = time.time()
+        ops += fn(arg)
+        durations.append(time.time() - start)
+        if tracemalloc:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        latencies.extend(RECORDER.latencies[first:])
+
+    result = {
+        'scenario': name,
+        'params': params,
+        'runs': repeat,
+        'requests': len(latencies),
+        'ops_per_sec': ops / sum(durations) if sum(durations) else None,
+        'mean_run_secs': sum(durations) / repeat,
+        'p50_secs': percentile(latencies, 50) if latencies else None,
+        'p99_secs': percentile(latencies, 99) if latencies else None,
+        'peak_memory_bytes': peak if tracemalloc else None
+    }
+    logging.info("%s %s: %.1f ops/s, %d requests, p50 %.4fs, p99 %.4fs", name, params, result['ops_per_sec'] or 0,
+                 len(latencies), result['p50_secs'] or 0, result['p99_secs'] or 0)
+    return result
+
+
+def make_jobs(count, env_size):
+    return [{
+        'name': "bench_{}".format(i),
+        'command': 'echo hello world',
+        'cpus': 1,
+        'mem': 128,
+        'env': dict(("VAR_{}".format(k), 'x' * 32) for k in range(env_size))
+    } for i in range(count)]
+
+
+def client_for(server, **kwargs):
+    return JobClient(url=server.url, http_user='bench', http_password='secret', instrumentation=RECORDER, **kwargs)
+
+
+def bench_submit(server, args):
+    results = list()
+    for count in args.job_counts:
+        for env_size in (0, 50):
+            with client_for(server, submit_batch_size=args.submit_batch_size,
+                            max_concurrency=args.concurrency) as client:
+                results.append(measure('submit', {'jobs': count, 'env_size': env_size},
+                                       lambda jobs: len(client.submit(jobs)),
+                                       setup=lambda: make_jobs(count, env_size), repeat=args.repeat))
+    return results
+
+
+def bench_query_delete(server, args):
+    results = list()
+    for count in args.job_counts:
+        with client_for(server, batch_request_size=None, max_concurrency=args.concurrency) as client:
+            uuids = client.submit(make_jobs(count, 0))
+
+        for batch_size in (32, None):
+            with client_for(server, batch_request_size=batch_size, max_concurrency=args.concurrency) as client:
+                params = {'jobs': count, 'batch_request_size': batch_size}
+                results.append(measure('query', params, lambda _: len(client.query(uuids)), repeat=args.repeat))
+                # every run deletes jobs of its own rather than the ones the previous run already deleted
+                results.append(measure('delete', params, lambda jobs: client.delete(jobs) or len(jobs),
+                                       setup=lambda: client.submit(make_jobs(count, 0)), repeat=args.repeat))
+    return results
+
+
+def bench_list(server, args):
+    results = list()
+    start = datetime.utcnow() - timedelta(hours=1)
+    with client_for(server, max_concurrency=args.concurrency) as client:
+        for count in args.job_counts:
+            client.submit(make_jobs(count, 0))
+            results.append(measure('list', {'jobs': count},
+                                   lambda _: len(client.list(user='bench', start_time=start)), repeat=args.repeat))
+    return results
+
+
+def bench_retry(server, args):
+    results = list()
+    for count in args.job_counts:
+        with client_for(server, max_concurrency=args.concurrency) as client:
+            uuids = client.submit(make_jobs(count, 0))
+            results.append(measure('retry', {'jobs': count}, lambda _: len(client.retry(uuids, retries=2)),
+                                   repeat=args.repeat))
+    return results
+
+
+def bench_wait(server, args):
+    results = list()
+    rng = random.Random(args.seed)
+    distributions = {
+        'uniform': lambda job: rng.uniform(0, args.max_runtime_secs),
+        'long_tail': lambda job: min(args.max_runtime_secs, rng.expovariate(4.0 / args.max_runtime_secs))
+    }
+
+    for count in args.job_counts:
+        for name, distribution in sorted(distributions.items()):
+            server.job_runtime_secs = distribution
+            with client_for(server, max_concurrency=args.concurrency, status_update_interval_secs=1,
+                            status_update_min_interval_secs=0.1) as client:
+                results.append(measure('wait', {'jobs': count, 'runtime': name},
+                                       lambda uuids: len(list(client.wait(uuids))),
+                                       setup=lambda: client.submit(make_jobs(count, 0)), repeat=args.repeat))
+            server.job_runtime_secs = 0
+    return results
+
+
+SCENARIOS = {
+    'submit': bench_submit,
+    'query': bench_query_delete,
+    'list': bench_list,
+    'retry': bench_retry,
+    'wait': bench_wait
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS.keys()),
+                        help='Scenario to run, can be repeated (default: all)')
+    parser.add_argument('--job-counts', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--submit-batch-size', type=int, default=500)
+    parser.add_argument('--latency-secs', type=float, default=0.001, help='Latency added by the fake server')
+    parser.add_argument('--max-runtime-secs', type=float, default=2, help='Longest job run time in wait scenarios')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--quick', action='store_true', help='Small job counts and a single run, for smoke tests')
+    parser.add_argument('--output', help='Write the results to this file rather than stdout')
+    args = parser.parse_args()
+
+    if args.quick:
+        args.job_counts = [10, 100]
+        args.repeat = 1
+        args.max_runtime_secs = 0.5
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format='%(message)s')
+
+    results = list()
+    with FakeCookServer(latency_secs=args.latency_secs, seed=args.seed) as server:
+        for name in args.scenario or sorted(SCENARIOS.keys()):
+            results.extend(SCENARIOS[name](server, args))
+
+    report = json.dumps({
+        'version': __version__,
+        'python': platform.python_version(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'settings': dict((k, v) for k, v in vars(args).items() if k not in ('output', 'scenario')),
+        'results': results
+    }, indent=2, sort_keys=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,663 @@
+import asyncio
+import getpass
+import logging
+import time
+from collections import deque, OrderedDict
+
+import aiohttp
+
+from .jobclient import BaseJobClient
+from .watch import JobTracker
+from .exceptions import CircuitOpenError, JobClientError, JobSubmitError
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncJobClient(BaseJobClient):
+    """asyncio flavour of JobClient
+
+    Exposes the API of JobClient, with every call being a coroutine and wait() an async generator. Requests go
+    through a non-blocking aiohttp session and at most max_concurrency of them are in flight at any time.
+
+    iter_list(), list_many(), delete_where() and get_status_poller() are built on the blocking calls of JobClient and
+    are not provided, nor are the query cache and the background health checks.
+    """
+
+    _concurrency_poll_secs = 0.01
+    """float: interval between two attempts at getting a slot from a full concurrency limit"""
+
+    def __init__(self, url, auth='http_basic', http_user=None, http_password=None, pool_size=10,
+                 max_concurrency=10, **kwargs):
+        """Initialize Cook asyncio Job Client
+
+        Args:
+            url (str or list): Cook Scheduler REST API URL, or the URLs of several instances of the same cluster
+            auth (str): Authentication method, only http_basic is supported
+            http_user (str or None): Username for HTTP basic authentication
+            http_password (str or None): Password for HTTP basic authentication
+            pool_size (int): Maximum number of HTTP connections kept open towards Cook
+            max_concurrency (int): Maximum number of requests in flight at any time
+            **kwargs: Any other JobClient setting but query_cache_size, health_check_interval_secs and pool_block
+        """
+        if auth != 'http_basic':
+            raise ValueError("Authentication type {} not supported by the asyncio client".format(auth))
+        if kwargs.pop('query_cache_size', None):
+            raise ValueError("The query cache is not supported by the asyncio client")
+        if kwargs.pop('health_check_interval_secs', None) is not None:
+            raise ValueError("Health checks are not supported by the asyncio client")
+
+        super(AsyncJobClient, self).__init__(url, auth=auth, http_user=http_user, http_password=http_password,
+                                             max_concurrency=max_concurrency, **kwargs)
+
+        self._pool_size = pool_size
+        self._aio_session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Close the HTTP connections"""
+        if self._aio_session is not None:
+            await self._aio_session.close()
+            self._aio_session = None
+
+    def _get_aio_session(self):
+        """Returns the aiohttp session, creating it on first use as it must be bound to the running event loop
+
+        Returns:
+            aiohttp.ClientSession: The session
+        """
+        if self._aio_session is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+            self._aio_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._pool_size),
+                auth=aiohttp.BasicAuth(*self._auth),
+                headers={'Content-Type': 'application/json', 'Accept': 'application/json'},
+                timeout=aiohttp.ClientTimeout(total=self._request_timeout_secs))
+        return self._aio_session
+
+    async def _api_request(self, method, query, data=None, batch_size=None):
+        """Perform a HTTP request, retrying the transient failures as JobClient does
+
+        Args:
+            method (str): HTTP method, one of get, post or delete
+            query (str): HTTP query to execute
+            data (str or None): Request body
+            batch_size (int or None): Number of jobs addressed by the request, defaults to the number of jobs in
+                                      the query
+
+        Returns:
+            bytes: The response body
+
+        Raises:
+            CircuitOpenError, aiohttp.ClientError, asyncio.TimeoutError
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            if self._circuit_breaker is not None and not self._circuit_breaker.allow():
+                raise CircuitOpenError("Cook API at {} is failing, not sending {} {}".format(
+                    self._url, method.upper(), query.split('?', 1)[0]))
+
+            retry_after = None
+            try:
+                body = await self._send(method, query, data, batch_size)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = e
+            except aiohttp.ClientResponseError as e:
+                if self._retry_policy is None or e.status not in self._retry_policy.retry_statuses:
+                    if e.status >= 500:
+                        self._record_failure()
+                    else:
+                        self._record_success()
+                    if attempt > 1 and self._is_resubmitted(method, query, e.status):
+                        return b''
+                    raise
+                error = e
+                retry_after = e.headers.get('Retry-After') if e.headers else None
+            except Exception:
+                # e.g. a broken response body, Cook may be failing and the half-open trial must be concluded
+                self._record_failure()
+                raise
+            else:
+                self._record_success()
+                return body
+
+            self._record_failure()
+
+            if self._retry_policy is None or attempt > self._retry_policy.max_retries:
+                raise error
+
+            delay = self._retry_policy.delay(attempt, retry_after)
+            logger.warning("{} {} failed ({}), retrying in {:.2f}s".format(method.upper(), query.split('?', 1)[0],
+                                                                          error, delay))
+            if self._instrumentation is not None:
+                self._instrumentation.request_retried(method.upper(), query.split('?', 1)[0], attempt)
+            await asyncio.sleep(delay)
+
+    def _is_outcome_unknown(self, error):
+        """Returns whether Cook may have processed a request despite the error, i.e. the request timed out"""
+        return isinstance(error, asyncio.TimeoutError)
+
+    async def _send(self, method, query, data, batch_size):
+        """Send a single HTTP request, failing over to the other endpoints on connection errors
+
+        Args:
+            method (str): HTTP method, one of get, post or delete
+            query (str): HTTP query to execute
+            data (str or None): Request body
+            batch_size (int or None): Number of jobs addressed by the request
+
+        Returns:
+            bytes: The response body
+        """
+        tried = set()
+        while True:
+            url = self._endpoints.select(write=method != 'get', exclude=tried)
+            try:
+                body = await self._send_to(url, method, query, data, batch_size)
+            except aiohttp.ClientResponseError as e:
+                if tried and self._is_resubmitted(method, query, e.status):
+                    return b''
+                raise
+            except aiohttp.ClientConnectionError:
+                self._endpoints.mark_failed(url)
+                tried.add(url)
+                if len(tried) >= len(self._endpoints):
+                    raise
+            else:
+                self._endpoints.mark_healthy(url)
+                return body
+
+    async def _send_to(self, url, method, query, data, batch_size):
+        """Send a single HTTP request to an endpoint, within the rate and concurrency limits
+
+        The limits are waited for without blocking the event loop, polling the concurrency limit as it may be shared
+        with threads.
+
+        Args:
+            url (str): Endpoint URL
+            method (str): HTTP method, one of get, post or delete
+            query (str): HTTP query to execute
+            data (str or None): Request body
+            batch_size (int or None): Number of jobs addressed by the request
+
+        Returns:
+            bytes: The response body
+        """
+        if self._rate_limiter is not None:
+            delay = self._rate_limiter.reserve(query.split('?', 1)[0])
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if self._concurrency_limit is None:
+            return await self._http_request(url, method, query, data, batch_size)
+
+        while not self._concurrency_limit.try_acquire():
+            await asyncio.sleep(self._concurrency_poll_secs)
+        status = None
+        start = time.time()
+        try:
+            body = await self._http_request(url, method, query, data, batch_size)
+            status = 200
+            return body
+        except aiohttp.ClientResponseError as e:
+            status = e.status
+            raise
+        finally:
+            self._concurrency_limit.release(time.time() - start, status)
+
+    async def _http_request(self, url, method, query, data, batch_size):
+        """Send a single HTTP request to an endpoint, reporting it to the instrumentation
+
+        Args:
+            url (str): Endpoint URL
+            method (str): HTTP method, one of get, post or delete
+            query (str): HTTP query to execute
+            data (str or None): Request body
+            batch_size (int or None): Number of jobs addressed by the request
+
+        Returns:
+            bytes: The response body
+        """
+        session = self._get_aio_session()
+        async with self._semaphore:
+            if self._instrumentation is None:
+                async with session.request(method.upper(), url + query, data=data) as r:
+                    r.raise_for_status()
+                    return await r.read()
+
+            endpoint = query.split('?', 1)[0]
+            status = None
+            body = b''
+            self._instrumentation.request_started(method.upper(), endpoint)
+            start = time.time()
+            try:
+                async with session.request(method.upper(), url + query, data=data) as r:
+                    status = r.status
+                    body = await r.read()
+                    r.raise_for_status()
+                    return body
+            finally:
+                self._instrumentation.request_finished(
+                    method.upper(), endpoint, status, time.time() - start, len(data) if data else 0, len(body),
+                    query.count('job=') if batch_size is None else batch_size)
+
+    async def _map_requests(self, fn, args):
+        """Run fn over every argument concurrently
+
+        Results are returned in the same order as the arguments. The first failure cancels the outstanding requests
+        and is raised to the caller.
+
+        Args:
+            fn (callable): Coroutine function performing a single request
+            args (list): Arguments to call fn with
+
+        Returns:
+            list: The results of fn
+        """
+        tasks = [asyncio.ensure_future(fn(arg)) for arg in args]
+        try:
+            return await asyncio.gather(*tasks)
+        except Exception:
+            for t in tasks:
+                t.cancel()
+            raise
+
+    async def _api_get(self, query):
+        """Perform a HTTP GET request
+
+        Args:
+            query (list or str): HTTP query to execute
+
+        Returns:
+            list: One or more response bodies
+        """
+        if not isinstance(query, list):
+            query = [query]
+
+        return await self._map_requests(lambda q: self._api_request('get', q), query)
+
+    async def _api_delete(self, query):
+        """Perform a HTTP DELETE request
+
+        Args:
+            query (list or str): HTTP query to execute
+
+        Returns:
+            list: One or more response bodies
+        """
+        if not isinstance(query, list):
+            query = [query]
+
+        return await self._map_requests(lambda q: self._api_request('delete', q), query)
+
+    async def _api_post(self, query, data):
+        """Perform a HTTP POST request
+
+        Args:
+            query (str): HTTP query to execute
+            data (dict): Data to post
+
+        Returns:
+            bytes: The response body
+        """
+        return await self._api_request('post', query, data=self._codec.dumps(data),
+                                       batch_size=len(data['jobs']) if 'jobs' in data else None)
+
+    async def delete(self, jobs):
+        """Delete one or more jobs
+
+        Args:
+            jobs (list): Jobs to delete
+
+        Raises:
+            AssertionError, JobClientError
+        """
+        assert isinstance(jobs, list), 'Jobs must be a list'
+        assert len(jobs) > 0, 'One or more jobs required'
+
+        try:
+            await self._api_delete(self._job_queries(jobs))
+        except aiohttp.ClientResponseError as e:
+            raise JobClientError(str(e))
+
+    async def query(self, jobs, partial=False):
+        """Query one or more jobs
+
+        Args:
+            jobs (list): Jobs to query
+            partial (bool): Whether to skip the unknown jobs rather than failing
+
+        Returns:
+            list: Jobs information
+
+        Raises:
+            AssertionError, JobClientError
+        """
+        assert isinstance(jobs, list), 'Jobs must be type list'
+        assert len(jobs) > 0, 'One or more jobs required'
+
+        try:
+            bodies = await self._api_get(self._job_queries(jobs, '&partial=true' if partial else ''))
+            return self._records(self._codec.loads_arrays(bodies))
+        except aiohttp.ClientResponseError as e:
+            raise JobClientError(str(e))
+
+    async def submit(self, jobs):
+        """Submit one or more jobs
+
+        Jobs are sent concurrently in chunks of submit_batch_size. When a chunk is rejected or times out a
+        JobSubmitError is raised, telling apart the jobs accepted by Cook from the ones which were not, and from the
+        ones of the chunks which timed out as Cook may have accepted them.
+
+        Args:
+            jobs (list): Jobs to submit
+
+        Returns:
+            list: The UUIDs of the submitted jobs
+
+        Raises:
+            AssertionError, JobClientError, JobSubmitError
+        """
+        assert isinstance(jobs, list), 'Jobs must be type list'
+        assert len(jobs) > 0, 'One or more jobs required'
+
+        data = self._prepare_jobs(jobs)
+
+        size = self._submit_batch_size or len(jobs)
+        chunks = [data['jobs'][i:i + size] for i in range(0, len(jobs), size)]
+        results = await asyncio.gather(*[self._api_post(self._scheduler_endpoint, {'jobs': chunk}) for chunk in chunks],
+                                       return_exceptions=True)
+
+        submitted = list()
+        failed = list()
+        unknown = list()
+        error = None
+        for chunk, result in zip(chunks, results):
+            uuids = [j['uuid'] for j in chunk]
+            if isinstance(result, Exception):
+                (unknown if self._is_outcome_unknown(result) else failed).extend(uuids)
+                if error is None:
+                    error = result
+            else:
+                submitted.extend(uuids)
+
+        if error is not None:
+            if not isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, JobClientError)):
+                raise error
+            raise JobSubmitError(str(error), submitted, failed, unknown)
+
+        return submitted
+
+    async def submit_iter(self, jobs, batch_size=None, max_batch_bytes=1048576):
+        """Submit jobs lazily consumed from an iterable or an async iterable
+
+        Batches jobs as JobClient.submit_iter() does, with up to max_concurrency batches in flight while the iterable
+        keeps being consumed. The UUIDs are yielded in submission order once their batch is accepted. The jobs of the
+        batches which timed out are reported as unknown by the JobSubmitError.
+
+        Args:
+            jobs (iterable or async iterable): Jobs to submit, e.g. a generator
+            batch_size (int or None): Maximum number of jobs per request, defaults to submit_batch_size
+            max_batch_bytes (int or None): Maximum size of a request body
+
+        Yields:
+            str: The UUID of a submitted job
+
+        Raises:
+            JobSubmitError, JobValidationError
+        """
+        batch_size = batch_size or self._submit_batch_size
+        in_flight = deque()
+        submitted = list()
+        envelope = len(b'{"jobs":[]}')
+
+        async def pull():
+            if hasattr(jobs, '__aiter__'):
+                async for job in jobs:
+                    yield job
+            else:
+                for job in jobs:
+                    yield job
+
+        async def send(uuids, pieces):
+            data = b''.join([b'{"jobs":[', b','.join(pieces), b']}'])
+            await self._api_request('post', self._scheduler_endpoint, data=data, batch_size=len(uuids))
+
+        async def drain(limit):
+            while len(in_flight) > limit:
+                uuids, task = in_flight.popleft()
+                await asyncio.wait([task])
+                if task.exception() is not None:
+                    if in_flight:
+                        await asyncio.wait([t for _, t in in_flight])
+                    failed = list()
+                    unknown = list()
+                    for u, t in [(uuids, task)] + list(in_flight):
+                        if t.exception() is None:
+                            submitted.extend(u)
+                        else:
+                            (unknown if self._is_outcome_unknown(t.exception()) else failed).extend(u)
+                    error = task.exception()
+                    if not isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, JobClientError)):
+                        raise error
+                    raise JobSubmitError(str(error), submitted, failed, unknown)
+
+                submitted.extend(uuids)
+                for u in uuids:
+                    yield u
+
+        uuids = list()
+        pieces = list()
+        size = envelope
+        async for job in pull():
+            self._prepare_job(job)
+            if self._validate_jobs:
+                self._job_schema.validate([job])
+            piece = self._codec.dumps(job)
+
+            if pieces and max_batch_bytes and size + len(piece) + 1 > max_batch_bytes:
+                in_flight.append((uuids, asyncio.ensure_future(send(uuids, pieces))))
+                async for u in drain(self._max_concurrency - 1):
+                    yield u
+                uuids, pieces, size = list(), list(), envelope
+
+            uuids.append(job['uuid'])
+            pieces.append(piece)
+            size += len(piece) + 1
+
+            if batch_size and len(pieces) >= batch_size:
+                in_flight.append((uuids, asyncio.ensure_future(send(uuids, pieces))))
+                async for u in drain(self._max_concurrency - 1):
+                    yield u
+                uuids, pieces, size = list(), list(), envelope
+
+        if pieces:
+            in_flight.append((uuids, asyncio.ensure_future(send(uuids, pieces))))
+
+        async for u in drain(0):
+            yield u
+
+    async def retry(self, jobs, retries):
+        """Retry one or more jobs
+
+        Jobs are retried concurrently in batches of batch_request_size. A rejected or unreachable batch does not stop
+        the other ones, and a batch Cook rejects as invalid is split in halves until the jobs at fault are found.
+
+        Args:
+            jobs (list): Job UUIDs
+            retries (int): Number of retries
+
+        Returns:
+            dict: None for every job successfully retried, the JobClientError otherwise, by job UUID
+
+        Raises:
+            AssertionError
+        """
+        assert isinstance(jobs, list), 'Jobs must be type list'
+        assert len(jobs) > 0, 'One or more jobs required'
+        assert retries >= 0, 'Retries must be greater than 0'
+
+        batches, queries = self._retry_queries(jobs, retries)
+
+        async def post(batch, query):
+            try:
+                await self._api_post(query, {})
+                return dict.fromkeys(batch)
+            except JobClientError as e:
+                return dict.fromkeys(batch, e)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if len(batch) > 1 and isinstance(e, aiohttp.ClientResponseError) and self._is_rejected(e.status):
+                    ret = dict()
+                    for half in self._split_batch(batch):
+                        ret.update(await post(half, self._retry_queries(half, retries)[1][0]))
+                    return ret
+                return dict.fromkeys(batch, JobClientError(str(e)))
+
+        ret = dict()
+        for errors in await self._map_requests(lambda args: post(*args), list(zip(batches, queries))):
+            ret.update(errors)
+        return ret
+
+    async def list(self, user=getpass.getuser(), state=['success', 'running', 'failed', 'completed', 'waiting'],
+                   start_time=None, stop_time=None, limit=None):
+        """List jobs run by a given user over a specific time range.
+
+        Args:
+            user (str): Username of user who ran the jobs
+            state (str or list): One or more states to query for. Valid states are 'success', 'running', 'failed',
+                                 'completed', 'waiting'.
+            start_time (datetime or None): Considers all jobs submitted after this time
+            stop_time (datetime or None): Considers all jobs submitted before this time
+            limit (int or None): Limit the number of jobs returned
+
+        Raises:
+            AssertionError, JobClientError
+        """
+        query = self._list_query(user, state, start_time, stop_time, limit)
+
+        try:
+            body = (await self._api_get(query))[0]
+            return self._records(self._codec.loads(body))
+        except aiohttp.ClientResponseError as e:
+            raise JobClientError(str(e))
+
+    async def _wait_rounds(self, jobs, timeout=None, deadlines=None):
+        """Poll the jobs which have not completed yet until they all do, or the timeout expires
+
+        Args:
+            jobs (list): List of jobs to wait for
+            timeout (float or None): Overall timeout in seconds
+            deadlines (dict or None): Timeout in seconds by job UUID
+
+        Yields:
+            list: The jobs which completed in a polling round
+        """
+        pending = OrderedDict.fromkeys(jobs)
+        intervals = self._poll_intervals()
+        start = time.time()
+
+        while pending:
+            done = list()
+            try:
+                for job in await self.query(jobs=list(pending)):
+                    if job['status'] == 'completed' and job['uuid'] in pending:
+                        del pending[job['uuid']]
+                        done.append(job)
+            except JobClientError as e:
+                logger.error(str(e))
+
+            if done:
+                yield done
+
+            delay = self._next_poll(pending, intervals, start, timeout, deadlines)
+            if delay is None:
+                break
+
+            await asyncio.sleep(delay)
+
+    async def wait(self, jobs, timeout=None, deadlines=None):
+        """Wait for jobs to complete
+
+        Args:
+            jobs (list): List of jobs to wait for
+            timeout (float or None): Stop waiting after this many seconds
+            deadlines (dict or None): Stop waiting for a given job UUID after this many seconds
+
+        Yields:
+            dict: The job information
+        """
+        async for done in self._wait_rounds(jobs, timeout=timeout, deadlines=deadlines):
+            for job in done:
+                yield job
+
+    async def wait_any(self, jobs, timeout=None):
+        """Wait for at least one job to complete
+
+        Args:
+            jobs (list): List of jobs to wait for
+            timeout (float or None): Stop waiting after this many seconds
+
+        Returns:
+            tuple: The information of the completed jobs and the set of the UUIDs not completed yet
+        """
+        done = list()
+        rounds = self._wait_rounds(jobs, timeout=timeout)
+        async for done in rounds:
+            break
+        await rounds.aclose()
+
+        return done, set(jobs) - set(job['uuid'] for job in done)
+
+    async def wait_all(self, jobs, timeout=None):
+        """Wait for all the jobs to complete
+
+        Args:
+            jobs (list): List of jobs to wait for
+            timeout (float or None): Stop waiting after this many seconds
+
+        Returns:
+            tuple: The information of the completed jobs and the set of the UUIDs not completed yet
+        """
+        done = list()
+        async for d in self._wait_rounds(jobs, timeout=timeout):
+            done.extend(d)
+
+        return done, set(jobs) - set(job['uuid'] for job in done)
+
+    async def watch(self, jobs, timeout=None):
+        """Watch jobs until they complete, yielding their changes
+
+        Args:
+            jobs (list): List of jobs to watch
+            timeout (float or None): Stop watching after this many seconds
+
+        Yields:
+            JobChange: The job UUID, its information and its changes since the previous round
+        """
+        tracker = JobTracker()
+        pending = OrderedDict.fromkeys(jobs)
+        intervals = self._poll_intervals()
+        start = time.time()
+
+        while pending:
+            try:
+                changes = self._watch_round(tracker, pending, await self.query(jobs=list(pending)))
+            except JobClientError as e:
+                logger.error(str(e))
+                changes = None
+
+            if changes:
+                intervals = self._poll_intervals()
+                for change in changes:
+                    yield change
+
+            delay = self._next_poll(pending, intervals, start, timeout, None)
+            if delay is None:
+                break
+
+            await asyncio.sleep(delay)
@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+
+from requests.auth import AuthBase
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class KerberosAuth(AuthBase):
+    """Kerberos (SPNEGO) authentication skipping the negotiation round trips
+
+    Tokens are sent preemptively rather than in response to a 401 challenge, and shared by all the threads of the
+    client:
+
+    * with token_ttl_secs, the token generated for a host is reused until it expires, sparing a GSSAPI token
+      generation per request. Servers keeping a replay cache reject reused tokens, leave it to 0 for those.
+    * with use_cookies, once the server answered an authenticated request with a session cookie, the following
+      requests only rely on the cookie, kept by the client's HTTP session, without any token. Hosts rejecting a
+      request authenticated by cookie only are always sent tokens from then on.
+
+    A request rejected with a 401 drops the cached token and cookie session of the host and is sent once more with
+    a fresh token.
+
+    Mutual authentication is required by default, as with requests_kerberos. The server is authenticated on the
+    responses to the requests carrying a freshly generated token; the responses to requests relying on a reused
+    token or on a session cookie cannot be checked against a security context of their own and are not.
+    """
+
+    def __init__(self, token_ttl_secs=0, use_cookies=True, **kwargs):
+        """Initialize the authentication
+
+        Args:
+            token_ttl_secs (float): How long a token is reused for, 0 to generate one per request
+            use_cookies (bool): Whether to rely on the session cookies set by the server once authenticated
+            **kwargs: Any requests_kerberos.HTTPKerberosAuth setting, e.g. mutual_authentication
+        """
+        from requests_kerberos import HTTPKerberosAuth, REQUIRED
+
+        self._kwargs = dict(kwargs, force_preemptive=True)
+        self._kerberos_auth = HTTPKerberosAuth
+        self._mutual_authentication = kwargs.get('mutual_authentication', REQUIRED)
+        self._token_ttl_secs = token_ttl_secs
+        self._use_cookies = use_cookies
+        self._tokens = dict()
+        self._cookie_hosts = set()
+        self._cookieless_hosts = set()
+        self._lock = threading.Lock()
+
+    def _token(self, host):
+        """Returns the token of a host, generating a new one when none is cached or the cached one expired
+
+        Returns:
+            tuple: The token, and the HTTPKerberosAuth holding the security context of a freshly generated token or
+                   None for a cached one
+        """
+        now = time.time()
+        with self._lock:
+            token, expires = self._tokens.get(host, (None, 0))
+            if token is not None and expires > now:
+                return token, None
+
+            # every token gets its own security context, so that concurrent requests authenticate their own server
+            # response, and is generated under the lock as GSSAPI credentials are not thread-safe
+            auth = self._kerberos_auth(**self._kwargs)
+            token = auth.generate_request_header(None, host, is_preemptive=True)
+            if self._token_ttl_secs > 0:
+                self._tokens[host] = (token, now + self._token_ttl_secs)
+            return token, auth
+
+    def _authenticate_server(self, r):
+        """Check the mutual authentication token of a response to a freshly generated token
+
+        Raises:
+            requests_kerberos.MutualAuthenticationError
+        """
+        from requests_kerberos import DISABLED, REQUIRED, MutualAuthenticationError
+
+        auth = getattr(r.request, 'cook_auth_context', None)
+        if auth is None or self._mutual_authentication == DISABLED:
+            return
+
+        if r.headers.get('WWW-Authenticate', '').lower().startswith('negotiate '):
+            if not auth.authenticate_server(r):
+                raise MutualAuthenticationError("Unable to authenticate {}".format(urlparse(r.url).hostname))
+        elif self._mutual_authentication == REQUIRED and r.status_code < 400:
+            raise MutualAuthenticationError("{} did not authenticate itself".format(urlparse(r.url).hostname))
+
+    def invalidate(self, host):
+        """Drop the cached token and cookie session of a host
+
+        Args:
+            host (str): Host name
+        """
+        with self._lock:
+            self._tokens.pop(host, None)
+            self._cookie_hosts.discard(host)
+
+    def __call__(self, r):
+        host = urlparse(r.url).hostname
+        with self._lock:
+            cookie_session = host in self._cookie_hosts
+
+        if not (cookie_session and 'Cookie' in r.headers):
+            r.headers['Authorization'], r.cook_auth_context = self._token(host)
+
+        r.register_hook('response', self._handle_response)
+        return r
+
+    def _handle_response(self, r, **kwargs):
+        host = urlparse(r.url).hostname
+
+        if r.status_code == 401 and not getattr(r.request, 'cook_auth_retried', False):
+            logger.debug("Authentication to {} rejected, renegotiating".format(host))
+            self.invalidate(host)
+            if 'Authorization' not in r.request.headers:
+                with self._lock:
+                    self._cookieless_hosts.add(host)
+
+            # consume the response so that its connection can be reused
+            r.content
+            r.raw.release_conn()
+
+            request = r.request.copy()
+            request.cook_auth_retried = True
+            request.headers['Authorization'], request.cook_auth_context = self._token(host)
+            response = r.connection.send(request, **kwargs)
+            response.history.append(r)
+            response.request = request
+            self._authenticate_server(response)
+            return response
+
+        self._authenticate_server(r)
+
+        if self._use_cookies and r.ok and r.cookies:
+            with self._lock:
+                if host not in self._cookieless_hosts:
+                    self._cookie_hosts.add(host)
+
+        return r
@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class JobCache(object):
+    """LRU cache of job information with in-flight request coalescing
+
+    Completed jobs do not change anymore and are kept until evicted, the other ones expire after ttl_secs. Callers
+    looking up jobs which are already being fetched by another caller wait for that request rather than sending
+    their own.
+    """
+
+    def __init__(self, max_size=10000, ttl_secs=1):
+        """Initialize the job cache
+
+        Args:
+            max_size (int): Maximum number of jobs kept in the cache
+            ttl_secs (float): Time to live of the jobs which have not completed yet
+        """
+        self._max_size = max_size
+        self._ttl_secs = ttl_secs
+        self._jobs = OrderedDict()
+        self._inflight = dict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def lookup(self, uuids):
+        """Look up jobs, claiming the ones nobody is fetching yet
+
+        Every claimed job must then be either fulfilled or failed by the caller.
+
+        Args:
+            uuids (list): Job UUIDs
+
+        Returns:
+            tuple: The cached jobs by UUID, the futures of the jobs being fetched by other callers by UUID and the
+                   list of UUIDs claimed by the caller
+        """
+        hits = dict()
+        inflight = dict()
+        claimed = list()
+        now = time.time()
+
+        with self._lock:
+            for uuid in uuids:
+                if uuid in hits or uuid in inflight:
+                    continue
+
+                entry = self._jobs.pop(uuid, None)
+                if entry is not None and (entry[1] is None or entry[1] > now):
+                    # re-insert to mark as most recently used
+                    self._jobs[uuid] = entry
+                    hits[uuid] = entry[0]
+                elif uuid in self._inflight:
+                    inflight[uuid] = self._inflight[uuid]
+                else:
+                    self._inflight[uuid] = Future()
+                    claimed.append(uuid)
+
+        return hits, inflight, claimed
+
+    def fulfill(self, claimed, jobs):
+        """Store the fetched jobs and release the claimed UUIDs
+
+        Args:
+            claimed (list): UUIDs claimed by the caller
+            jobs (list): Information of the fetched jobs
+        """
+        expires = time.time() + self._ttl_secs
+        fetched = dict()
+
+        with self._lock:
+            for job in jobs:
+                fetched[job['uuid']] = job
+                self._jobs.pop(job['uuid'], None)
+                self._jobs[job['uuid']] = (job, None if job.get('status') == 'completed' else expires)
+
+            while len(self._jobs) > self._max_size:
+                self._jobs.popitem(last=False)
+
+            futures = [(self._inflight.pop(uuid, None), fetched.get(uuid)) for uuid in claimed]
+
+        for f, job in futures:
+            if f is not None:
+                f.set_result(job)
+
+    def fail(self, claimed, error):
+        """Release the claimed UUIDs after a failed request
+
+        Args:
+            claimed (list): UUIDs claimed by the caller
+            error (Exception): Error raised to the callers waiting for these jobs
+        """
+        with self._lock:
+            futures = [self._inflight.pop(uuid, None) for uuid in claimed]
+
+        for f in futures:
+            if f is not None:
+                f.set_exception(error)
+
+    def invalidate(self, uuids):
+        """Drop jobs from the cache
+
+        Args:
+            uuids (list): Job UUIDs
+        """
+        with self._lock:
+            for uuid in uuids:
+                self._jobs.pop(uuid, None)
@@ -0,0 +1,107 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def _utf8(document):
+    """Returns a JSON document as UTF-8 bytes, the Python 2 libraries already returning byte strings"""
+    return document if isinstance(document, bytes) else document.encode('utf-8')
+
+
+class Codec(object):
+    """JSON encoder and decoder of the API payloads
+
+    Uses the fastest JSON library available among orjson and ujson, falling back to the standard library. Payloads
+    are encoded straight to UTF-8 bytes.
+    """
+
+    backends = ('orjson', 'ujson', 'json')
+    """tuple: supported backends, by order of preference"""
+
+    def __init__(self, backend=None):
+        """Initialize the codec
+
+        Args:
+            backend (str or None): One of orjson, ujson or json, defaults to the fastest one installed
+
+        Raises:
+            ValueError
+        """
+        available = {'orjson': orjson, 'ujson': ujson, 'json': json}
+        if backend is None:
+            backend = next(name for name in self.backends if available[name] is not None)
+        elif backend not in available:
+            raise ValueError("JSON backend {} not supported".format(backend))
+        elif available[backend] is None:
+            raise ValueError("JSON backend {} is not installed".format(backend))
+
+        self.name = backend
+        if backend == 'orjson':
+            self._dumps = orjson.dumps
+            self._loads = orjson.loads
+        elif backend == 'ujson':
+            self._dumps = lambda obj: _utf8(ujson.dumps(obj, ensure_ascii=False))
+            self._loads = ujson.loads
+        else:
+            self._dumps = lambda obj: _utf8(json.dumps(obj, separators=(',', ':')))
+            self._loads = lambda data: json.loads(data.decode('utf-8') if isinstance(data, bytes) else data)
+
+    def dumps(self, obj):
+        """Encode an object
+
+        Args:
+            obj: The object
+
+        Returns:
+            bytes: The UTF-8 encoded JSON document
+        """
+        return self._dumps(obj)
+
+    def loads(self, data):
+        """Decode a JSON document
+
+        Args:
+            data (bytes or str): The document
+
+        Returns:
+            The decoded object
+        """
+        return self._loads(data)
+
+    def loads_arrays(self, documents):
+        """Decode several JSON arrays into a single list
+
+        The arrays are spliced together and decoded at once, so that the parser builds the result directly rather
+        than every array being decoded then copied over.
+
+        Args:
+            documents (list): JSON arrays, as bytes
+
+        Returns:
+            list: The elements of all the arrays, in order
+        """
+        if len(documents) == 1:
+            return self._loads(documents[0])
+
+        items = list()
+        for document in documents:
+            document = document.strip()
+            if not (document.startswith(b'[') and document.endswith(b']')):
+                raise ValueError('Expected a JSON array')
+            document = document[1:-1].strip()
+            if document:
+                items.append(document)
+
+        return self._loads(b''.join([b'[', b','.join(items), b']']))
+
+
+default_codec = Codec()
+"""Codec: the codec of the fastest JSON backend available"""
@@ -0,0 +1,162 @@
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class EndpointPool(object):
+    """Set of Cook API endpoints serving the same cluster
+
+    Reads are spread round-robin over the healthy endpoints and writes go to the leader. Endpoints failing with a
+    connection error are taken out of rotation for quarantine_secs, or until a health check finds them reachable
+    again. When every endpoint is unhealthy, all of them are tried anyway.
+    """
+
+    def __init__(self, urls, quarantine_secs=30):
+        """Initialize the endpoint pool
+
+        Args:
+            urls (list): Cook API URLs
+            quarantine_secs (float): How long an endpoint which failed is left out of rotation
+        """
+        assert urls, 'At least one Cook URL is required'
+
+        self._urls = [url.rstrip('/') for url in urls]
+        self._quarantine_secs = quarantine_secs
+        self._failed = dict()
+        self._leader = None
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def __len__(self):
+        return len(self._urls)
+
+    @property
+    def urls(self):
+        """list: All the endpoints"""
+        return list(self._urls)
+
+    @property
+    def leader(self):
+        """str or None: Endpoint of the leader, None until discovered"""
+        return self._leader
+
+    def healthy(self):
+        """Returns the endpoints currently in rotation
+
+        Returns:
+            list: Endpoint URLs
+        """
+        if not self._failed:
+            return list(self._urls)
+
+        now = time.time()
+        with self._lock:
+            return [url for url in self._urls if self._failed.get(url, 0) <= now]
+
+    def select(self, write=False, exclude=()):
+        """Pick the endpoint of a request
+
+        Args:
+            write (bool): Whether the request modifies jobs and should go to the leader
+            exclude (collection): Endpoints already tried by the request
+
+        Returns:
+            str: Endpoint URL
+        """
+        candidates = [url for url in self.healthy() if url not in exclude]
+        if not candidates:
+            candidates = [url for url in self._urls if url not in exclude] or self._urls
+
+        if write:
+            leader = self._leader
+            return leader if leader in candidates else candidates[0]
+
+        return candidates[next(self._counter) % len(candidates)]
+
+    def mark_failed(self, url):
+        """Take an endpoint out of rotation
+
+        Args:
+            url (str): Endpoint URL
+        """
+        with self._lock:
+            if self._failed.get(url, 0) <= time.time():
+                logger.warning("Cook endpoint {} is unreachable, failing over".format(url))
+            self._failed[url] = time.time() + self._quarantine_secs
+
+    def mark_healthy(self, url):
+        """Put an endpoint back in rotation
+
+        Args:
+            url (str): Endpoint URL
+        """
+        if url in self._failed:
+            with self._lock:
+                self._failed.pop(url, None)
+
+    def set_leader(self, url):
+        """Record the endpoint of the leader
+
+        Args:
+            url (str or None): Leader URL as advertised by Cook, ignored when it is not one of the endpoints
+        """
+        url = url.rstrip('/') if url else None
+        self._leader = url if url in self._urls else None
+
+    def check(self, get_info):
+        """Check every endpoint once, updating their health and the leader
+
+        Args:
+            get_info (callable): Function fetching /info from an endpoint, raising on failure
+        """
+        leader = None
+        for url in self._urls:
+            try:
+                info = get_info(url)
+            except Exception as e:
+                logger.debug("Health check of {} failed: {}".format(url, e))
+                self.mark_failed(url)
+                continue
+
+            self.mark_healthy(url)
+            leader = leader or info.get('leader-url')
+
+        self.set_leader(leader)
+
+    def start(self, get_info, interval_secs):
+        """Check the endpoints from a background thread
+
+        Args:
+            get_info (callable): Function fetching /info from an endpoint, raising on failure
+            interval_secs (float): Interval between two checks
+        """
+        with self._lock:
+            assert self._thread is None, 'Health checks are already running'
+            self._thread = threading.Thread(target=self._run, args=(get_info, interval_secs),
+                                            name='cook-health-check')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """Stop the health checks"""
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+
+        self._wakeup.set()
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self, get_info, interval_secs):
+        while not self._stopped:
+            try:
+                self.check(get_info)
+            except Exception:
+                logger.exception('Cook health check failed')
+            self._wakeup.wait(interval_secs)
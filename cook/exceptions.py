@@ -1,2 +1,39 @@
+from schema import SchemaError
+
+
 class JobClientError(Exception):
     pass
+
+
+class CircuitOpenError(JobClientError):
+    pass
+
+
+class JobSubmitError(JobClientError):
+    def __init__(self, message, submitted, failed, unknown=None):
+        """Raised when only part of the chunks of a submission got accepted
+
+        Args:
+            message (str): The error message
+            submitted (list): UUIDs of the jobs accepted by Cook
+            failed (list): UUIDs of the jobs which were rejected or never sent
+            unknown (list or None): UUIDs of the jobs whose request timed out, which Cook may or may not have
+                                    accepted. Querying them tells, resubmitting them is safe as Cook rejects the
+                                    UUIDs it already knows
+        """
+        super(JobSubmitError, self).__init__(message)
+        self.submitted = submitted
+        self.failed = failed
+        self.unknown = unknown if unknown is not None else list()
+
+
+class JobValidationError(SchemaError):
+    def __init__(self, errors):
+        """Raised when one or more jobs do not pass validation
+
+        Args:
+            errors (dict): Error messages by job index
+        """
+        indexes = sorted(errors, key=lambda i: -1 if i is None else i)
+        super(JobValidationError, self).__init__(["job {}: {}".format(i, e) for i in indexes for e in errors[i]])
+        self.job_errors = errors
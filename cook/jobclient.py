@@ -1,41 +1,44 @@
 import getpass
-import json
 import logging
+import random
+import threading
 import time
-from uuid import UUID, uuid1
-from datetime import datetime
+from collections import deque, OrderedDict
+from uuid import uuid1
+from datetime import datetime, timedelta
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED, FIRST_EXCEPTION
 
 import requests
-from requests import HTTPError
-from schema import Schema, And, Or, Use, Optional
-
-from .utils import generate_batch_request
-from .exceptions import JobClientError
+from requests import ConnectionError, ConnectTimeout, HTTPError, RequestException, Timeout
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
+
+from .utils import generate_batch_queries
+from .validator import JobValidator
+from .poller import StatusPoller
+from .auth import KerberosAuth
+from .cache import JobCache
+from .codec import Codec, default_codec
+from .records import JobRecord, Projection
+from .watch import JobTracker
+from .endpoints import EndpointPool
+from .exceptions import CircuitOpenError, JobClientError, JobSubmitError
 
 logger = logging.getLogger(__name__)
 
 
-class JobClient(object):
-    _job_schema = Schema([{
-        Optional('name'): And(basestring, lambda s: len(s) > 0),
-        Optional('uuid'): And(basestring, lambda s: len(s) > 0 and UUID(s)),
-        Optional('executor'): And(basestring, lambda s: s in ('mesos', 'cook')),
-        Optional('priority'): And(Use(int), lambda n: (0 <= n <= 100)),
-        'max_retries': And(Use(int), lambda n: n > 0),
-        Optional('max_runtime'): And(Use(long), lambda n: n > 0),
-        Optional('expected_runtime'): And(Use(long), lambda n: n > 0),
-        Optional('cpus'): And(Or(int, float), lambda n: n > 0),
-        Optional('mem'): And(Or(int, float), lambda n: n > 0),
-        Optional('gpus'): And(Use(int), lambda n: n >= 0),
-        Optional('ports'): And(int, lambda n: n >= 0),
-        Optional('uris'): list,
-        Optional('env'): dict,
-        Optional('constraints'): list,
-        Optional('disable_mea_culpa_retries'): bool,
-        Optional('container'): dict,
-        Optional('command'): basestring
-    }])
-    """Schema: Validation schema for submitting jobs"""
+class BaseJobClient(object):
+    """Settings and non-blocking helpers shared by JobClient and AsyncJobClient
+
+    Builds the queries, prepares the jobs to submit and works out the polling schedule, leaving the transport of the
+    requests to the subclasses.
+    """
+
+    _job_schema = JobValidator()
+    """JobValidator: Validator of the jobs to submit"""
+
+    _status_update_backoff = 2
+    """int: factor the polling interval grows by after each polling round"""
 
     _job_states = list(['success', 'running', 'failed', 'completed', 'waiting'])
     """list: list of possible states a job can be in"""
@@ -50,20 +53,19 @@ class JobClient(object):
     _retry_endpoint = '/retry'
     """str: the API endpoint for retrying jobs"""
 
-    def __init__(self, url, auth='http_basic', http_user=None, http_password=None, batch_request_size=32,
-                 status_update_interval_secs=10, request_timeout_secs=60, default_job_settings={'max_retries': 1}):
-        """Initialize Cook Job Client
+    _info_endpoint = '/info'
+    """str: the API endpoint describing the Cook instance and its leader"""
 
-        Args:
-            url (str): Cook Scheduler REST API URL
-            auth (str): Authentication method, can be http_basic or kerberos
-            http_user (str or None): Username for HTTP basic authentication
-            http_password (str or None): Password for HTTP basic authentication
-            batch_request_size (int): Request size when performing batch requests
-            status_update_interval_secs (int): Polling interval to wait on job's status updates
-            request_timeout_secs (int): HTTP request timeout
-            default_job_settings (dict): Default parameters for submitted jobs
-        """
+    _list_default_range = timedelta(days=7)
+    """timedelta: time range listed by iter_list when no start time is given, the same as Cook's /list"""
+
+    def __init__(self, url, auth='http_basic', http_user=None, http_password=None, batch_request_size=32,
+                 status_update_interval_secs=10, request_timeout_secs=60, default_job_settings={'max_retries': 1},
+                 max_concurrency=1, submit_batch_size=None, validate_jobs=True, status_update_min_interval_secs=1,
+                 status_update_jitter=0, max_url_length=8192, instrumentation=None, retry_policy=None,
+                 circuit_breaker=None, failover_quarantine_secs=30, json_backend=None, job_records=False,
+                 job_fields=None, rate_limiter=None, concurrency_limit=None):
+        """Initialize the settings shared by the clients, see JobClient for their description"""
         self._auth = None
 
         if auth == 'http_basic':
@@ -72,26 +74,51 @@ class JobClient(object):
 
             self._auth = (http_user, http_password)
         elif auth == 'kerberos':
-            from requests_kerberos import HTTPKerberosAuth
-            self._auth = HTTPKerberosAuth()
+            self._auth = KerberosAuth()
+        elif isinstance(auth, AuthBase):
+            self._auth = auth
         else:
             raise ValueError(
                 "Authentication type {} not supported".format(auth))
 
-        self._url = url
+        urls = list(url) if isinstance(url, (list, tuple)) else [url]
+        self._endpoints = EndpointPool(urls, quarantine_secs=failover_quarantine_secs)
+        self._url = self._endpoints.urls[0]
         self._batch_request_size = batch_request_size
+        self._max_url_length = max_url_length
+        self._instrumentation = instrumentation
+        self._codec = default_codec if json_backend is None else Codec(json_backend)
+        self._job_records = job_records or job_fields is not None
+        self._projection = Projection(job_fields) if job_fields is not None else None
+        self._retry_policy = retry_policy
+        self._circuit_breaker = circuit_breaker
+        self._rate_limiter = rate_limiter
+        self._concurrency_limit = concurrency_limit
         self._status_update_interval_secs = status_update_interval_secs
+        self._status_update_min_interval_secs = min(status_update_min_interval_secs, status_update_interval_secs)
+        self._status_update_jitter = status_update_jitter
         self._request_timeout_secs = request_timeout_secs
         self._default_job_settings = default_job_settings
+        self._max_concurrency = max_concurrency
+        self._submit_batch_size = submit_batch_size
+        self._validate_jobs = validate_jobs
 
     def get_url(self):
         """Returns the Cook API URL
         
         Returns:
-            str: The URL
+            str: The URL, the first one when several endpoints are configured
         """
         return self._url
 
+    def get_endpoints(self):
+        """Returns the Cook API endpoints
+
+        Returns:
+            EndpointPool: The endpoints
+        """
+        return self._endpoints
+
     def get_auth(self):
         """Returns the authentication method
 
@@ -108,6 +135,601 @@ class JobClient(object):
         """
         return self._default_job_settings
 
+    def _is_resubmitted(self, method, query, status):
+        """Returns whether a submission was rejected because an earlier attempt got the jobs in"""
+        return status == 409 and method == 'post' and query.startswith(self._scheduler_endpoint)
+
+    def _record_success(self):
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record_success()
+
+    def _record_failure(self):
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record_failure()
+
+    def _is_rejected(self, status):
+        """Returns whether Cook rejected a request as invalid, e.g. because one of its jobs is unknown
+
+        Args:
+            status (int or None): HTTP status code
+
+        Returns:
+            bool: True for the client errors, but throttling
+        """
+        return status is not None and 400 <= status < 500 and status != 429
+
+    @staticmethod
+    def _split_batch(batch):
+        """Split a batch of jobs in halves
+
+        Args:
+            batch (list): Job UUIDs
+
+        Returns:
+            tuple: The first and the second half
+        """
+        return batch[:len(batch) // 2], batch[len(batch) // 2:]
+
+    def _batch_queries(self, endpoint, jobs, suffix=''):
+        """Pack a given list of jobs into as few queries as batch_request_size and max_url_length allow
+
+        Args:
+            endpoint (str): API endpoint
+            jobs (list): Job UUIDs
+            suffix (str): Query parameters appended to every query
+
+        Returns:
+            list: The jobs of each query along with the query itself
+        """
+        max_length = None
+        if self._max_url_length is not None:
+            max_length = self._max_url_length - max(len(url) for url in self._endpoints.urls)
+        return generate_batch_queries(endpoint + '?', jobs, self._batch_request_size, max_length, suffix)
+
+    def _job_queries(self, jobs, suffix=''):
+        """Build the scheduler queries addressing a given list of jobs
+
+        Args:
+            jobs (list): Job UUIDs
+            suffix (str): Query parameters appended to every query
+
+        Returns:
+            list: One query per batch
+        """
+        return [q for _, q in self._batch_queries(self._scheduler_endpoint, jobs, suffix)]
+
+    def _retry_queries(self, jobs, retries):
+        """Build the queries retrying a given list of jobs
+
+        Args:
+            jobs (list): Job UUIDs
+            retries (int): Number of retries
+
+        Returns:
+            tuple: The list of job batches and the list of matching queries
+        """
+        batch = self._batch_queries(self._retry_endpoint, jobs, suffix="&retries={}".format(retries))
+        return [b for b, _ in batch], [q for _, q in batch]
+
+    def _records(self, jobs):
+        """Convert decoded jobs to JobRecord objects when job_records is enabled
+
+        Args:
+            jobs (list): Decoded jobs
+
+        Returns:
+            list: The jobs, as dicts or JobRecord objects
+        """
+        if not self._job_records:
+            return jobs
+        return [JobRecord(job, self._projection) for job in jobs]
+
+    def _prepare_job(self, job):
+        """Fill in the UUID and the default settings of a job to submit
+
+        Args:
+            job (dict): Job to submit
+        """
+        # generate a random UUID if absent
+        if 'uuid' not in job:
+            job['uuid'] = str(uuid1())
+
+        # default missing fields
+        for k, v in self._default_job_settings.items():
+            job.setdefault(k, v)
+
+    def _prepare_jobs(self, jobs):
+        """Fill in the UUID and the default settings of the jobs to submit, then validate them
+
+        Args:
+            jobs (list): Jobs to submit
+
+        Returns:
+            dict: The submission payload
+
+        Raises:
+            JobValidationError
+        """
+        for j in jobs:
+            self._prepare_job(j)
+
+        if self._validate_jobs:
+            self._job_schema.validate(jobs)
+
+        return {'jobs': jobs}
+
+    def _list_query(self, user, state, start_time, stop_time, limit):
+        """Build the query listing the jobs of a given user
+
+        Args:
+            user (str): Username of user who ran the jobs
+            state (str or list): One or more states to query for
+            start_time (datetime or None): Considers all jobs submitted after this time
+            stop_time (datetime or None): Considers all jobs submitted before this time
+            limit (int or None): Limit the number of jobs returned
+
+        Returns:
+            str: The list query
+        """
+        epoch = datetime.utcfromtimestamp(0)
+        r = list(["user={}".format(user)])
+        if state:
+            r.append("state={}".format('%2B'.join(state) if isinstance(state, list) else state))
+
+        if start_time:
+            assert isinstance(start_time, datetime), "start time must be a datetime object"
+            r.append("start_ms={:d}".format(int(round((start_time - epoch).total_seconds() * 1000))))
+
+        if stop_time:
+            assert isinstance(stop_time, datetime), "stop time must be a datetime object"
+            r.append("stop_ms={:d}".format(int(round((stop_time - epoch).total_seconds() * 1000))))
+
+        if limit:
+            r.append("limit={}".format(limit))
+
+        return ''.join([self._list_endpoint, '?', '&'.join(r)])
+
+    def _poll_intervals(self):
+        """Generate the delays between polling rounds, growing from the minimum to the maximum polling interval
+
+        Yields:
+            float: Seconds to wait before the next polling round
+        """
+        interval = self._status_update_min_interval_secs
+        while True:
+            yield interval * (1 + random.uniform(-self._status_update_jitter, self._status_update_jitter))
+            interval = min(interval * self._status_update_backoff, self._status_update_interval_secs)
+
+    def _next_poll(self, pending, intervals, start, timeout, deadlines):
+        """Drop the jobs past their deadline and work out how long to sleep before the next polling round
+
+        Args:
+            pending (OrderedDict): UUIDs of the jobs still being waited for
+            intervals (generator): Polling intervals, as returned by _poll_intervals()
+            start (float): Time the wait started at
+            timeout (float or None): Overall timeout in seconds
+            deadlines (dict or None): Timeout in seconds by job UUID
+
+        Returns:
+            float or None: Seconds to sleep, None when there is nothing left to wait for
+        """
+        now = time.time()
+        delay = next(intervals)
+
+        if deadlines:
+            for uuid in [u for u in pending if u in deadlines]:
+                remaining = start + deadlines[uuid] - now
+                if remaining <= 0:
+                    del pending[uuid]
+                else:
+                    delay = min(delay, remaining)
+
+        if timeout is not None:
+            remaining = start + timeout - now
+            if remaining <= 0:
+                return None
+            delay = min(delay, remaining)
+
+        return delay if pending else None
+
+    def _watch_round(self, tracker, pending, jobs):
+        """Turn the jobs of a polling round into changes, dropping the completed jobs from the pending ones
+
+        Args:
+            tracker (JobTracker): Last known state of the jobs
+            pending (OrderedDict): UUIDs of the jobs still being watched
+            jobs (list): The jobs information
+
+        Returns:
+            list: The JobChange of the jobs which changed
+        """
+        changes = list()
+        for job in jobs:
+            if job['uuid'] not in pending:
+                continue
+            change = tracker.update(job)
+            if change is None:
+                continue
+            changes.append(change)
+            if job['status'] == 'completed':
+                del pending[job['uuid']]
+        return changes
+
+
+class JobClient(BaseJobClient):
+    def __init__(self, url, auth='http_basic', http_user=None, http_password=None, batch_request_size=32,
+                 status_update_interval_secs=10, request_timeout_secs=60, default_job_settings={'max_retries': 1},
+                 pool_size=10, pool_block=False, max_concurrency=1, submit_batch_size=None,
+                 validate_jobs=True, status_update_min_interval_secs=1, status_update_jitter=0,
+                 query_cache_size=None, query_cache_ttl_secs=1, max_url_length=8192, instrumentation=None,
+                 retry_policy=None, circuit_breaker=None, health_check_interval_secs=None, failover_quarantine_secs=30,
+                 json_backend=None, job_records=False, job_fields=None, rate_limiter=None, concurrency_limit=None):
+        """Initialize Cook Job Client
+
+        Args:
+            url (str or list): Cook Scheduler REST API URL, or the URLs of several instances of the same cluster to
+                               spread reads over them, send writes to the leader and fail over
+            auth (str or requests.auth.AuthBase): Authentication method, can be http_basic, kerberos or a custom
+                                                  requests authentication, e.g. a KerberosAuth reusing its tokens
+            http_user (str or None): Username for HTTP basic authentication
+            http_password (str or None): Password for HTTP basic authentication
+            batch_request_size (int or None): Request size when performing batch requests. The default of 32 jobs
+                                              caps batches well below max_url_length, pass None to pack batch
+                                              requests up to max_url_length only
+            status_update_interval_secs (int): Maximum polling interval to wait on job's status updates
+            request_timeout_secs (int): HTTP request timeout
+            default_job_settings (dict): Default parameters for submitted jobs
+            pool_size (int): Maximum number of persistent HTTP connections kept open towards Cook
+            pool_block (bool): Whether to block when all the pooled connections are in use rather than opening
+                               throwaway ones
+            max_concurrency (int): Maximum number of batch requests sent in parallel
+            submit_batch_size (int or None): Maximum number of jobs per submission request, None to submit all the
+                                             jobs in a single request
+            validate_jobs (bool): Whether to validate the jobs before submitting them, can be disabled for trusted
+                                  producers
+            status_update_min_interval_secs (int): Initial polling interval, doubled after every round up to
+                                                   status_update_interval_secs
+            status_update_jitter (float): Fraction of the polling interval randomly added or removed to spread the
+                                          polling of concurrent waiters
+            query_cache_size (int or None): Number of jobs kept in the query cache, None to disable caching
+            query_cache_ttl_secs (float): How long the cached information of the jobs which have not completed yet
+                                          is used for
+            max_url_length (int or None): Maximum length of the URL of batch requests
+            instrumentation (Instrumentation or None): Hooks called around every HTTP request, e.g. a
+                                                       MetricsCollector
+            retry_policy (RetryPolicy or None): Policy retrying the requests failing transiently, None to not retry
+            circuit_breaker (CircuitBreaker or None): Circuit breaker failing fast while Cook is down
+            health_check_interval_secs (float or None): Interval between the background health checks of the
+                                                        endpoints, None to disable them
+            failover_quarantine_secs (float): How long an unreachable endpoint is left out of rotation
+            json_backend (str or None): JSON library encoding and decoding the payloads, one of orjson, ujson or
+                                        json, defaults to the fastest one installed
+            job_records (bool): Whether query, list and wait return compact JobRecord objects rather than dicts
+            job_fields (list or None): Fields kept in the returned JobRecord objects, e.g. ['state',
+                                       'instances[-1].status'], None to keep them all (see Projection)
+            rate_limiter (RateLimiter or None): Token buckets limiting the requests per second by API endpoint, can be
+                                                shared by several clients
+            concurrency_limit (AdaptiveConcurrency or None): Limit of the requests in flight shrinking while Cook
+                                                             throttles or slows down, can be shared by several
+                                                             clients. max_concurrency still bounds the batch
+                                                             requests this client sends in parallel
+        """
+        super(JobClient, self).__init__(
+            url, auth=auth, http_user=http_user, http_password=http_password, batch_request_size=batch_request_size,
+            status_update_interval_secs=status_update_interval_secs, request_timeout_secs=request_timeout_secs,
+            default_job_settings=default_job_settings, max_concurrency=max_concurrency,
+            submit_batch_size=submit_batch_size, validate_jobs=validate_jobs,
+            status_update_min_interval_secs=status_update_min_interval_secs,
+            status_update_jitter=status_update_jitter, max_url_length=max_url_length,
+            instrumentation=instrumentation, retry_policy=retry_policy, circuit_breaker=circuit_breaker,
+            failover_quarantine_secs=failover_quarantine_secs, json_backend=json_backend, job_records=job_records,
+            job_fields=job_fields, rate_limiter=rate_limiter, concurrency_limit=concurrency_limit)
+
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._status_poller = None
+        self._query_cache = JobCache(query_cache_size, query_cache_ttl_secs) if query_cache_size else None
+
+        # a single session keeps connections (and their TCP/TLS state) alive across all the API calls
+        adapter = HTTPAdapter(pool_connections=len(self._endpoints.urls), pool_maxsize=pool_size,
+                              pool_block=pool_block)
+        self._session = requests.Session()
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._session.headers.update({'Content-Type': 'application/json', 'Accept': 'application/json'})
+        self._session.auth = self._auth
+
+        if health_check_interval_secs is not None:
+            self._endpoints.start(self._get_info, health_check_interval_secs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the pooled HTTP connections and stop the batch workers and the status poller"""
+        with self._executor_lock:
+            poller, self._status_poller = self._status_poller, None
+
+        # stopped outside of the lock as the poller thread may need the worker pool to finish its current round
+        if poller is not None:
+            poller.stop()
+
+        self._endpoints.stop()
+
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+        self._session.close()
+
+    def _get_executor(self):
+        """Returns the worker pool used to fan out batch requests, creating it on first use
+
+        Returns:
+            concurrent.futures.ThreadPoolExecutor: The worker pool
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_concurrency)
+            return self._executor
+
+    def get_status_poller(self):
+        """Returns the status poller shared by all the waiters of this client, creating it on first use
+
+        Returns:
+            StatusPoller: The status poller
+        """
+        with self._executor_lock:
+            if self._status_poller is None:
+                self._status_poller = StatusPoller(self, interval_secs=self._status_update_interval_secs)
+            return self._status_poller
+
+    def _run_requests(self, fn, args):
+        """Apply fn to every argument, in parallel when max_concurrency allows it, and collect the outcomes
+
+        The first failure cancels the requests which have not started yet, the ones already in flight are waited
+        for so that their outcome is known.
+
+        Args:
+            fn (callable): Function performing a single request
+            args (list): Arguments to call fn with
+
+        Returns:
+            list: One completed or cancelled future per argument, in the same order as the arguments
+        """
+        if self._max_concurrency <= 1 or len(args) <= 1:
+            futures = list()
+            for arg in args:
+                f = Future()
+                if futures and (futures[-1].cancelled() or futures[-1].exception() is not None):
+                    f.cancel()
+                else:
+                    try:
+                        f.set_result(fn(arg))
+                    except Exception as e:
+                        f.set_exception(e)
+                futures.append(f)
+            return futures
+
+        executor = self._get_executor()
+        futures = [executor.submit(fn, arg) for arg in args]
+        done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+        if not_done:
+            for f in not_done:
+                f.cancel()
+            wait(not_done)
+
+        return futures
+
+    def _map_requests(self, fn, args):
+        """Apply fn to every argument, in parallel when max_concurrency allows it
+
+        Results are returned in the same order as the arguments. The first failure cancels the requests which
+        have not started yet and is raised to the caller.
+
+        Args:
+            fn (callable): Function performing a single request
+            args (list): Arguments to call fn with
+
+        Returns:
+            list: The results of fn
+        """
+        if self._max_concurrency <= 1 or len(args) <= 1:
+            return [fn(arg) for arg in args]
+
+        futures = self._run_requests(fn, args)
+        for f in futures:
+            if not f.cancelled() and f.exception() is not None:
+                raise f.exception()
+
+        return [f.result() for f in futures]
+
+    def _get_info(self, url):
+        """Fetch the information of a Cook API endpoint, used as health check
+
+        Args:
+            url (str): Endpoint URL
+
+        Returns:
+            dict: The endpoint information, including the leader URL
+        """
+        r = self._session.get(url + self._info_endpoint, timeout=self._request_timeout_secs)
+        r.raise_for_status()
+        return self._codec.loads(r.content)
+
+    def _api_request(self, method, query, data=None, batch_size=None):
+        """Perform a HTTP request over the pooled session
+
+        Requests failing with a connection error, a timeout or one of the retry policy's status codes are retried, all
+        the Cook endpoints used being idempotent. As jobs are submitted with client generated UUIDs, a submission
+        rejected as a conflict after a failed attempt means that the failed attempt got the jobs in and counts as a
+        success.
+
+        The circuit breaker counts connection errors, timeouts, server errors (5xx) and any other error, e.g. a
+        truncated response, as failures, client errors (4xx) prove Cook is up and count as successes.
+
+        Args:
+            method (str): HTTP method, one of get, post or delete
+            query (str): HTTP query to execute
+            data (str or None): Request body
+            batch_size (int or None): Number of jobs addressed by the request, defaults to the number of jobs in
+                                      the query
+
+        Returns:
+            requests.Response: the HTTP response
+
+        Raises:
+            CircuitOpenError, requests.RequestException
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            if self._circuit_breaker is not None and not self._circuit_breaker.allow():
+                raise CircuitOpenError("Cook API at {} is failing, not sending {} {}".format(
+                    self._url, method.upper(), query.split('?', 1)[0]))
+
+            retry_after = None
+            try:
+                r = self._send(method, query, data, batch_size)
+            except (ConnectionError, Timeout) as e:
+                error = e
+            except HTTPError as e:
+                status = getattr(e.response, 'status_code', None)
+                if self._retry_policy is None or status not in self._retry_policy.retry_statuses:
+                    if status is None or status >= 500:
+                        self._record_failure()
+                    else:
+                        self._record_success()
+                    if attempt > 1 and self._is_resubmitted(method, query, status):
+                        return e.response
+                    raise
+                error = e
+                retry_after = e.response.headers.get('Retry-After')
+            except Exception:
+                # e.g. a broken response body, Cook may be failing and the half-open trial must be concluded
+                self._record_failure()
+                raise
+            else:
+                self._record_success()
+                return r
+
+            self._record_failure()
+
+            if self._retry_policy is None or attempt > self._retry_policy.max_retries:
+                raise error
+
+            delay = self._retry_policy.delay(attempt, retry_after)
+            logger.warning("{} {} failed ({}), retrying in {:.2f}s".format(method.upper(), query.split('?', 1)[0],
+                                                                          error, delay))
+            if self._instrumentation is not None:
+                self._instrumentation.request_retried(method.upper(), query.split('?', 1)[0], attempt)
+            time.sleep(delay)
+
+    def _is_outcome_unknown(self, error):
+        """Returns whether Cook may have processed a request despite the error, i.e. the response timed out"""
+        return isinstance(error, Timeout) and not isinstance(error, ConnectTimeout)
+
+    def _send(self, method, query, data, batch_size):
+        """Send a single HTTP request, failing over to the other endpoints on connection errors
+
+        Reads go to any healthy endpoint and writes to the leader.
+
+        Args:
+            method (str): HTTP method, one of get, post or delete
+            query (str): HTTP query to execute
+            data (str or None): Request body
+            batch_size (int or None): Number of jobs addressed by the request
+
+        Returns:
+            requests.Response: the HTTP response
+        """
+        tried = set()
+        while True:
+            url = self._endpoints.select(write=method != 'get', exclude=tried)
+            try:
+                r = self._send_to(url, method, query, data, batch_size)
+            except HTTPError as e:
+                if tried and self._is_resubmitted(method, query, e.response.status_code):
+                    return e.response
+                raise
+            except ConnectionError:
+                self._endpoints.mark_failed(url)
+                tried.add(url)
+                if len(tried) >= len(self._endpoints):
+                    raise
+            else:
+                self._endpoints.mark_healthy(url)
+                return r
+
+    def _send_to(self, url, method, query, data, batch_size):
+        """Send a single HTTP request to an endpoint, within the rate and concurrency limits
+
+        Args:
+            url (str): Endpoint URL
+            method (str): HTTP method, one of get, post or delete
+            query (str): HTTP query to execute
+            data (str or None): Request body
+            batch_size (int or None): Number of jobs addressed by the request
+
+        Returns:
+            requests.Response: the HTTP response
+        """
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire(query.split('?', 1)[0])
+        if self._concurrency_limit is None:
+            return self._http_request(url, method, query, data, batch_size)
+
+        self._concurrency_limit.acquire()
+        status = None
+        start = time.time()
+        try:
+            r = self._http_request(url, method, query, data, batch_size)
+            status = r.status_code
+            return r
+        except HTTPError as e:
+            status = getattr(e.response, 'status_code', None)
+            raise
+        finally:
+            self._concurrency_limit.release(time.time() - start, status)
+
+    def _http_request(self, url, method, query, data, batch_size):
+        """Send a single HTTP request to an endpoint, reporting it to the instrumentation
+
+        Args:
+            url (str): Endpoint URL
+            method (str): HTTP method, one of get, post or delete
+            query (str): HTTP query to execute
+            data (str or None): Request body
+            batch_size (int or None): Number of jobs addressed by the request
+
+        Returns:
+            requests.Response: the HTTP response
+        """
+        if self._instrumentation is None:
+            r = getattr(self._session, method)(url + query, data=data, timeout=self._request_timeout_secs)
+            r.raise_for_status()
+            return r
+
+        endpoint = query.split('?', 1)[0]
+        status = None
+        response_bytes = 0
+        self._instrumentation.request_started(method.upper(), endpoint)
+        start = time.time()
+        try:
+            r = getattr(self._session, method)(url + query, data=data, timeout=self._request_timeout_secs)
+            status = r.status_code
+            response_bytes = len(r.content)
+            r.raise_for_status()
+            return r
+        finally:
+            self._instrumentation.request_finished(
+                method.upper(), endpoint, status, time.time() - start, len(data) if data else 0, response_bytes,
+                query.count('job=') if batch_size is None else batch_size)
+
     def _api_get(self, query):
         """Perform a HTTP GET request
 
@@ -120,15 +742,7 @@ class JobClient(object):
         if not isinstance(query, list):
             query = [query]
 
-        req = list()
-        with requests.Session() as session:
-            for q in query:
-                r = session.get(self._url + q, headers={'Content-Type': 'application/json',
-                                                        'Accept': 'application/json'}, auth=self._auth,
-                                timeout=self._request_timeout_secs)
-                r.raise_for_status()
-                req.append(r)
-        return req
+        return self._map_requests(lambda q: self._api_request('get', q), query)
 
     def _api_delete(self, query):
         """Perform a HTTP DELETE request
@@ -142,14 +756,7 @@ class JobClient(object):
         if not isinstance(query, list):
             query = [query]
 
-        req = list()
-        for q in query:
-            r = requests.delete(self._url + q, headers={'Content-Type': 'application/json',
-                                                        'Accept': 'application/json'}, auth=self._auth,
-                                timeout=self._request_timeout_secs)
-            r.raise_for_status()
-            req.append(r)
-        return req
+        return self._map_requests(lambda q: self._api_request('delete', q), query)
 
     def _api_post(self, query, data):
         """Perform a HTTP POST request
@@ -161,22 +768,8 @@ class JobClient(object):
         Returns:
             requests.Response: the HTTP response
         """
-        r = requests.post(self._url + query,
-                          headers={'Content-Type': 'application/json', 'Accept': 'application/json'},
-                          auth=self._auth, data=json.dumps(data), timeout=self._request_timeout_secs)
-        r.raise_for_status()
-        return r
-
-    def _batch_request(self, jobs):
-        """Create a batch request by slicing up a given list of jobs
-
-        Args:
-            jobs (list): List of jobs
-
-        Returns:
-            list: The generated batch request
-        """
-        return generate_batch_request(jobs, self._batch_request_size)
+        return self._api_request('post', query, data=self._codec.dumps(data),
+                                 batch_size=len(data['jobs']) if 'jobs' in data else None)
 
     def delete(self, jobs):
         """Delete one or more jobs
@@ -190,25 +783,123 @@ class JobClient(object):
         assert isinstance(jobs, list), 'Jobs must be a list'
         assert len(jobs) > 0, 'One or more jobs required'
 
-        req = list()
-        if len(jobs) > 1:
-            for r in self._batch_request(jobs):
-                req.append(
-                    ''.join([self._scheduler_endpoint, '?', '&'.join(r)]))
-        else:
-            req = "{}?job={}".format(
-                self._scheduler_endpoint, jobs[0])
+        if self._query_cache is not None:
+            self._query_cache.invalidate(jobs)
+
+        req = self._job_queries(jobs)
 
         try:
             self._api_delete(req)
         except HTTPError as e:
-            raise JobClientError(e.message)
+            raise JobClientError(str(e))
+
+    def _delete_batch(self, jobs):
+        """Delete a batch of jobs, telling apart the jobs of the rejected requests
 
-    def query(self, jobs):
+        Args:
+            jobs (list): Job UUIDs
+
+        Returns:
+            dict: None for every job successfully deleted, the JobClientError otherwise, by job UUID
+        """
+        ret = dict()
+        for chunk, query in self._batch_queries(self._scheduler_endpoint, jobs):
+            try:
+                self._api_request('delete', query)
+                error = None
+            except JobClientError as e:
+                error = e
+            except RequestException as e:
+                error = JobClientError(str(e))
+            ret.update((uuid, error) for uuid in chunk)
+        return ret
+
+    def delete_where(self, user=getpass.getuser(), state=['running', 'waiting'], start_time=None, stop_time=None,
+                     predicate=None, batch_size=None, progress=None, limit=1000):
+        """Delete all the jobs of a user matching a filter
+
+        Jobs are listed like in iter_list() and deleted in batches while the listing goes on, with up to
+        max_concurrency batches in flight. A rejected batch does not stop the other ones.
+
+        Args:
+            user (str): Username of user who ran the jobs
+            state (str or list): One or more states of the jobs to delete
+            start_time (datetime or None): Considers all jobs submitted after this time, defaults to a week before
+                                           stop_time
+            stop_time (datetime or None): Considers all jobs submitted before this time, defaults to now
+            predicate (callable or None): Called with the information of every listed job, only the jobs it
+                                          returns True for are deleted
+            batch_size (int or None): Number of jobs per batch, defaults to batch_request_size
+            progress (callable or None): Called with the number of jobs listed, deleted and failed so far every time
+                                         a batch completes
+            limit (int): Maximum number of jobs listed per request
+
+        Returns:
+            dict: None for every job successfully deleted, the JobClientError otherwise, by job UUID
+
+        Raises:
+            AssertionError, JobClientError
+        """
+        batch_size = batch_size or self._batch_request_size or 100
+        outcomes = dict()
+        in_flight = set()
+        counts = {'listed': 0, 'deleted': 0, 'failed': 0}
+
+        def collect(f):
+            for uuid, error in f.result().items():
+                outcomes[uuid] = error
+                counts['deleted' if error is None else 'failed'] += 1
+            if progress is not None:
+                progress(counts['listed'], counts['deleted'], counts['failed'])
+
+        def dispatch(batch):
+            if self._query_cache is not None:
+                self._query_cache.invalidate(batch)
+
+            if self._max_concurrency <= 1:
+                f = Future()
+                f.set_result(self._delete_batch(batch))
+                collect(f)
+                return
+
+            in_flight.add(self._get_executor().submit(self._delete_batch, batch))
+            if len(in_flight) >= self._max_concurrency:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for f in done:
+                    in_flight.remove(f)
+                    collect(f)
+
+        batch = list()
+        try:
+            for job in self.iter_list(user=user, state=state, start_time=start_time, stop_time=stop_time,
+                                      limit=limit):
+                counts['listed'] += 1
+                if predicate is not None and not predicate(job):
+                    continue
+
+                batch.append(job['uuid'])
+                if len(batch) >= batch_size:
+                    dispatch(batch)
+                    batch = list()
+
+            if batch:
+                dispatch(batch)
+        finally:
+            # the batches already sent are waited for, even when listing failed
+            for f in list(in_flight):
+                collect(f)
+
+        return outcomes
+
+    def query(self, jobs, partial=False):
         """Query one or more jobs
 
+        When the query cache is enabled, cached jobs are served without hitting Cook and concurrent queries for the
+        same jobs are merged into a single request.
+
         Args:
             jobs (list): Jobs to query
+            partial (bool): Whether to skip the unknown jobs rather than failing
 
         Returns:
             list: Jobs information
@@ -219,71 +910,230 @@ class JobClient(object):
         assert isinstance(jobs, list), 'Jobs must be type list'
         assert len(jobs) > 0, 'One or more jobs required'
 
-        req = list()
-        if len(jobs) > 1:
-            for r in self._batch_request(jobs):
-                req.append(
-                    ''.join([self._scheduler_endpoint, '?', '&'.join(r)]))
-        else:
-            req = "{}?job={}".format(
-                self._scheduler_endpoint, jobs[0])
+        if self._query_cache is None:
+            return self._query(jobs, partial)
+
+        # only the jobs neither cached nor being fetched by another caller are queried
+        hits, inflight, claimed = self._query_cache.lookup(jobs)
+        if claimed:
+            try:
+                fetched = self._query(claimed, partial)
+            except Exception as e:
+                self._query_cache.fail(claimed, e)
+                raise
+            self._query_cache.fulfill(claimed, fetched)
+            hits.update((job['uuid'], job) for job in fetched)
+
+        for uuid, f in inflight.items():
+            job = f.result()
+            if job is not None:
+                hits[uuid] = job
+
+        return [hits[uuid] for uuid in jobs if uuid in hits]
+
+    def _query(self, jobs, partial=False):
+        """Query one or more jobs from Cook
+
+        Args:
+            jobs (list): Jobs to query
+            partial (bool): Whether to skip the unknown jobs rather than failing
+
+        Returns:
+            list: Jobs information
+
+        Raises:
+            JobClientError
+        """
+        req = self._job_queries(jobs, '&partial=true' if partial else '')
 
         try:
-            ret = list()
-            for resp in self._api_get(req):
-                ret.extend(resp.json())
-            return ret
+            # the batches are decoded at once into the result
+            return self._records(self._codec.loads_arrays([resp.content for resp in self._api_get(req)]))
         except HTTPError as e:
-            raise JobClientError(e.message)
+            raise JobClientError(str(e))
 
     def submit(self, jobs):
         """Submit one or more jobs
 
+        Jobs are sent in chunks of submit_batch_size, in parallel when max_concurrency allows it. When a chunk is
+        rejected or times out, the chunks which have not been sent yet are abandoned and a JobSubmitError is raised,
+        telling apart the jobs accepted by Cook from the ones which were not, and from the ones of the chunks which
+        timed out as Cook may have accepted them.
+
         Args:
             jobs (list): Jobs to submit
 
+        Returns:
+            list: The UUIDs of the submitted jobs
+
         Raises:
-            AssertionError, JobClientError
+            AssertionError, JobClientError, JobSubmitError
         """
         assert isinstance(jobs, list), 'Jobs must be type list'
         assert len(jobs) > 0, 'One or more jobs required'
 
-        data = {'jobs': jobs}
-        for j in data['jobs']:
-            # generate a random UUID if absent
-            if 'uuid' not in j:
-                j['uuid'] = str(uuid1())
+        data = self._prepare_jobs(jobs)
+
+        size = self._submit_batch_size or len(jobs)
+        chunks = [data['jobs'][i:i + size] for i in range(0, len(jobs), size)]
+        futures = self._run_requests(lambda chunk: self._api_post(self._scheduler_endpoint, {'jobs': chunk}), chunks)
+
+        submitted = list()
+        failed = list()
+        unknown = list()
+        error = None
+        for chunk, f in zip(chunks, futures):
+            uuids = [j['uuid'] for j in chunk]
+            if f.cancelled():
+                failed.extend(uuids)
+            elif f.exception() is not None:
+                (unknown if self._is_outcome_unknown(f.exception()) else failed).extend(uuids)
+                if error is None:
+                    error = f.exception()
+            else:
+                submitted.extend(uuids)
 
-            # default missing fields
-            j.update(dict(self._default_job_settings.items() + j.items()))
+        if error is not None:
+            if not isinstance(error, (RequestException, JobClientError)):
+                raise error
+            raise JobSubmitError(str(error), submitted, failed, unknown)
 
-        self._job_schema.validate(jobs)
+        return submitted
 
-        try:
-            self._api_post(self._scheduler_endpoint, data)
-            return [j['uuid'] for j in data['jobs']]
-        except HTTPError as e:
-            raise JobClientError(e.message)
+    def submit_iter(self, jobs, batch_size=None, max_batch_bytes=1048576):
+        """Submit jobs lazily consumed from an iterable
+
+        Every job is defaulted, validated and serialized as it is pulled from the iterable, then buffered until the
+        batch reaches batch_size jobs or max_batch_bytes bytes. Up to max_concurrency batches are in flight while
+        the iterable keeps being consumed. The UUIDs are yielded in submission order once their batch is accepted.
+        As in submit(), the jobs of the batches which timed out are reported as unknown by the JobSubmitError.
+
+        Args:
+            jobs (iterable): Jobs to submit, e.g. a generator
+            batch_size (int or None): Maximum number of jobs per request, defaults to submit_batch_size
+            max_batch_bytes (int or None): Maximum size of a request body
+
+        Yields:
+            str: The UUID of a submitted job
+
+        Raises:
+            JobSubmitError, JobValidationError
+        """
+        batch_size = batch_size or self._submit_batch_size
+        in_flight = deque()
+        submitted = list()
+        envelope = len(b'{"jobs":[]}')
+
+        def send(uuids, pieces):
+            data = b''.join([b'{"jobs":[', b','.join(pieces), b']}'])
+            self._api_request('post', self._scheduler_endpoint, data=data, batch_size=len(uuids))
+            return uuids
+
+        def dispatch(uuids, pieces):
+            if self._max_concurrency <= 1:
+                f = Future()
+                try:
+                    f.set_result(send(uuids, pieces))
+                except Exception as e:
+                    f.set_exception(e)
+            else:
+                f = self._get_executor().submit(send, uuids, pieces)
+            in_flight.append((uuids, f))
+
+        def drain(limit):
+            while len(in_flight) > limit:
+                uuids, f = in_flight.popleft()
+                if f.exception() is not None:
+                    failed = list()
+                    unknown = list()
+                    for u, p in [(uuids, f)] + list(in_flight):
+                        if p.exception() is None:
+                            submitted.extend(u)
+                        else:
+                            (unknown if self._is_outcome_unknown(p.exception()) else failed).extend(u)
+                    if not isinstance(f.exception(), (RequestException, JobClientError)):
+                        raise f.exception()
+                    raise JobSubmitError(str(f.exception()), submitted, failed, unknown)
+
+                submitted.extend(uuids)
+                for u in uuids:
+                    yield u
+
+        uuids = list()
+        pieces = list()
+        size = envelope
+        for job in jobs:
+            self._prepare_job(job)
+            if self._validate_jobs:
+                self._job_schema.validate([job])
+            piece = self._codec.dumps(job)
+
+            if pieces and max_batch_bytes and size + len(piece) + 1 > max_batch_bytes:
+                dispatch(uuids, pieces)
+                for u in drain(self._max_concurrency - 1):
+                    yield u
+                uuids, pieces, size = list(), list(), envelope
+
+            uuids.append(job['uuid'])
+            pieces.append(piece)
+            size += len(piece) + 1
+
+            if batch_size and len(pieces) >= batch_size:
+                dispatch(uuids, pieces)
+                for u in drain(self._max_concurrency - 1):
+                    yield u
+                uuids, pieces, size = list(), list(), envelope
+
+        if pieces:
+            dispatch(uuids, pieces)
+
+        for u in drain(0):
+            yield u
 
     def retry(self, jobs, retries):
-        """Retry a job
+        """Retry one or more jobs
+
+        Jobs are retried in batches of batch_request_size, in parallel when max_concurrency allows it. A rejected or
+        unreachable batch does not stop the other ones, and a batch Cook rejects as invalid is split in halves until
+        the jobs at fault are found.
 
         Args:
             jobs (list): Job UUIDs
             retries (int): Number of retries
 
+        Returns:
+            dict: None for every job successfully retried, the JobClientError otherwise, by job UUID
+
         Raises:
-            JobClientError
+            AssertionError
         """
         assert isinstance(jobs, list), 'Jobs must be type list'
         assert len(jobs) > 0, 'One or more jobs required'
         assert retries >= 0, 'Retries must be greater than 0'
 
-        try:
-            for job in jobs:
-                self._api_post("{}?job={}&retries={}".format(self._retry_endpoint, job, retries), {})
-        except HTTPError as e:
-            raise JobClientError(e.message)
+        if self._query_cache is not None:
+            self._query_cache.invalidate(jobs)
+
+        batches, queries = self._retry_queries(jobs, retries)
+
+        def post(batch, query):
+            try:
+                self._api_post(query, {})
+                return dict.fromkeys(batch)
+            except JobClientError as e:
+                return dict.fromkeys(batch, e)
+            except RequestException as e:
+                if len(batch) > 1 and self._is_rejected(getattr(e.response, 'status_code', None)):
+                    ret = dict()
+                    for half in self._split_batch(batch):
+                        ret.update(post(half, self._retry_queries(half, retries)[1][0]))
+                    return ret
+                return dict.fromkeys(batch, JobClientError(str(e)))
+
+        ret = dict()
+        for errors in self._map_requests(lambda args: post(*args), list(zip(batches, queries))):
+            ret.update(errors)
+        return ret
 
     def list(self, user=getpass.getuser(), state=['success', 'running', 'failed', 'completed', 'waiting'],
              start_time=None, stop_time=None,
@@ -301,46 +1151,277 @@ class JobClient(object):
         Raises:
             AssertionError, JobClientError
         """
-        r = list(["user={}".format(user)])
-        if state:
-            r.append("state={}".format('%2B'.join(state) if isinstance(state, list) else state))
+        query = self._list_query(user, state, start_time, stop_time, limit)
 
-        if start_time:
+        try:
+            resp = self._api_get(query)[0]
+            return self._records(self._codec.loads(resp.content))
+        except HTTPError as e:
+            raise JobClientError(str(e))
+
+    def iter_list(self, user=getpass.getuser(), state=['success', 'running', 'failed', 'completed', 'waiting'],
+                  start_time=None, stop_time=None, limit=1000, window=timedelta(hours=1),
+                  min_window=timedelta(seconds=1)):
+        """Lazily list the jobs run by a given user over a time range of any size
+
+        The time range is walked through in windows of at most limit jobs. A window returning limit jobs is split in
+        half and listed again, a window returning few jobs makes the next one twice as large. Jobs falling on the
+        boundary of two windows are only yielded once.
+
+        Args:
+            user (str): Username of user who ran the jobs
+            state (str or list): One or more states to query for. Valid states are 'success', 'running', 'failed',
+                                 'completed', 'waiting'.
+            start_time (datetime or None): Considers all jobs submitted after this time, defaults to a week before
+                                           stop_time
+            stop_time (datetime or None): Considers all jobs submitted before this time, defaults to now
+            limit (int): Maximum number of jobs listed per request
+            window (timedelta): Initial time window listed per request
+            min_window (timedelta): Smallest time window, listed even when it holds more than limit jobs
+
+        Yields:
+            dict: The job information
+
+        Raises:
+            AssertionError, JobClientError
+        """
+        assert limit > 0, 'Limit must be greater than 0'
+
+        if stop_time is None:
+            stop_time = datetime.utcnow()
+        if start_time is None:
+            start_time = stop_time - self._list_default_range
+        assert isinstance(start_time, datetime), "start time must be a datetime object"
+
+        previous = set()
+        while start_time < stop_time:
+            end_time = min(start_time + window, stop_time)
+            jobs = self.list(user=user, state=state, start_time=start_time, stop_time=end_time, limit=limit)
+
+            if len(jobs) >= limit:
+                if end_time - start_time > min_window:
+                    window = max((end_time - start_time) // 2, min_window)
+                    continue
+                logger.warning("More than {} jobs submitted between {} and {}, some may be missing".format(
+                    limit, start_time, end_time))
+            elif len(jobs) < limit // 4:
+                window *= 2
+
+            current = set()
+            for job in jobs:
+                current.add(job['uuid'])
+                if job['uuid'] not in previous:
+                    yield job
+
+            previous = current
+            start_time = end_time
+
+    def list_many(self, users, state=['success', 'running', 'failed', 'completed', 'waiting'], start_time=None,
+                  stop_time=None, limit=None, shards=1):
+        """List the jobs of many users, in parallel when max_concurrency allows it
+
+        One request is sent per user and time shard, with at most max_concurrency of them in flight. Jobs are yielded
+        as soon as their request completes, each job only once.
+
+        Args:
+            users (list): Usernames of the users who ran the jobs
+            state (str or list): One or more states to query for. Valid states are 'success', 'running', 'failed',
+                                 'completed', 'waiting'.
+            start_time (datetime or None): Considers all jobs submitted after this time
+            stop_time (datetime or None): Considers all jobs submitted before this time, defaults to now when
+                                          sharding
+            limit (int or None): Limit the number of jobs returned per user and shard
+            shards (int): Number of equal time shards the range is split into
+
+        Yields:
+            dict: The job information
+
+        Raises:
+            AssertionError, JobClientError
+        """
+        assert isinstance(users, list), 'Users must be type list'
+        assert shards >= 1, 'Shards must be greater than 0'
+
+        ranges = [(start_time, stop_time)]
+        if shards > 1:
             assert isinstance(start_time, datetime), "start time must be a datetime object"
-            r.append("start_ms={}".format((start_time - datetime.utcfromtimestamp(0)).total_seconds() * 1000.0))
+            if stop_time is None:
+                stop_time = datetime.utcnow()
+            step = (stop_time - start_time) // shards
+            ranges = [(start_time + step * i, stop_time if i == shards - 1 else start_time + step * (i + 1))
+                      for i in range(shards)]
 
-        if stop_time:
-            assert isinstance(stop_time, datetime), "stop time must be a datetime object"
-            r.append("stop_ms={}".format((stop_time - datetime.utcfromtimestamp(0)).total_seconds() * 1000.0))
+        tasks = iter([(user, r) for user in users for r in ranges])
 
-        if limit:
-            r.append("limit={}".format(limit))
+        def fetch(task):
+            user, (start, stop) = task
+            return self.list(user=user, state=state, start_time=start, stop_time=stop, limit=limit)
+
+        seen = set()
+        if self._max_concurrency <= 1:
+            results = (fetch(task) for task in tasks)
+        else:
+            results = self._stream_requests(fetch, tasks)
+
+        for jobs in results:
+            for job in jobs:
+                if job['uuid'] not in seen:
+                    seen.add(job['uuid'])
+                    yield job
+
+    def _stream_requests(self, fn, args):
+        """Apply fn to the arguments over the worker pool, with at most max_concurrency requests in flight
+
+        Args:
+            fn (callable): Function performing a single request
+            args (iterator): Arguments to call fn with
 
+        Yields:
+            object: The results of fn, in completion order
+        """
+        executor = self._get_executor()
+        pending = set()
         try:
-            resp = self._api_get(''.join([self._list_endpoint, '?', '&'.join(r)]))[0]
-            return resp.json()
-        except HTTPError as e:
-            raise JobClientError(e.message)
+            for arg in args:
+                pending.add(executor.submit(fn, arg))
+                if len(pending) < self._max_concurrency:
+                    continue
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    yield f.result()
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    yield f.result()
+        finally:
+            for f in pending:
+                f.cancel()
+
+    def _wait_rounds(self, jobs, timeout=None, deadlines=None, stop=None):
+        """Poll the jobs which have not completed yet until they all do, or the timeout expires
+
+        Args:
+            jobs (list): List of jobs to wait for
+            timeout (float or None): Overall timeout in seconds
+            deadlines (dict or None): Timeout in seconds by job UUID
+            stop (threading.Event or None): Event interrupting the wait when set
+
+        Yields:
+            list: The jobs which completed in a polling round
+        """
+        pending = OrderedDict.fromkeys(jobs)
+        intervals = self._poll_intervals()
+        start = time.time()
+
+        while pending and not (stop is not None and stop.is_set()):
+            done = list()
+            try:
+                for job in self.query(jobs=list(pending)):
+                    if job['status'] == 'completed' and job['uuid'] in pending:
+                        del pending[job['uuid']]
+                        done.append(job)
+            except JobClientError as e:
+                logger.error(str(e))
 
-    def wait(self, jobs):
+            if done:
+                yield done
+
+            delay = self._next_poll(pending, intervals, start, timeout, deadlines)
+            if delay is None:
+                break
+
+            if stop is None:
+                time.sleep(delay)
+            elif stop.wait(delay):
+                break
+
+    def wait(self, jobs, timeout=None, deadlines=None, stop=None):
         """Wait for jobs to complete
 
+        Only the jobs which have not completed yet are polled, starting every status_update_min_interval_secs and
+        slowing down up to status_update_interval_secs for long running jobs.
+
         Args:
             jobs (list): List of jobs to wait for
+            timeout (float or None): Stop waiting after this many seconds
+            deadlines (dict or None): Stop waiting for a given job UUID after this many seconds
+            stop (threading.Event or None): Event stopping the wait when set, e.g. by another thread, without
+                                            waiting for the current polling interval to elapse
 
         Yields:
             dict: The job information
         """
-        while True:
+        for done in self._wait_rounds(jobs, timeout=timeout, deadlines=deadlines, stop=stop):
+            for job in done:
+                yield job
+
+    def wait_any(self, jobs, timeout=None):
+        """Wait for at least one job to complete
+
+        Args:
+            jobs (list): List of jobs to wait for
+            timeout (float or None): Stop waiting after this many seconds
+
+        Returns:
+            tuple: The information of the completed jobs and the set of the UUIDs not completed yet
+        """
+        done = list()
+        for done in self._wait_rounds(jobs, timeout=timeout):
+            break
+
+        return done, set(jobs) - set(job['uuid'] for job in done)
+
+    def wait_all(self, jobs, timeout=None):
+        """Wait for all the jobs to complete
+
+        Args:
+            jobs (list): List of jobs to wait for
+            timeout (float or None): Stop waiting after this many seconds
+
+        Returns:
+            tuple: The information of the completed jobs and the set of the UUIDs not completed yet
+        """
+        done = list()
+        for d in self._wait_rounds(jobs, timeout=timeout):
+            done.extend(d)
+
+        return done, set(jobs) - set(job['uuid'] for job in done)
+
+    def watch(self, jobs, timeout=None):
+        """Watch jobs until they complete, yielding their changes
+
+        The jobs are polled like in wait(), the polling interval going back to status_update_min_interval_secs
+        whenever a job changes. Jobs which did not change since the previous round are not reported.
+
+        Args:
+            jobs (list): List of jobs to watch
+            timeout (float or None): Stop watching after this many seconds
+
+        Yields:
+            JobChange: The job UUID, its information and its changes since the previous round, every field being
+                       reported as changed the first time a job is seen
+        """
+        tracker = JobTracker()
+        pending = OrderedDict.fromkeys(jobs)
+        intervals = self._poll_intervals()
+        start = time.time()
+
+        while pending:
             try:
-                for job in self.query(jobs=jobs):
-                    if job['status'] == 'completed':
-                        jobs.remove(job['uuid'])
-                        yield (job)
+                changes = self._watch_round(tracker, pending, self.query(jobs=list(pending)))
             except JobClientError as e:
-                logger.error(e.message)
+                logger.error(str(e))
+                changes = None
 
-            if len(jobs) > 0:
-                time.sleep(self._status_update_interval_secs)
-            else:
+            if changes:
+                intervals = self._poll_intervals()
+                for change in changes:
+                    yield change
+
+            delay = self._next_poll(pending, intervals, start, timeout, None)
+            if delay is None:
                 break
+
+            time.sleep(delay)
@@ -0,0 +1,251 @@
+import bisect
+import logging
+import threading
+
+
+class Instrumentation(object):
+    """Hooks called by JobClient around every HTTP request
+
+    Every hook is a no-op, subclasses override the ones they need. Hooks are called from the threads performing the
+    requests and must be thread-safe.
+    """
+
+    def request_started(self, method, endpoint):
+        """Called before a request is sent
+
+        Args:
+            method (str): HTTP method
+            endpoint (str): API endpoint, e.g. /rawscheduler
+        """
+        pass
+
+    def request_finished(self, method, endpoint, status, latency_secs, request_bytes, response_bytes, batch_size):
+        """Called once a request completed, successfully or not
+
+        Args:
+            method (str): HTTP method
+            endpoint (str): API endpoint, e.g. /rawscheduler
+            status (int or None): HTTP status code, None when no response was received
+            latency_secs (float): Time taken by the request
+            request_bytes (int): Size of the request body
+            response_bytes (int): Size of the response body
+            batch_size (int): Number of jobs addressed by the request
+        """
+        pass
+
+    def request_retried(self, method, endpoint, attempt):
+        """Called before a failed request is retried
+
+        Args:
+            method (str): HTTP method
+            endpoint (str): API endpoint, e.g. /rawscheduler
+            attempt (int): Number of attempts made so far
+        """
+        pass
+
+
+class Histogram(object):
+    """Cumulative histogram with fixed bucket upper bounds"""
+
+    def __init__(self, buckets):
+        """Initialize the histogram
+
+        Args:
+            buckets (list): Sorted bucket upper bounds
+        """
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        """Record a value
+
+        Args:
+            value (float): The value
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Returns the cumulative counts
+
+        Returns:
+            list: Pairs of bucket upper bound (float('inf') for the last one) and count of values below it
+        """
+        ret = list()
+        total = 0
+        for bound, count in zip(self.buckets + [float('inf')], self.counts):
+            total += count
+            ret.append((bound, total))
+        return ret
+
+
+class MetricsCollector(Instrumentation):
+    """Instrumentation aggregating request metrics by HTTP method and endpoint
+
+    Records latency, request size, response size and batch size histograms, HTTP status counts and the number of
+    requests in flight.
+    """
+
+    _latency_buckets = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+    """list: latency histogram buckets, in seconds"""
+
+    _size_buckets = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304]
+    """list: request and response size histogram buckets, in bytes"""
+
+    _batch_buckets = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+    """list: batch size histogram buckets, in jobs"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = dict()
+        self._in_flight = 0
+        self._max_in_flight = 0
+
+    def _get_series(self, method, endpoint):
+        key = (method, endpoint)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = {
+                'latency_secs': Histogram(self._latency_buckets),
+                'request_bytes': Histogram(self._size_buckets),
+                'response_bytes': Histogram(self._size_buckets),
+                'batch_size': Histogram(self._batch_buckets),
+                'status': dict(),
+                'retries': 0
+            }
+        return series
+
+    def request_started(self, method, endpoint):
+        with self._lock:
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+
+    def request_finished(self, method, endpoint, status, latency_secs, request_bytes, response_bytes, batch_size):
+        with self._lock:
+            self._in_flight -= 1
+
+            series = self._get_series(method, endpoint)
+            series['latency_secs'].observe(latency_secs)
+            series['request_bytes'].observe(request_bytes)
+            series['response_bytes'].observe(response_bytes)
+            series['batch_size'].observe(batch_size)
+
+            status = 'error' if status is None else str(status)
+            series['status'][status] = series['status'].get(status, 0) + 1
+
+    def request_retried(self, method, endpoint, attempt):
+        with self._lock:
+            self._get_series(method, endpoint)['retries'] += 1
+
+    def snapshot(self):
+        """Returns a copy of the metrics collected so far
+
+        Returns:
+            dict: The number of requests in flight, the highest number of requests in flight and the metrics by
+                  (method, endpoint)
+        """
+        with self._lock:
+            series = dict()
+            for key, s in self._series.items():
+                series[key] = {
+                    'status': dict(s['status']),
+                    'retries': s['retries']
+                }
+                for name in ('latency_secs', 'request_bytes', 'response_bytes', 'batch_size'):
+                    series[key][name] = {
+                        'count': s[name].count,
+                        'sum': s[name].sum,
+                        'buckets': s[name].cumulative()
+                    }
+
+            return {
+                'in_flight': self._in_flight,
+                'max_in_flight': self._max_in_flight,
+                'series': series
+            }
+
+
+class PrometheusExporter(object):
+    """Render the metrics of a MetricsCollector in the Prometheus text exposition format"""
+
+    def __init__(self, collector, prefix='cook_jobclient'):
+        """Initialize the exporter
+
+        Args:
+            collector (MetricsCollector): The metrics
+            prefix (str): Prefix of the metric names
+        """
+        self._collector = collector
+        self._prefix = prefix
+
+    def render(self):
+        """Render the metrics
+
+        Returns:
+            str: The metrics in text format
+        """
+        snapshot = self._collector.snapshot()
+        p = self._prefix
+        lines = list()
+
+        lines.append("# TYPE {}_requests_in_flight gauge".format(p))
+        lines.append("{}_requests_in_flight {}".format(p, snapshot['in_flight']))
+
+        lines.append("# TYPE {}_requests_total counter".format(p))
+        for (method, endpoint), s in sorted(snapshot['series'].items()):
+            for status, count in sorted(s['status'].items()):
+                lines.append('{}_requests_total{{method="{}",endpoint="{}",status="{}"}} {}'.format(
+                    p, method, endpoint, status, count))
+
+        lines.append("# TYPE {}_request_retries_total counter".format(p))
+        for (method, endpoint), s in sorted(snapshot['series'].items()):
+            lines.append('{}_request_retries_total{{method="{}",endpoint="{}"}} {}'.format(
+                p, method, endpoint, s['retries']))
+
+        for name in ('latency_secs', 'request_bytes', 'response_bytes', 'batch_size'):
+            metric = "{}_request_{}".format(p, name)
+            lines.append("# TYPE {} histogram".format(metric))
+            for (method, endpoint), s in sorted(snapshot['series'].items()):
+                labels = 'method="{}",endpoint="{}"'.format(method, endpoint)
+                for bound, count in s[name]['buckets']:
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append('{}_bucket{{{},le="{}"}} {}'.format(metric, labels, le, count))
+                lines.append('{}_sum{{{}}} {}'.format(metric, labels, s[name]['sum']))
+                lines.append('{}_count{{{}}} {}'.format(metric, labels, s[name]['count']))
+
+        return '\n'.join(lines) + '\n'
+
+
+class LoggingExporter(object):
+    """Log a summary of the metrics of a MetricsCollector, one line per HTTP method and endpoint"""
+
+    def __init__(self, collector, logger=None, level=logging.INFO):
+        """Initialize the exporter
+
+        Args:
+            collector (MetricsCollector): The metrics
+            logger (logging.Logger or None): Logger to write to, defaults to this module's logger
+            level (int): Logging level
+        """
+        self._collector = collector
+        self._logger = logger or logging.getLogger(__name__)
+        self._level = level
+
+    def export(self):
+        """Log the metrics"""
+        snapshot = self._collector.snapshot()
+        for (method, endpoint), s in sorted(snapshot['series'].items()):
+            latency = s['latency_secs']
+            self._logger.log(
+                self._level,
+                "%s %s: %d requests, %d retries, %.3fs avg latency, %d bytes sent, %d bytes received, "
+                "%.1f avg batch size, statuses %s", method, endpoint, latency['count'], s['retries'],
+                latency['sum'] / max(latency['count'], 1),
+                s['request_bytes']['sum'], s['response_bytes']['sum'],
+                s['batch_size']['sum'] / float(max(s['batch_size']['count'], 1)),
+                ', '.join("{}={}".format(k, v) for k, v in sorted(s['status'].items())))
+        self._logger.log(self._level, "%d requests in flight, %d at most", snapshot['in_flight'],
+                         snapshot['max_in_flight'])
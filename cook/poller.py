@@ -0,0 +1,150 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from .exceptions import JobClientError
+
+logger = logging.getLogger(__name__)
+
+
+class StatusPoller(object):
+    """Single polling loop tracking the jobs of many waiters
+
+    Every caller registering a job gets its own future, resolved with the job information once the job completes or
+    failed with a JobClientError when Cook does not know the job. All the registered jobs are queried together by
+    one background thread, so overlapping waiters do not multiply the load on Cook, and a job stops being polled
+    once all of its waiters have cancelled their futures.
+
+    Example:
+        >>> futures = client.get_status_poller().register(uuids)
+        >>> concurrent.futures.wait(futures, timeout=3600)
+    """
+
+    def __init__(self, client, interval_secs=10):
+        """Initialize the status poller
+
+        Args:
+            client (JobClient): Client used to query the jobs
+            interval_secs (float): Polling interval
+        """
+        self._client = client
+        self._interval_secs = interval_secs
+        self._waiters = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def register(self, jobs, callback=None):
+        """Track one or more jobs until they complete
+
+        Args:
+            jobs (list): Job UUIDs
+            callback (callable or None): Called with the job information when a job completes
+
+        Returns:
+            list: One future per job, resolved with the job information on completion
+        """
+        assert isinstance(jobs, list), 'Jobs must be type list'
+
+        ret = list()
+        with self._lock:
+            assert not self._stopped, 'Status poller is stopped'
+
+            for uuid in jobs:
+                f = Future()
+                self._waiters.setdefault(uuid, list()).append(f)
+                ret.append(f)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='cook-status-poller')
+                self._thread.daemon = True
+                self._thread.start()
+
+        if callback is not None:
+            def done(f):
+                if not f.cancelled():
+                    callback(f.result())
+
+            for f in ret:
+                f.add_done_callback(done)
+
+        return ret
+
+    def pending(self):
+        """Returns the jobs being tracked
+
+        Returns:
+            list: Job UUIDs
+        """
+        with self._lock:
+            return list(self._waiters.keys())
+
+    def stop(self):
+        """Stop polling and cancel the futures of the jobs still pending"""
+        with self._lock:
+            self._stopped = True
+            futures = [f for waiters in self._waiters.values() for f in waiters]
+            self._waiters.clear()
+            thread = self._thread
+
+        self._wakeup.set()
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join()
+
+        for f in futures:
+            f.cancel()
+
+    def poll(self):
+        """Query all the tracked jobs once and resolve the futures of the completed and unknown ones"""
+        with self._lock:
+            # jobs whose waiters all cancelled their futures are not polled anymore
+            for uuid in list(self._waiters):
+                self._waiters[uuid] = [f for f in self._waiters[uuid] if not f.cancelled()]
+                if not self._waiters[uuid]:
+                    del self._waiters[uuid]
+            uuids = list(self._waiters.keys())
+
+        if not uuids:
+            return
+
+        try:
+            jobs = self._client.query(uuids, partial=True)
+        except JobClientError as e:
+            logger.error(str(e))
+            return
+
+        found = set()
+        for job in jobs:
+            found.add(job['uuid'])
+            if job['status'] == 'completed':
+                self._resolve(job['uuid'], lambda f: f.set_result(job))
+
+        for uuid in uuids:
+            if uuid not in found:
+                error = JobClientError("UUID {} didn't correspond to a job".format(uuid))
+                self._resolve(uuid, lambda f: f.set_exception(error))
+
+    def _resolve(self, uuid, resolve):
+        """Stop tracking a job and resolve the futures of its waiters
+
+        Args:
+            uuid (str): Job UUID
+            resolve (callable): Called with every future which has not been cancelled
+        """
+        with self._lock:
+            waiters = self._waiters.pop(uuid, list())
+
+        for f in waiters:
+            if f.set_running_or_notify_cancel():
+                resolve(f)
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.clear()
+            try:
+                self.poll()
+            except Exception:
+                logger.exception('Status poller failed to poll jobs')
+            self._wakeup.wait(self._interval_secs)
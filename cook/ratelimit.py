@@ -0,0 +1,182 @@
+import threading
+import time
+
+
+class TokenBucket(object):
+    """Token bucket allowing rate requests per second on average, and bursts of up to burst requests"""
+
+    def __init__(self, rate, burst=None):
+        """Initialize the token bucket
+
+        Args:
+            rate (float): Tokens added per second
+            burst (float or None): Capacity of the bucket, defaults to one second worth of tokens
+        """
+        assert rate > 0, 'Rate must be greater than 0'
+
+        self._rate = float(rate)
+        self._burst = float(burst if burst is not None else max(rate, 1))
+        self._tokens = self._burst
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """Take tokens from the bucket, going into debt when there are not enough of them
+
+        Args:
+            tokens (float): Number of tokens
+
+        Returns:
+            float: Seconds to wait before the tokens are actually available
+        """
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self._burst, self._tokens + max(0, now - self._updated) * self._rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0, -self._tokens / self._rate)
+
+    def acquire(self, tokens=1):
+        """Take tokens from the bucket, waiting for them to be available
+
+        Args:
+            tokens (float): Number of tokens
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class RateLimiter(object):
+    """Token buckets by API endpoint, shareable by several clients
+
+    Example:
+        >>> limiter = RateLimiter({'/rawscheduler': 20, '/list': (2, 5), '/retry': 5})
+        >>> client = JobClient(url, rate_limiter=limiter)
+    """
+
+    def __init__(self, rates):
+        """Initialize the rate limiter
+
+        Args:
+            rates (dict): Requests per second, (requests per second, burst) tuple or TokenBucket by endpoint.
+                          Endpoints absent from it are not limited.
+        """
+        self._buckets = dict()
+        for endpoint, rate in rates.items():
+            if isinstance(rate, TokenBucket):
+                self._buckets[endpoint] = rate
+            elif isinstance(rate, tuple):
+                self._buckets[endpoint] = TokenBucket(*rate)
+            else:
+                self._buckets[endpoint] = TokenBucket(rate)
+
+    def reserve(self, endpoint):
+        """Reserve a request to an endpoint
+
+        Args:
+            endpoint (str): API endpoint, e.g. /rawscheduler
+
+        Returns:
+            float: Seconds to wait before sending the request
+        """
+        bucket = self._buckets.get(endpoint)
+        return bucket.reserve() if bucket is not None else 0
+
+    def acquire(self, endpoint):
+        """Wait until a request to an endpoint may be sent
+
+        Args:
+            endpoint (str): API endpoint, e.g. /rawscheduler
+        """
+        delay = self.reserve(endpoint)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class AdaptiveConcurrency(object):
+    """Limit of the requests in flight adapting to the health of Cook (AIMD)
+
+    The limit grows by one every limit successful requests, i.e. roughly once per round of requests, and is
+    multiplied by decrease_factor when a request is throttled (HTTP 429 or 503), fails to connect or is slower than
+    latency_target_secs. Decreases are spaced by at least cooldown_secs so that a burst of failures of the requests
+    sent together only shrinks the limit once.
+    """
+
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=64, latency_target_secs=None, decrease_factor=0.5,
+                 cooldown_secs=1, throttle_statuses=(429, 503)):
+        """Initialize the concurrency limit
+
+        Args:
+            initial_limit (int): Initial number of requests in flight
+            min_limit (int): Lowest limit
+            max_limit (int): Highest limit
+            latency_target_secs (float or None): Latency above which Cook is considered overloaded, None to only
+                                                 react to throttling and connection errors
+            decrease_factor (float): Factor applied to the limit when Cook is overloaded
+            cooldown_secs (float): Minimum time between two decreases
+            throttle_statuses (tuple): HTTP status codes telling Cook is overloaded
+        """
+        assert 1 <= min_limit <= initial_limit <= max_limit, 'Limits must verify 1 <= min <= initial <= max'
+        assert 0 < decrease_factor < 1, 'Decrease factor must be between 0 and 1'
+
+        self._limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._latency_target_secs = latency_target_secs
+        self._decrease_factor = decrease_factor
+        self._cooldown_secs = cooldown_secs
+        self._throttle_statuses = throttle_statuses
+        self._in_flight = 0
+        self._decreased = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self):
+        """int: Current number of requests allowed in flight"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        """int: Number of requests in flight"""
+        return self._in_flight
+
+    def try_acquire(self):
+        """Take a slot if the limit allows it, without waiting
+
+        Returns:
+            bool: True if a slot was taken
+        """
+        with self._condition:
+            if self._in_flight >= int(self._limit):
+                return False
+            self._in_flight += 1
+            return True
+
+    def acquire(self):
+        """Take a slot, waiting for the requests in flight to go below the limit"""
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, latency_secs, status):
+        """Give a slot back and adapt the limit to the outcome of the request
+
+        Args:
+            latency_secs (float): Time taken by the request
+            status (int or None): HTTP status code, None when no response was received
+        """
+        overloaded = status is None or status in self._throttle_statuses or \
+            (self._latency_target_secs is not None and latency_secs > self._latency_target_secs)
+
+        with self._condition:
+            self._in_flight -= 1
+            now = time.time()
+            if overloaded:
+                if now - self._decreased >= self._cooldown_secs:
+                    self._limit = max(float(self._min_limit), self._limit * self._decrease_factor)
+                    self._decreased = now
+            elif status < 400:
+                self._limit = min(self._max_limit, self._limit + 1.0 / self._limit)
+            self._condition.notify_all()
@@ -0,0 +1,200 @@
+import re
+
+from .codec import default_codec
+
+
+class _Record(object):
+    """Compact, read-only view of a decoded JSON object
+
+    The fields listed in _fields are stored in slots, the other ones are kept JSON encoded and only decoded when
+    accessed. Records can be read as objects (record.status) or as dicts (record['status'], record.get('status')).
+    """
+
+    __slots__ = ('_extra',)
+
+    _fields = ()
+    """tuple: fields stored in slots"""
+
+    def _set(self, data, keep=None, instances=None):
+        extra = dict()
+        for key, value in data.items():
+            if keep is not None and key not in keep:
+                continue
+            if key == 'instances' and instances is not None:
+                value = instances(value)
+            if key in self._fields:
+                setattr(self, key, value)
+            else:
+                extra[key] = value
+        self._extra = default_codec.dumps(extra) if extra else None
+
+    def __getattr__(self, name):
+        # only called for the unset slots and the fields which are not slots
+        if name.startswith('_') or self._extra is None:
+            raise AttributeError(name)
+        extra = default_codec.loads(self._extra)
+        if name not in extra:
+            raise AttributeError(name)
+        return extra[name]
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            getattr(self, key)
+            return True
+        except AttributeError:
+            return False
+
+    def get(self, key, default=None):
+        """Returns the value of a field
+
+        Args:
+            key (str): Field name
+            default: Value returned when the field is absent
+
+        Returns:
+            The value of the field
+        """
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        """Returns the record as a plain dict, decoding every field
+
+        Returns:
+            dict: The record
+        """
+        ret = default_codec.loads(self._extra) if self._extra is not None else dict()
+        for key in self._fields:
+            try:
+                value = object.__getattribute__(self, key)
+            except AttributeError:
+                continue
+            ret[key] = [i.to_dict() for i in value] if isinstance(value, tuple) else value
+        return ret
+
+    def __eq__(self, other):
+        if isinstance(other, _Record):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{}({!r})".format(type(self).__name__, self.to_dict())
+
+
+class InstanceRecord(_Record):
+    """Compact representation of a job instance"""
+
+    __slots__ = ('task_id', 'status', 'hostname', 'start_time', 'end_time', 'reason_string')
+
+    _fields = __slots__
+
+    def __init__(self, instance, fields=None):
+        """Initialize the instance record
+
+        Args:
+            instance (dict): Decoded instance
+            fields (set or None): Fields to keep, None to keep them all
+        """
+        self._set(instance, fields)
+
+
+class JobRecord(_Record):
+    """Compact representation of a job
+
+    The most used fields are stored in slots and the instances as a tuple of InstanceRecord, the less used ones
+    (env, uris, labels...) are kept JSON encoded until accessed.
+    """
+
+    __slots__ = ('uuid', 'name', 'user', 'status', 'state', 'submit_time', 'command', 'cpus', 'mem', 'priority',
+                 'max_retries', 'retries_remaining', 'instances')
+
+    _fields = __slots__
+
+    def __init__(self, job, projection=None):
+        """Initialize the job record
+
+        Args:
+            job (dict): Decoded job
+            projection (Projection or None): Fields to keep, None to keep them all
+        """
+        if projection is None:
+            self._set(job, instances=lambda value: tuple(InstanceRecord(i) for i in value))
+        else:
+            self._set(job, projection.job_fields, projection.instances)
+
+
+class Projection(object):
+    """Subset of the job fields to keep in JobRecord
+
+    Fields are either top-level job fields (e.g. status) or instance fields, optionally narrowed to some instances
+    by position (e.g. instances.hostname, instances[-1].status or instances[0]). Positions refer to the instances
+    returned by Cook, the record only keeps the selected ones, in the same order. The uuid and status fields are
+    always kept as waiting on jobs relies on them.
+
+    Example:
+        >>> client = JobClient(url, job_fields=['uuid', 'status', 'state', 'instances[-1].status'])
+        >>> client.query(uuids)[0].instances[-1].status
+    """
+
+    _path = re.compile(r'^instances(?:\[(-?\d+)\])?(?:\.(\w+))?$')
+
+    def __init__(self, fields):
+        """Initialize the projection
+
+        Args:
+            fields (list): Field paths to keep
+
+        Raises:
+            ValueError
+        """
+        self.job_fields = set(['uuid', 'status'])
+        self._indexes = list()
+        self._all_instances = False
+        self._instance_fields = set()
+        self._all_instance_fields = False
+
+        for field in fields:
+            if not field.startswith('instances'):
+                self.job_fields.add(field)
+                continue
+
+            match = self._path.match(field)
+            if match is None:
+                raise ValueError("Invalid field {}".format(field))
+
+            self.job_fields.add('instances')
+            index, name = match.groups()
+            if index is None:
+                self._all_instances = True
+            elif int(index) not in self._indexes:
+                self._indexes.append(int(index))
+            if name is None:
+                self._all_instance_fields = True
+            else:
+                self._instance_fields.add(name)
+
+    def instances(self, instances):
+        """Select and convert the instances to keep
+
+        Args:
+            instances (list): Decoded instances
+
+        Returns:
+            tuple: InstanceRecord of the selected instances
+        """
+        if not self._all_instances:
+            positions = set(i % len(instances) for i in self._indexes if -len(instances) <= i < len(instances))
+            instances = [instances[i] for i in sorted(positions)]
+
+        fields = None if self._all_instance_fields else self._instance_fields
+        return tuple(InstanceRecord(i, fields) for i in instances)
@@ -0,0 +1,130 @@
+import random
+import threading
+import time
+from email.utils import parsedate_tz, mktime_tz
+
+
+class RetryPolicy(object):
+    """Retry policy of the transient HTTP failures
+
+    Failed requests are retried with an exponential backoff and full jitter, i.e. a random delay between 0 and
+    backoff_secs * 2 ** attempt, capped to max_backoff_secs. A Retry-After header sent by Cook takes precedence.
+    """
+
+    def __init__(self, max_retries=3, backoff_secs=0.5, max_backoff_secs=30, retry_statuses=(429, 502, 503, 504)):
+        """Initialize the retry policy
+
+        Args:
+            max_retries (int): Maximum number of retries of a request
+            backoff_secs (float): Base delay between two attempts
+            max_backoff_secs (float): Maximum delay between two attempts
+            retry_statuses (tuple): HTTP status codes worth retrying
+        """
+        self.max_retries = max_retries
+        self.backoff_secs = backoff_secs
+        self.max_backoff_secs = max_backoff_secs
+        self.retry_statuses = retry_statuses
+
+    def delay(self, attempt, retry_after=None):
+        """Returns how long to wait before the next attempt
+
+        Args:
+            attempt (int): Number of attempts made so far, starting from 1
+            retry_after (str or None): Value of the Retry-After response header
+
+        Returns:
+            float: Delay in seconds
+        """
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            delay = random.uniform(0, self.backoff_secs * (2 ** (attempt - 1)))
+        return max(0, min(delay, self.max_backoff_secs))
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header
+
+    Args:
+        value (str or None): Either a number of seconds or a HTTP date
+
+    Returns:
+        float or None: Seconds to wait, None when absent or malformed
+    """
+    if not value:
+        return None
+
+    try:
+        return float(value)
+    except ValueError:
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return mktime_tz(date) - time.time()
+
+
+class CircuitBreaker(object):
+    """Fail fast while Cook keeps failing
+
+    The circuit opens after failure_threshold consecutive failures and then rejects every request for
+    reset_timeout_secs. Past that, a single trial request is let through: its success closes the circuit, its failure
+    opens it again. A trial whose outcome is not recorded within reset_timeout_secs, e.g. because it was cancelled, is
+    given up on and another one is let through.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout_secs=30):
+        """Initialize the circuit breaker
+
+        Args:
+            failure_threshold (int): Number of consecutive failures opening the circuit
+            reset_timeout_secs (float): How long the circuit stays open
+        """
+        self._failure_threshold = failure_threshold
+        self._reset_timeout_secs = reset_timeout_secs
+        self._failures = 0
+        self._opened_at = None
+        self._trial_at = None
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        """Returns whether requests are currently being rejected
+
+        Returns:
+            bool: True if the circuit is open
+        """
+        with self._lock:
+            return self._opened_at is not None and time.time() - self._opened_at < self._reset_timeout_secs
+
+    def allow(self):
+        """Check whether a request may be sent
+
+        Returns:
+            bool: True if the request may be sent
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+
+            now = time.time()
+            if now - self._opened_at < self._reset_timeout_secs:
+                return False
+            if self._trial_at is not None and now - self._trial_at < self._reset_timeout_secs:
+                return False
+
+            # half-open, let a single trial request through
+            self._trial_at = now
+            return True
+
+    def record_success(self):
+        """Record a successful request"""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_at = None
+
+    def record_failure(self):
+        """Record a failed request"""
+        with self._lock:
+            self._failures += 1
+            if self._trial_at is not None or self._failures >= self._failure_threshold:
+                self._opened_at = time.time()
+                self._trial_at = None
@@ -0,0 +1,423 @@
+import getpass
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+from requests import RequestException
+
+from .exceptions import JobClientError, JobSubmitError, JobValidationError
+from .jobclient import JobClient
+
+logger = logging.getLogger(__name__)
+
+
+class RoutingPolicy(object):
+    """Decides which cluster a submitted job goes to"""
+
+    def select(self, router, job):
+        """Pick the cluster of a job
+
+        Args:
+            router (ClusterRouter): The router submitting the job
+            job (dict): The job
+
+        Returns:
+            str: Cluster name
+        """
+        raise NotImplementedError
+
+
+class WeightedPolicy(RoutingPolicy):
+    """Spread the jobs over the clusters in proportion to their weights, using a smooth weighted round-robin"""
+
+    def __init__(self, weights=None):
+        """Initialize the policy
+
+        Args:
+            weights (dict or None): Weight by cluster name, defaults to the same weight for every cluster
+        """
+        self._weights = weights
+        self._current = dict()
+        self._lock = threading.Lock()
+
+    def select(self, router, job):
+        weights = self._weights or dict((name, 1) for name in router.clusters)
+        total = sum(weights.values())
+        with self._lock:
+            for name, weight in weights.items():
+                self._current[name] = self._current.get(name, 0) + weight
+            name = max(sorted(weights), key=lambda n: self._current[n])
+            self._current[name] -= total
+        return name
+
+
+class LeastLoadedPolicy(RoutingPolicy):
+    """Send the jobs to the cluster running the fewest jobs of a user
+
+    The load of every cluster is the number of running and waiting jobs listed over the last window, refreshed
+    every refresh_secs. Jobs routed in between count towards the load of their cluster.
+    """
+
+    def __init__(self, user=None, window=timedelta(hours=1), refresh_secs=30):
+        """Initialize the policy
+
+        Args:
+            user (str or None): User whose jobs are counted, defaults to the current user
+            window (datetime.timedelta): How far back to list the jobs
+            refresh_secs (float): How long the loads are used for before being listed again
+        """
+        self._user = user or getpass.getuser()
+        self._window = window
+        self._refresh_secs = refresh_secs
+        self._loads = None
+        self._refreshed = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self, router):
+        now = datetime.utcnow()
+
+        def load(name):
+            try:
+                return len(router.clusters[name].list(self._user, ['running', 'waiting'], now - self._window, now))
+            except (JobClientError, RequestException) as e:
+                logger.warning("Could not list the jobs of cluster {}: {}".format(name, e))
+                return float('inf')
+
+        names = list(router.clusters)
+        return dict(zip(names, router._map(load, names)))
+
+    def select(self, router, job):
+        with self._lock:
+            if self._loads is None or time.time() - self._refreshed > self._refresh_secs:
+                self._loads = self._refresh(router)
+                self._refreshed = time.time()
+
+            name = min(sorted(self._loads), key=lambda n: self._loads[n])
+            self._loads[name] += 1
+            return name
+
+
+class ResourcePolicy(RoutingPolicy):
+    """Send the jobs to a cluster based on the resources they request"""
+
+    def __init__(self, rules, default):
+        """Initialize the policy
+
+        Args:
+            rules (list): (cluster name, max cpus, max mem) tuples, the first rule a job fits in wins, None
+                          standing for no limit
+            default (str): Cluster of the jobs fitting no rule
+        """
+        self._rules = rules
+        self._default = default
+
+    def select(self, router, job):
+        cpus = job.get('cpus', 0)
+        mem = job.get('mem', 0)
+        for name, max_cpus, max_mem in self._rules:
+            if (max_cpus is None or cpus <= max_cpus) and (max_mem is None or mem <= max_mem):
+                return name
+        return self._default
+
+
+class ClusterRouter(object):
+    """Route job operations over several Cook clusters
+
+    Submitted jobs go to the cluster picked by the routing policy, and the cluster owning every submitted UUID is
+    remembered so that queries, deletions, retries and waits only reach the owning clusters, all of them in
+    parallel. UUIDs of unknown ownership, e.g. submitted by another process, are located by asking every cluster
+    once.
+
+    Example:
+        >>> router = ClusterRouter({'east': JobClient(east_url, ...), 'west': JobClient(west_url, ...)})
+        >>> uuids = router.submit(jobs)
+        >>> list(router.wait(uuids))
+    """
+
+    def __init__(self, clusters, policy=None, max_owners=100000):
+        """Initialize the router
+
+        Args:
+            clusters (dict): JobClient by cluster name
+            policy (RoutingPolicy or None): Routing of the submitted jobs, defaults to an even WeightedPolicy
+            max_owners (int): Maximum number of job owners remembered
+        """
+        assert clusters, 'At least one cluster is required'
+        assert all(isinstance(c, JobClient) for c in clusters.values()), 'Clusters must be JobClient instances'
+
+        self.clusters = clusters
+        self._policy = policy or WeightedPolicy()
+        self._max_owners = max_owners
+        self._owners = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=len(clusters))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop the workers and close the clients of every cluster"""
+        self._executor.shutdown(wait=True)
+        for client in self.clusters.values():
+            client.close()
+
+    def _map(self, fn, args):
+        """Apply fn to every argument in parallel, results are returned in the same order as the arguments"""
+        if len(args) <= 1:
+            return [fn(arg) for arg in args]
+        return list(self._executor.map(fn, args))
+
+    def owner(self, uuid):
+        """Returns the cluster owning a job
+
+        Args:
+            uuid (str): Job UUID
+
+        Returns:
+            str or None: Cluster name, None when unknown
+        """
+        with self._lock:
+            return self._owners.get(uuid)
+
+    def _record(self, name, uuids):
+        with self._lock:
+            for uuid in uuids:
+                self._owners.pop(uuid, None)
+                self._owners[uuid] = name
+
+            while len(self._owners) > self._max_owners:
+                self._owners.popitem(last=False)
+
+    def _locate(self, jobs):
+        """Find the clusters owning jobs of unknown ownership
+
+        Args:
+            jobs (list): Job UUIDs
+
+        Returns:
+            dict: The information of the jobs found by UUID
+        """
+        names = list(self.clusters)
+        found = dict()
+        for name, infos in zip(names, self._map(lambda n: self.clusters[n].query(jobs, partial=True), names)):
+            self._record(name, [job['uuid'] for job in infos])
+            found.update((job['uuid'], job) for job in infos)
+        return found
+
+    def _group(self, jobs):
+        """Group jobs by owning cluster, locating the unknown ones
+
+        Args:
+            jobs (list): Job UUIDs
+
+        Returns:
+            tuple: The UUIDs by cluster name, the information of the jobs located along the way by UUID and the
+                   UUIDs found in no cluster
+        """
+        groups = OrderedDict()
+        unknown = list()
+        for uuid in jobs:
+            name = self.owner(uuid)
+            if name is None:
+                unknown.append(uuid)
+            else:
+                groups.setdefault(name, list()).append(uuid)
+
+        found = self._locate(unknown) if unknown else dict()
+        missing = [uuid for uuid in unknown if uuid not in found]
+        return groups, found, missing
+
+    def submit(self, jobs):
+        """Submit one or more jobs, spread over the clusters by the routing policy
+
+        All the jobs are validated with the settings of their cluster before any of them is sent, so that an invalid
+        job does not leave the jobs of the other clusters submitted.
+
+        Args:
+            jobs (list): Jobs to submit
+
+        Returns:
+            list: The UUIDs of the submitted jobs, in the same order as the jobs
+
+        Raises:
+            AssertionError, JobSubmitError, JobValidationError
+        """
+        assert isinstance(jobs, list), 'Jobs must be type list'
+        assert len(jobs) > 0, 'One or more jobs required'
+
+        groups = OrderedDict()
+        indexes = dict()
+        for i, job in enumerate(jobs):
+            name = self._policy.select(self, job)
+            groups.setdefault(name, list()).append(job)
+            indexes.setdefault(name, list()).append(i)
+
+        errors = dict()
+        for name, group in groups.items():
+            try:
+                self.clusters[name]._prepare_jobs(group)
+            except JobValidationError as e:
+                # reported by index in the caller's list rather than in the cluster's share
+                for i, messages in e.job_errors.items():
+                    errors.setdefault(None if i is None else indexes[name][i], list()).extend(messages)
+        if errors:
+            raise JobValidationError(errors)
+
+        def submit(name):
+            try:
+                return self.clusters[name].submit(groups[name]), None
+            except JobSubmitError as e:
+                return e.submitted, e
+            except Exception as e:
+                return [], e
+
+        submitted = set()
+        unknown = set()
+        error = None
+        for name, (uuids, e) in zip(groups, self._map(submit, list(groups))):
+            # jobs which timed out may have been accepted and can only be found on that cluster
+            self._record(name, uuids + list(getattr(e, 'unknown', [])))
+            submitted.update(uuids)
+            unknown.update(getattr(e, 'unknown', []))
+            error = error or e
+
+        if error is not None:
+            raise JobSubmitError(str(error), [job['uuid'] for job in jobs if job['uuid'] in submitted],
+                                 [job['uuid'] for job in jobs if job['uuid'] not in submitted | unknown],
+                                 [job['uuid'] for job in jobs if job['uuid'] in unknown])
+
+        return [job['uuid'] for job in jobs]
+
+    def query(self, jobs):
+        """Query one or more jobs from their owning clusters
+
+        Args:
+            jobs (list): Jobs to query
+
+        Returns:
+            list: Jobs information, in the same order as the jobs
+
+        Raises:
+            AssertionError, JobClientError
+        """
+        assert isinstance(jobs, list), 'Jobs must be type list'
+        assert len(jobs) > 0, 'One or more jobs required'
+
+        groups, found, missing = self._group(jobs)
+        if missing:
+            raise JobClientError("UUID {} didn't correspond to a job in any cluster".format(missing[0]))
+
+        for infos in self._map(lambda n: self.clusters[n].query(groups[n]), list(groups)):
+            found.update((job['uuid'], job) for job in infos)
+
+        return [found[uuid] for uuid in jobs if uuid in found]
+
+    def delete(self, jobs):
+        """Delete one or more jobs from their owning clusters, unknown jobs are ignored
+
+        Args:
+            jobs (list): Jobs to delete
+
+        Raises:
+            AssertionError, JobClientError
+        """
+        assert isinstance(jobs, list), 'Jobs must be type list'
+        assert len(jobs) > 0, 'One or more jobs required'
+
+        groups, found, _ = self._group(jobs)
+        for uuid in found:
+            groups.setdefault(self.owner(uuid), list()).append(uuid)
+
+        self._map(lambda n: self.clusters[n].delete(groups[n]), list(groups))
+
+    def retry(self, jobs, retries):
+        """Retry one or more jobs on their owning clusters
+
+        Args:
+            jobs (list): Job UUIDs
+            retries (int): Number of retries
+
+        Returns:
+            dict: None for every job successfully retried, the JobClientError otherwise, by job UUID
+
+        Raises:
+            AssertionError
+        """
+        assert isinstance(jobs, list), 'Jobs must be type list'
+        assert len(jobs) > 0, 'One or more jobs required'
+
+        try:
+            groups, found, missing = self._group(jobs)
+        except (JobClientError, RequestException) as e:
+            return dict((uuid, JobClientError(str(e))) for uuid in jobs)
+
+        for uuid in found:
+            groups.setdefault(self.owner(uuid), list()).append(uuid)
+
+        ret = dict((uuid, JobClientError("UUID {} didn't correspond to a job in any cluster".format(uuid)))
+                   for uuid in missing)
+        for errors in self._map(lambda n: self.clusters[n].retry(groups[n], retries), list(groups)):
+            ret.update(errors)
+        return ret
+
+    def wait(self, jobs, timeout=None):
+        """Wait for jobs to complete on their owning clusters
+
+        Args:
+            jobs (list): List of jobs to wait for
+            timeout (float or None): Stop waiting after this many seconds
+
+        Yields:
+            dict: The job information, as jobs complete
+        """
+        groups, found, missing = self._group(jobs)
+        if missing:
+            raise JobClientError("UUID {} didn't correspond to a job in any cluster".format(missing[0]))
+
+        for uuid in found:
+            groups.setdefault(self.owner(uuid), list()).append(uuid)
+
+        done = Queue()
+        stop = threading.Event()
+
+        def wait(name):
+            try:
+                for job in self.clusters[name].wait(groups[name], timeout=timeout, stop=stop):
+                    done.put((job, None))
+            except Exception as e:
+                done.put((None, e))
+            finally:
+                done.put(None)
+
+        # dedicated threads, so that long waits do not hold the workers of the other operations
+        for name in groups:
+            thread = threading.Thread(target=wait, args=(name,), name="cook-router-wait-{}".format(name))
+            thread.daemon = True
+            thread.start()
+
+        # the threads stop polling once the caller stops iterating or an error is raised
+        try:
+            remaining = len(groups)
+            while remaining:
+                item = done.get()
+                if item is None:
+                    remaining -= 1
+                    continue
+
+                job, error = item
+                if error is not None:
+                    raise error
+                yield job
+        finally:
+            stop.set()
@@ -0,0 +1,330 @@
+import base64
+import json
+import logging
+import random
+import threading
+import time
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qs
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, Nagle's algorithm would hold the body until the client ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+    def do_GET(self):
+        self.server.cook.handle(self, 'GET')
+
+    def do_POST(self):
+        self.server.cook.handle(self, 'POST')
+
+    def do_DELETE(self):
+        self.server.cook.handle(self, 'DELETE')
+
+
+class FakeCookServer(object):
+    """In-process stand-in for the Cook scheduler REST API
+
+    Serves /rawscheduler (GET, POST, DELETE), /list, /retry and /info over real HTTP from a background thread. Jobs go
+    through the waiting, running and completed states based on the time elapsed since their submission, so no
+    background processing is involved. Latency, server errors, job run times and job failures can be configured to
+    exercise JobClient under load.
+
+    Example:
+        >>> with FakeCookServer(job_runtime_secs=1) as server:
+        ...     client = JobClient(url=server.url, http_user='foo', http_password='secret')
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency_secs=0, error_rate=0, scheduling_delay_secs=0,
+                 job_runtime_secs=0, failure_rate=0, seed=None, leader_url=None):
+        """Initialize the fake Cook server
+
+        Args:
+            host (str): Address to listen on
+            port (int): Port to listen on, 0 to pick a free one
+            latency_secs (float or tuple): Delay added to every response, or a (min, max) range to draw it from
+            error_rate (float): Probability of answering a request with a HTTP 500
+            scheduling_delay_secs (float): Time jobs spend waiting before running
+            job_runtime_secs (float or callable): Time jobs spend running, or a function returning it for a job
+            failure_rate (float): Probability of a job instance failing
+            seed (int or None): Seed of the random generator, for reproducible runs
+            leader_url (str or None): Leader URL advertised by /info, defaults to the server's own URL
+        """
+        self._host = host
+        self._port = port
+        self.latency_secs = latency_secs
+        self.error_rate = error_rate
+        self.scheduling_delay_secs = scheduling_delay_secs
+        self.job_runtime_secs = job_runtime_secs
+        self.failure_rate = failure_rate
+        self.leader_url = leader_url
+
+        self._random = random.Random(seed)
+        self._jobs = dict()
+        self._lock = threading.Lock()
+        self._requests = dict()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def url(self):
+        """str: Base URL of the server"""
+        return "http://{}:{}".format(*self._server.server_address[:2])
+
+    def start(self):
+        """Start serving requests from a background thread"""
+        self._server = _ThreadingHTTPServer((self._host, self._port), _Handler)
+        self._server.cook = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-cook-server')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving requests"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def get_request_counts(self):
+        """Returns the number of requests served
+
+        Returns:
+            dict: Number of requests by (method, path)
+        """
+        with self._lock:
+            return dict(self._requests)
+
+    def get_jobs(self):
+        """Returns the current information of all the jobs
+
+        Returns:
+            list: Jobs information
+        """
+        now = time.time()
+        with self._lock:
+            return [self._render(job, now) for job in self._jobs.values()]
+
+    def handle(self, request, method):
+        """Serve a single request
+
+        Args:
+            request (BaseHTTPRequestHandler): The request
+            method (str): HTTP method
+        """
+        url = urlparse(request.path)
+        params = parse_qs(url.query)
+        length = int(request.headers.get('Content-Length') or 0)
+        body = request.rfile.read(length) if length else b''
+
+        with self._lock:
+            self._requests[(method, url.path)] = self._requests.get((method, url.path), 0) + 1
+            fail = self._random.random() < self.error_rate
+            latency = self.latency_secs
+            if isinstance(latency, tuple):
+                latency = self._random.uniform(*latency)
+
+        if latency:
+            time.sleep(latency)
+
+        if fail:
+            return self._respond(request, 500, {'error': 'Injected failure'})
+
+        route = {
+            ('GET', '/rawscheduler'): self._query,
+            ('POST', '/rawscheduler'): self._submit,
+            ('DELETE', '/rawscheduler'): self._delete,
+            ('GET', '/list'): self._list,
+            ('POST', '/retry'): self._retry,
+            ('GET', '/info'): self._info
+        }.get((method, url.path))
+
+        if route is None:
+            return self._respond(request, 404, {'error': 'Not found'})
+
+        try:
+            status, data = route(params, body, self._user(request))
+        except (ValueError, KeyError, TypeError) as e:
+            status, data = 400, {'error': str(e)}
+
+        self._respond(request, status, data)
+
+    @staticmethod
+    def _respond(request, status, data):
+        payload = json.dumps(data).encode('utf-8') if data is not None else b''
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(payload)))
+        if request.headers.get('Authorization', '').startswith('Negotiate '):
+            # SPNEGO mutual authentication token, only checked by mocks
+            request.send_header('WWW-Authenticate', 'Negotiate c2VydmVy')
+        request.end_headers()
+        request.wfile.write(payload)
+
+    @staticmethod
+    def _user(request):
+        auth = request.headers.get('Authorization', '')
+        if auth.startswith('Basic '):
+            return base64.b64decode(auth[6:].encode('ascii')).decode('utf-8').split(':', 1)[0]
+        return 'nobody'
+
+    def _runtime(self, job):
+        if callable(self.job_runtime_secs):
+            return self.job_runtime_secs(job)
+        return self.job_runtime_secs
+
+    def _schedule(self, job, now):
+        """Plan the next instance of a job, starting from now"""
+        job['_start'] = now + self.scheduling_delay_secs
+        job['_end'] = job['_start'] + self._runtime(job)
+        job['_failed'] = self._random.random() < self.failure_rate
+
+    def _render(self, job, now):
+        """Build the information of a job as seen at a given time"""
+        ret = dict((k, v) for k, v in job.items() if not k.startswith('_'))
+        instances = list(job['_instances'])
+
+        if job['_killed'] is not None:
+            status, state = 'completed', 'failed'
+        elif now < job['_start']:
+            status, state = 'waiting', 'waiting'
+        else:
+            instance = {
+                'task_id': "{}-{}".format(job['uuid'], len(instances)),
+                'hostname': 'localhost',
+                'start_time': int(job['_start'] * 1000),
+                'ports': [],
+                'backfilled': False,
+                'preempted': False
+            }
+            if now < job['_end']:
+                status, state = 'running', 'running'
+                instance['status'] = 'running'
+            else:
+                status, state = 'completed', 'failed' if job['_failed'] else 'success'
+                instance['status'] = state
+                instance['end_time'] = int(job['_end'] * 1000)
+            instances.append(instance)
+
+        ret.update({'status': status, 'state': state, 'instances': instances})
+        return ret
+
+    def _query(self, params, body, user):
+        now = time.time()
+        with self._lock:
+            missing = [uuid for uuid in params.get('job', []) if uuid not in self._jobs]
+            if missing and params.get('partial', ['false'])[0] != 'true':
+                return 404, {'error': "UUID {} didn't correspond to a job".format(missing[0])}
+            return 200, [self._render(self._jobs[uuid], now) for uuid in params.get('job', []) if uuid in self._jobs]
+
+    def _submit(self, params, body, user):
+        jobs = json.loads(body.decode('utf-8'))['jobs']
+        now = time.time()
+        with self._lock:
+            conflicts = [j['uuid'] for j in jobs if j['uuid'] in self._jobs]
+            if conflicts:
+                return 409, {'error': "The following job UUIDs were already used: {}".format(', '.join(conflicts))}
+
+            for j in jobs:
+                job = dict(j, user=user, submit_time=int(now * 1000), _instances=[], _killed=None,
+                           _seq=len(self._jobs))
+                job['retries_remaining'] = job.get('max_retries', 1)
+                self._schedule(job, now)
+                self._jobs[j['uuid']] = job
+
+        return 201, {'jobs': [j['uuid'] for j in jobs]}
+
+    def _delete(self, params, body, user):
+        now = time.time()
+        with self._lock:
+            for uuid in params.get('job', []):
+                job = self._jobs.get(uuid)
+                if job is not None and job['_killed'] is None and self._render(job, now)['status'] != 'completed':
+                    job['_killed'] = now
+        return 204, None
+
+    def _retry(self, params, body, user):
+        retries = int(params['retries'][0])
+        now = time.time()
+        with self._lock:
+            missing = [uuid for uuid in params.get('job', []) if uuid not in self._jobs]
+            if missing:
+                return 404, {'error': "UUID {} didn't correspond to a job".format(missing[0])}
+
+            for uuid in params.get('job', []):
+                job = self._jobs[uuid]
+                current = self._render(job, now)
+                job['max_retries'] = retries
+                job['retries_remaining'] = retries
+                if current['status'] == 'completed' and current['state'] == 'failed':
+                    # run the job again
+                    job['_instances'] = current['instances']
+                    job['_killed'] = None
+                    self._schedule(job, now)
+
+        return 201, {'jobs': params.get('job', [])}
+
+    def _info(self, params, body, user):
+        return 200, {
+            'authentication-scheme': 'basic',
+            'commit': 'fake',
+            'start-time': '1970-01-01T00:00:00.000Z',
+            'version': 'fake',
+            'leader-url': self.leader_url or self.url
+        }
+
+    def _list(self, params, body, user):
+        user = params['user'][0]
+        states = set(params.get('state', ['success+running+failed+completed+waiting'])[0].split('+'))
+        invalid = states - set(['success', 'running', 'failed', 'completed', 'waiting'])
+        if invalid:
+            return 400, {'error': "Invalid state {}".format(sorted(invalid)[0])}
+        start_ms = float(params['start_ms'][0]) if 'start_ms' in params else None
+        stop_ms = float(params['stop_ms'][0]) if 'stop_ms' in params else None
+        limit = int(params['limit'][0]) if 'limit' in params else None
+
+        now = time.time()
+        ret = list()
+        with self._lock:
+            for job in sorted(self._jobs.values(), key=lambda j: j['_seq']):
+                if job['user'] != user:
+                    continue
+                if start_ms is not None and job['submit_time'] < start_ms:
+                    continue
+                if stop_ms is not None and job['submit_time'] > stop_ms:
+                    continue
+
+                info = self._render(job, now)
+                if info['status'] in states or info['state'] in states:
+                    ret.append(info)
+                    if limit is not None and len(ret) >= limit:
+                        break
+
+        return 200, ret
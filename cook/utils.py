@@ -16,3 +16,41 @@ def generate_batch_request(jobs, batch_size):
 
     return batch
 
+
+def generate_batch_queries(prefix, jobs, batch_size=None, max_length=None, suffix=''):
+    """Pack a given list of jobs into as few queries as possible
+
+    Each query holds at most batch_size jobs and, unless a single job is already too long, at most max_length
+    characters. Queries are built by joining the job UUIDs directly onto the precomputed prefix.
+
+    Args:
+        prefix (str): Query prefix, e.g. '/rawscheduler?'
+        jobs (list): List of job UUIDs
+        batch_size (int or None): Maximum number of jobs per query
+        max_length (int or None): Maximum length of a query
+        suffix (str): Query suffix, e.g. '&retries=3'
+
+    Returns:
+        list: The jobs of each query along with the query itself
+    """
+    head = prefix + 'job='
+    separator = '&job='
+    budget = None if max_length is None else max_length - len(head) - len(suffix)
+
+    batch = list()
+    start = 0
+    while start < len(jobs):
+        stop = len(jobs) if batch_size is None else min(len(jobs), start + batch_size)
+        end = start + 1
+        length = len(jobs[start])
+        while end < stop:
+            length += len(separator) + len(jobs[end])
+            if budget is not None and length > budget:
+                break
+            end += 1
+
+        chunk = jobs[start:end]
+        batch.append((chunk, head + separator.join(chunk) + suffix))
+        start = end
+
+    return batch
@@ -0,0 +1,115 @@
+from uuid import UUID
+
+from .exceptions import JobValidationError
+
+try:
+    basestring
+except NameError:
+    basestring = str
+    long = int
+
+
+def _is_string(v):
+    return isinstance(v, basestring)
+
+
+def _converts(cast, predicate):
+    """Build a check casting the value first, as schema's Use() does"""
+    def check(v):
+        try:
+            return predicate(cast(v))
+        except (TypeError, ValueError, OverflowError):
+            return False
+    return check
+
+
+def _is_uuid(v):
+    try:
+        return len(v) > 0 and bool(UUID(v))
+    except (TypeError, ValueError, AttributeError):
+        return False
+
+
+class JobValidator(object):
+    """Single pass validator for the jobs to submit
+
+    The rules are plain predicates looked up by field name, so validating a job costs one dictionary lookup and one
+    function call per field. Every error of every job is collected before raising.
+    """
+
+    _rules = {
+        'name': (lambda v: _is_string(v) and len(v) > 0, 'must be a non-empty string'),
+        'uuid': (lambda v: _is_string(v) and _is_uuid(v), 'must be a valid UUID'),
+        'executor': (lambda v: _is_string(v) and v in ('mesos', 'cook'), "must be either 'mesos' or 'cook'"),
+        'priority': (_converts(int, lambda n: 0 <= n <= 100), 'must be an integer between 0 and 100'),
+        'max_retries': (_converts(int, lambda n: n > 0), 'must be an integer greater than 0'),
+        'max_runtime': (_converts(long, lambda n: n > 0), 'must be an integer greater than 0'),
+        'expected_runtime': (_converts(long, lambda n: n > 0), 'must be an integer greater than 0'),
+        'cpus': (lambda v: isinstance(v, (int, float)) and v > 0, 'must be a number greater than 0'),
+        'mem': (lambda v: isinstance(v, (int, float)) and v > 0, 'must be a number greater than 0'),
+        'gpus': (_converts(int, lambda n: n >= 0), 'must be an integer greater or equal to 0'),
+        'ports': (lambda v: isinstance(v, int) and v >= 0, 'must be an integer greater or equal to 0'),
+        'uris': (lambda v: isinstance(v, list), 'must be a list'),
+        'env': (lambda v: isinstance(v, dict), 'must be a dictionary'),
+        'constraints': (lambda v: isinstance(v, list), 'must be a list'),
+        'disable_mea_culpa_retries': (lambda v: isinstance(v, bool), 'must be a boolean'),
+        'container': (lambda v: isinstance(v, dict), 'must be a dictionary'),
+        'command': (_is_string, 'must be a string')
+    }
+    """dict: predicate and error message by job field"""
+
+    _required = ('max_retries',)
+    """tuple: fields every job must define"""
+
+    def errors(self, job):
+        """Returns the errors of a single job
+
+        Args:
+            job (dict): The job
+
+        Returns:
+            list: Error messages, empty when the job is valid
+        """
+        if not isinstance(job, dict):
+            return ['job must be a dictionary']
+
+        ret = list()
+        rules = self._rules
+        for k, v in job.items():
+            rule = rules.get(k)
+            if rule is None:
+                ret.append("unknown field {!r}".format(k))
+            elif not rule[0](v):
+                ret.append("{} {} (got {!r})".format(k, rule[1], v))
+
+        for k in self._required:
+            if k not in job:
+                ret.append("missing field {!r}".format(k))
+
+        return ret
+
+    def validate(self, jobs):
+        """Validate a list of jobs
+
+        Args:
+            jobs (list): The jobs
+
+        Returns:
+            list: The jobs
+
+        Raises:
+            JobValidationError
+        """
+        if not isinstance(jobs, list):
+            raise JobValidationError({None: ['jobs must be a list']})
+
+        errors = dict()
+        for i, job in enumerate(jobs):
+            e = self.errors(job)
+            if e:
+                errors[i] = e
+
+        if errors:
+            raise JobValidationError(errors)
+
+        return jobs
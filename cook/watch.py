@@ -0,0 +1,73 @@
+import threading
+from collections import namedtuple
+
+JobChange = namedtuple('JobChange', ['uuid', 'job', 'changes'])
+"""A job which changed since the previous polling round: its UUID, its current information and the list of Change"""
+
+Change = namedtuple('Change', ['field', 'task_id', 'old', 'new'])
+"""A single change of a job: field is one of status, state, instance (a new instance, old is None and new its
+status), instance_status or hostname. task_id is None for the job fields."""
+
+
+class JobTracker(object):
+    """Last known state of a set of jobs, turning job snapshots into deltas
+
+    Only the job status and state and the task ID, status and hostname of every instance are tracked. They are kept
+    as a single tuple per job, so unchanged jobs are told apart with one comparison and no further processing.
+    """
+
+    def __init__(self):
+        self._states = dict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(job):
+        instances = job.get('instances') or ()
+        return (job.get('status'), job.get('state'),
+                tuple((i.get('task_id'), i.get('status'), i.get('hostname')) for i in instances))
+
+    def update(self, job):
+        """Record the current information of a job
+
+        Args:
+            job (dict or JobRecord): The job information
+
+        Returns:
+            JobChange or None: The changes since the previous update of the job, None when unchanged. The first
+                               update of a job reports all its fields as changed.
+        """
+        current = self._fingerprint(job)
+        with self._lock:
+            previous = self._states.get(job['uuid'])
+            if previous == current:
+                return None
+            self._states[job['uuid']] = current
+
+        status, state, instances = previous or (None, None, ())
+        changes = list()
+        if status != current[0]:
+            changes.append(Change('status', None, status, current[0]))
+        if state != current[1]:
+            changes.append(Change('state', None, state, current[1]))
+
+        known = dict((task_id, (s, host)) for task_id, s, host in instances)
+        for task_id, s, host in current[2]:
+            if task_id not in known:
+                changes.append(Change('instance', task_id, None, s))
+                continue
+            if known[task_id][0] != s:
+                changes.append(Change('instance_status', task_id, known[task_id][0], s))
+            if known[task_id][1] != host:
+                changes.append(Change('hostname', task_id, known[task_id][1], host))
+
+        return JobChange(job['uuid'], job, changes)
+
+    def forget(self, uuids):
+        """Stop tracking jobs
+
+        Args:
+            uuids (list): Job UUIDs
+        """
+        with self._lock:
+            for uuid in uuids:
+                self._states.pop(uuid, None)
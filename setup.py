@@ -6,7 +6,7 @@ from cook import __version__ as version
 
 requirements = parse_requirements(
     'requirements.txt', session=pip.download.PipSession())
-reqs = [str(ir.req) for ir in requirements]
+reqs = [str(ir.req) + ("; {}".format(ir.markers) if ir.markers else '') for ir in requirements]
 
 with open(os.path.join(os.getcwd(), 'README.md')) as f:
     readme = f.read()
@@ -35,5 +35,9 @@ setup(
         'pytest',
         'pytest-cov'
     ],
-    install_requires=reqs
+    install_requires=reqs,
+    extras_require={
+        'asyncio': ['aiohttp'],
+        'json': ['orjson; python_version >= "3.6"', 'ujson; python_version < "3.0"']
+    }
 )
@@ -0,0 +1,12 @@
+import sys
+
+collect_ignore = []
+
+# the asyncio client requires python 3 and aiohttp
+try:
+    import aiohttp
+except (ImportError, SyntaxError):
+    aiohttp = None
+
+if sys.version_info < (3, 8) or aiohttp is None:
+    collect_ignore.append('test_aio.py')
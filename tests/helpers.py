@@ -0,0 +1,26 @@
+import json
+from mock import Mock
+from requests import HTTPError
+
+
+def mock_response(status_code=200, json_data=None, headers=None):
+    """Returns a mock requests.Response
+
+    Args:
+        status_code (int): HTTP status code, raise_for_status() raises an HTTPError from 300
+        json_data (object): Decoded response body
+        headers (dict or None): Response headers
+
+    Returns:
+        mock.Mock: The response
+    """
+    mock_resp = Mock()
+    mock_resp.status_code = status_code
+    mock_resp.content = json.dumps(json_data).encode('utf-8')
+    mock_resp.json = Mock(return_value=json_data)
+    mock_resp.headers = headers or {}
+
+    if status_code >= 300:
+        mock_resp.raise_for_status = Mock(side_effect=HTTPError(response=mock_resp))
+
+    return mock_resp
@@ -0,0 +1,234 @@
+import asyncio
+import os
+import json
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from cook.aio import AsyncJobClient
+from cook.exceptions import CircuitOpenError, JobClientError, JobSubmitError
+from cook.jobclient import JobClient
+from cook.ratelimit import AdaptiveConcurrency, RateLimiter
+from cook.retry import CircuitBreaker, RetryPolicy
+from cook.router import ClusterRouter
+
+
+class AsyncJobClientTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        with open("{}/test_jobs.json".format(os.path.dirname(__file__)), 'r') as f:
+            self._jobs = json.loads(f.read())
+
+        self.requests = list()
+        self.status = 200
+        self.failures = list()
+        self.delay = 0
+
+        app = web.Application()
+        app.router.add_route('*', '/rawscheduler', self._handle)
+        app.router.add_route('*', '/retry', self._handle)
+        app.router.add_route('*', '/list', self._handle)
+        self.server = TestServer(app)
+        await self.server.start_server()
+
+        self.client = AsyncJobClient(url=str(self.server.make_url('')).rstrip('/'), http_user='foo',
+                                     http_password='secret', batch_request_size=4, max_concurrency=3)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+
+    async def _handle(self, request):
+        self.requests.append((request.method, request.path, request.query, await request.text()))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        status = self.failures.pop(0) if self.failures else self.status
+        if status >= 300:
+            return web.json_response({}, status=status)
+
+        if request.path == '/rawscheduler' and request.method == 'GET':
+            jobs = dict((job['uuid'], job) for job in self._jobs)
+            return web.json_response([jobs[u] for u in request.query.getall('job')])
+        elif request.path == '/list':
+            return web.json_response(self._jobs)
+        return web.json_response({}, status=201)
+
+    async def test_query(self):
+        uuids = [job['uuid'] for job in self._jobs]
+        self.assertSequenceEqual(await self.client.query(uuids), self._jobs)
+        self.assertEqual(len(self.requests), 8)
+
+        with self.assertRaises(AssertionError):
+            await self.client.query([])
+
+        self.status = 400
+        with self.assertRaises(JobClientError):
+            await self.client.query(uuids)
+
+    async def test_submit(self):
+        uuids = await self.client.submit([{'command': 'echo hello world'}])
+        self.assertEqual(len(uuids), 1)
+
+        method, path, _, body = self.requests[0]
+        self.assertEqual((method, path), ('POST', '/rawscheduler'))
+        self.assertEqual(json.loads(body)['jobs'][0]['uuid'], uuids[0])
+
+        self.status = 500
+        with self.assertRaises(JobClientError):
+            await self.client.submit([{'command': 'echo hello world'}])
+
+        client = AsyncJobClient(url='http://127.0.0.1:1', http_user='foo', http_password='secret')
+        try:
+            with self.assertRaises(JobSubmitError) as ctx:
+                await client.submit([{'command': 'echo hello world'}])
+            self.assertEqual(ctx.exception.submitted, [])
+            self.assertEqual(ctx.exception.unknown, [])
+            self.assertEqual(len(ctx.exception.failed), 1)
+        finally:
+            await client.close()
+
+        # Cook may have accepted the jobs of a request which timed out
+        self.status = 201
+        self.delay = 1
+        client = AsyncJobClient(url=str(self.server.make_url('')).rstrip('/'), http_user='foo',
+                                http_password='secret', request_timeout_secs=0.1)
+        try:
+            with self.assertRaises(JobSubmitError) as ctx:
+                await client.submit([{'command': 'echo hello world'}])
+            self.assertEqual(len(ctx.exception.unknown), 1)
+            self.assertEqual(ctx.exception.failed, [])
+        finally:
+            await client.close()
+
+    async def test_submit_iter(self):
+        def generate(n):
+            for i in range(n):
+                yield {'name': 'cookjob_{}'.format(i), 'command': 'echo hello world'}
+
+        uuids = [uuid async for uuid in self.client.submit_iter(generate(10), batch_size=4)]
+        self.assertEqual(len(uuids), 10)
+        self.assertEqual(len(self.requests), 3)
+        bodies = [json.loads(r[3]) for r in self.requests]
+        self.assertEqual([j['uuid'] for b in bodies for j in b['jobs']], uuids)
+
+        async def agenerate(n):
+            for job in generate(n):
+                yield job
+
+        self.assertEqual(len([uuid async for uuid in self.client.submit_iter(agenerate(3))]), 3)
+        self.assertEqual(len(self.requests), 4)
+
+        self.status = 500
+        with self.assertRaises(JobSubmitError) as ctx:
+            [uuid async for uuid in self.client.submit_iter(generate(10), batch_size=2)]
+        self.assertEqual(ctx.exception.submitted, [])
+        self.assertEqual(len(ctx.exception.failed), 6)
+        self.assertEqual(len(self.requests), 7)
+
+    async def test_transient_failures(self):
+        uuid = self._jobs[0]['uuid']
+        client = AsyncJobClient(url=str(self.server.make_url('')).rstrip('/'), http_user='foo',
+                                http_password='secret', retry_policy=RetryPolicy(backoff_secs=0.01))
+        try:
+            self.failures = [503, 502]
+            self.assertSequenceEqual(await client.query([uuid]), self._jobs[:1])
+            self.assertEqual(len(self.requests), 3)
+
+            self.failures = [503] * 4
+            with self.assertRaises(JobClientError):
+                await client.query([uuid])
+            self.assertEqual(len(self.requests), 7)
+        finally:
+            await client.close()
+
+    async def test_circuit_breaker(self):
+        uuid = self._jobs[0]['uuid']
+        client = AsyncJobClient(url=str(self.server.make_url('')).rstrip('/'), http_user='foo',
+                                http_password='secret', circuit_breaker=CircuitBreaker(failure_threshold=2))
+        try:
+            self.status = 500
+            for _ in range(2):
+                with self.assertRaises(JobClientError):
+                    await client.query([uuid])
+            with self.assertRaises(CircuitOpenError):
+                await client.query([uuid])
+            self.assertEqual(len(self.requests), 2)
+        finally:
+            await client.close()
+
+    async def test_rate_limits(self):
+        uuid = self._jobs[0]['uuid']
+        limit = AdaptiveConcurrency(initial_limit=4, cooldown_secs=0)
+        client = AsyncJobClient(url=str(self.server.make_url('')).rstrip('/'), http_user='foo',
+                                http_password='secret', rate_limiter=RateLimiter({'/rawscheduler': (100, 1)}),
+                                concurrency_limit=limit)
+        try:
+            self.failures = [429]
+            with self.assertRaises(JobClientError):
+                await client.query([uuid])
+            self.assertEqual(limit.limit, 2)
+
+            self.assertSequenceEqual(await client.query([job['uuid'] for job in self._jobs]), self._jobs)
+            self.assertEqual(limit.in_flight, 0)
+        finally:
+            await client.close()
+
+    async def test_watch(self):
+        uuids = [job['uuid'] for job in self._jobs]
+        changes = [change async for change in self.client.watch(uuids, timeout=10)]
+        self.assertEqual([change.uuid for change in changes], uuids)
+        self.assertTrue(all(change.job['status'] == 'completed' for change in changes))
+        self.assertEqual(changes[0].changes[0].field, 'status')
+
+    async def test_delete(self):
+        self.assertIsNone(await self.client.delete([job['uuid'] for job in self._jobs]))
+        self.assertEqual(len(self.requests), 8)
+        self.assertTrue(all(r[0] == 'DELETE' for r in self.requests))
+
+    async def test_retry(self):
+        uuids = [job['uuid'] for job in self._jobs]
+        self.assertEqual(await self.client.retry(uuids, retries=10), dict((u, None) for u in uuids))
+        self.assertEqual(len(self.requests), 8)
+        self.assertEqual(self.requests[0][2]['retries'], '10')
+        self.assertEqual(len(self.requests[0][2].getall('job')), 4)
+
+        # a rejected batch is split until the unknown job is found
+        self.requests = list()
+        self.failures = [400, 400, 400]
+        ret = await self.client.retry(uuids[:4], retries=10)
+        self.assertEqual([u for u in uuids[:4] if ret[u] is not None], uuids[:1])
+        self.assertEqual([len(r[2].getall('job')) for r in self.requests], [4, 2, 1, 1, 2])
+
+        self.status = 400
+        ret = await self.client.retry(uuids[:1], retries=10)
+        self.assertIsInstance(ret[uuids[0]], JobClientError)
+
+    async def test_list(self):
+        self.assertSequenceEqual(await self.client.list(user='foo'), self._jobs)
+
+    async def test_wait(self):
+        jobs = [job async for job in self.client.wait([job['uuid'] for job in self._jobs])]
+        self.assertSequenceEqual(jobs, self._jobs)
+
+    def test_not_supported(self):
+        self.assertNotIsInstance(self.client, JobClient)
+        for name in ('get_status_poller', 'iter_list', 'list_many', 'delete_where', '__enter__'):
+            self.assertFalse(hasattr(self.client, name))
+        with self.assertRaises(ValueError):
+            AsyncJobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                           health_check_interval_secs=1)
+        with self.assertRaises(AssertionError):
+            ClusterRouter({'east': self.client})
+
+    def test_auth(self):
+        with self.assertRaises(ValueError):
+            AsyncJobClient(url='http://localhost:12310', auth='kerberos')
+
+    def test_query_cache(self):
+        with self.assertRaises(ValueError):
+            AsyncJobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                           query_cache_size=100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from mock import patch, Mock
+from requests import Request
+from requests_kerberos import HTTPKerberosAuth, MutualAuthenticationError, OPTIONAL
+
+from cook.auth import KerberosAuth
+from cook.jobclient import JobClient
+from cook.testing import FakeCookServer
+
+
+@patch.object(HTTPKerberosAuth, 'generate_request_header', return_value='Negotiate dG9rZW4=')
+class KerberosAuthTests(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(HTTPKerberosAuth, 'authenticate_server', return_value=True)
+        self.mock_authenticate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _request(url='http://cook.example.com/rawscheduler', cookie=None):
+        headers = {'Cookie': cookie} if cookie else {}
+        return Request('GET', url, headers=headers).prepare()
+
+    @staticmethod
+    def _response(request, status_code=200, cookies=None, negotiate='Negotiate c2VydmVy'):
+        resp = Mock()
+        resp.status_code = status_code
+        resp.ok = status_code < 400
+        resp.url = request.url
+        resp.request = request
+        resp.headers = {'WWW-Authenticate': negotiate} if negotiate else {}
+        resp.cookies = cookies or {}
+        resp.history = list()
+        return resp
+
+    def test_preemptive(self, mock_generate):
+        with FakeCookServer() as server:
+            with JobClient(url=server.url, auth=KerberosAuth(token_ttl_secs=60)) as client:
+                uuids = client.submit([{'command': 'echo hello world'}])
+                client.query(uuids)
+                client.delete(uuids)
+            self.assertEquals(mock_generate.call_count, 1)
+            self.assertTrue(mock_generate.call_args[1]['is_preemptive'])
+
+            with JobClient(url=server.url, auth=KerberosAuth()) as client:
+                client.query(uuids)
+                client.query(uuids)
+            self.assertEquals(mock_generate.call_count, 3)
+
+    def test_token_expiry(self, mock_generate):
+        auth = KerberosAuth(token_ttl_secs=60)
+        with patch('cook.auth.time.time', return_value=100):
+            auth(self._request())
+            auth(self._request())
+            auth(self._request('http://other.example.com/rawscheduler'))
+        self.assertEquals(mock_generate.call_count, 2)
+
+        with patch('cook.auth.time.time', return_value=161):
+            self.assertEquals(auth(self._request()).headers['Authorization'], 'Negotiate dG9rZW4=')
+        self.assertEquals(mock_generate.call_count, 3)
+
+    def test_rejected(self, mock_generate):
+        auth = KerberosAuth(token_ttl_secs=60)
+        request = auth(self._request())
+
+        resp = self._response(request, 401)
+        retried = self._response(request)
+        resp.connection.send.return_value = retried
+        self.assertIs(auth._handle_response(resp), retried)
+        self.assertEquals(mock_generate.call_count, 2)
+        self.assertEquals(retried.history, [resp])
+
+        # no second attempt
+        rejected = self._response(retried.request, 401)
+        self.assertIs(auth._handle_response(rejected), rejected)
+
+    def test_mutual_authentication(self, mock_generate):
+        auth = KerberosAuth()
+        self.assertIsNotNone(auth._handle_response(self._response(auth(self._request()))))
+        self.assertEquals(self.mock_authenticate.call_count, 1)
+
+        self.mock_authenticate.return_value = False
+        with self.assertRaises(MutualAuthenticationError):
+            auth._handle_response(self._response(auth(self._request())))
+
+        # the server must authenticate itself, unless the request failed
+        with self.assertRaises(MutualAuthenticationError):
+            auth._handle_response(self._response(auth(self._request()), negotiate=None))
+        auth._handle_response(self._response(auth(self._request()), 500, negotiate=None))
+
+        auth = KerberosAuth(mutual_authentication=OPTIONAL)
+        auth._handle_response(self._response(auth(self._request()), negotiate=None))
+        with self.assertRaises(MutualAuthenticationError):
+            auth._handle_response(self._response(auth(self._request())))
+
+        # reused tokens have no security context of their own
+        auth = KerberosAuth(token_ttl_secs=60)
+        self.mock_authenticate.reset_mock()
+        self.mock_authenticate.return_value = True
+        auth._handle_response(self._response(auth(self._request())))
+        auth._handle_response(self._response(auth(self._request())))
+        self.assertEquals(self.mock_authenticate.call_count, 1)
+
+    def test_cookies(self, mock_generate):
+        auth = KerberosAuth()
+        request = auth(self._request())
+        auth._handle_response(self._response(request, cookies={'session': 'abc'}))
+
+        # the session cookie authenticates the next requests
+        self.assertNotIn('Authorization', auth(self._request(cookie='session=abc')).headers)
+        self.assertIn('Authorization', auth(self._request()).headers)
+
+        # the cookie is not enough anymore
+        request = auth(self._request(cookie='session=abc'))
+        resp = self._response(request, 401)
+        resp.connection.send.return_value = self._response(request, cookies={'session': 'def'})
+        auth._handle_response(auth._handle_response(resp))
+        self.assertIn('Authorization', auth(self._request(cookie='session=def')).headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
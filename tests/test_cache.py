@@ -0,0 +1,119 @@
+import os
+import json
+import threading
+import unittest
+from mock import patch
+
+from cook.cache import JobCache
+from cook.jobclient import JobClient, JobClientError
+
+from .helpers import mock_response
+
+
+class JobCacheTests(unittest.TestCase):
+    def setUp(self):
+        with open("{}/test_jobs.json".format(os.path.dirname(__file__)), 'r') as f:
+            self._jobs = json.loads(f.read())
+
+        self.client = JobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                                query_cache_size=100, query_cache_ttl_secs=5)
+
+    @patch('time.time')
+    def test_expiry(self, mock_time):
+        mock_time.return_value = 0
+        cache = JobCache(max_size=2, ttl_secs=5)
+        running = dict(self._jobs[1], status='running')
+
+        _, _, claimed = cache.lookup([self._jobs[0]['uuid'], running['uuid']])
+        cache.fulfill(claimed, [self._jobs[0], running])
+
+        hits, inflight, claimed = cache.lookup([self._jobs[0]['uuid'], running['uuid']])
+        self.assertEquals(hits, {self._jobs[0]['uuid']: self._jobs[0], running['uuid']: running})
+        self.assertEquals(claimed, [])
+
+        # completed jobs never expire, the other ones do
+        mock_time.return_value = 10
+        hits, inflight, claimed = cache.lookup([self._jobs[0]['uuid'], running['uuid']])
+        self.assertEquals(list(hits.keys()), [self._jobs[0]['uuid']])
+        self.assertEquals(claimed, [running['uuid']])
+
+        # the least recently used job gets evicted
+        cache.fulfill(claimed + [self._jobs[2]['uuid']], [running, self._jobs[2]])
+        self.assertEquals(len(cache), 2)
+        _, _, claimed = cache.lookup([self._jobs[0]['uuid']])
+        self.assertEquals(claimed, [self._jobs[0]['uuid']])
+
+    def test_coalescing(self):
+        cache = JobCache()
+
+        _, _, claimed = cache.lookup([self._jobs[0]['uuid']])
+        hits, inflight, others = cache.lookup([self._jobs[0]['uuid'], self._jobs[1]['uuid']])
+        self.assertEquals(list(inflight.keys()), [self._jobs[0]['uuid']])
+        self.assertEquals(others, [self._jobs[1]['uuid']])
+
+        cache.fulfill(claimed, [self._jobs[0]])
+        self.assertEquals(inflight[self._jobs[0]['uuid']].result(), self._jobs[0])
+
+        error = JobClientError('boom')
+        cache.fail(others, error)
+        _, _, claimed = cache.lookup([self._jobs[1]['uuid']])
+        self.assertEquals(claimed, [self._jobs[1]['uuid']])
+
+    @patch('requests.Session.get')
+    def test_query(self, mock_get):
+        mock_get.return_value = mock_response(json_data=self._jobs[:2])
+        uuids = [self._jobs[0]['uuid'], self._jobs[1]['uuid']]
+
+        self.assertEquals(self.client.query(uuids), self._jobs[:2])
+        self.assertEquals(self.client.query(uuids), self._jobs[:2])
+        self.assertEquals(mock_get.call_count, 1)
+
+        # only the missing jobs are queried
+        mock_get.return_value = mock_response(json_data=[self._jobs[2]])
+        self.assertEquals(self.client.query(uuids + [self._jobs[2]['uuid']]), self._jobs[:3])
+        self.assertEquals(mock_get.call_count, 2)
+        self.assertNotIn(self._jobs[0]['uuid'], mock_get.call_args[0][0])
+
+        # retried jobs are queried again
+        with patch('requests.Session.post') as mock_post:
+            mock_post.return_value = mock_response(status_code=201)
+            self.client.retry([self._jobs[2]['uuid']], retries=2)
+        self.client.query([self._jobs[2]['uuid']])
+        self.assertEquals(mock_get.call_count, 3)
+
+        # errors are not cached
+        mock_get.return_value = mock_response(status_code=500)
+        with self.assertRaises(JobClientError):
+            self.client.query([self._jobs[3]['uuid']])
+        with self.assertRaises(JobClientError):
+            self.client.query([self._jobs[3]['uuid']])
+        self.assertEquals(mock_get.call_count, 5)
+
+    @patch('requests.Session.get')
+    def test_concurrent_query(self, mock_get):
+        started = threading.Event()
+        release = threading.Event()
+
+        def get(url, **kwargs):
+            started.set()
+            release.wait(5)
+            return mock_response(json_data=[self._jobs[0]])
+
+        mock_get.side_effect = get
+
+        results = list()
+        first = threading.Thread(target=lambda: results.append(self.client.query([self._jobs[0]['uuid']])))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=lambda: results.append(self.client.query([self._jobs[0]['uuid']])))
+        second.start()
+        release.set()
+        first.join()
+        second.join()
+
+        self.assertEquals(results, [[self._jobs[0]], [self._jobs[0]]])
+        self.assertEquals(mock_get.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import json
+import unittest
+from mock import patch
+
+from cook.codec import Codec, default_codec
+
+
+class CodecTests(unittest.TestCase):
+    def _codecs(self):
+        ret = list()
+        for backend in Codec.backends:
+            try:
+                ret.append(Codec(backend))
+            except ValueError:
+                pass
+        return ret
+
+    def test_backends(self):
+        self.assertIn(default_codec.name, Codec.backends)
+        self.assertEquals(Codec('json').name, 'json')
+        with self.assertRaises(ValueError):
+            Codec('yaml')
+
+    def test_roundtrip(self):
+        data = {'jobs': [{'uuid': '2413bf75-1587-4a69-82e2-63cc4b0d656d', 'command': u'echo h\u00e9llo', 'mem': 128.5,
+                          'env': {}, 'uris': []}]}
+        for codec in self._codecs():
+            encoded = codec.dumps(data)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEquals(json.loads(encoded.decode('utf-8')), data)
+            self.assertEquals(codec.loads(encoded), data)
+
+    def test_byte_string_backend(self):
+        # ujson returns UTF-8 byte strings on Python 2
+        encoded = u'{"command":"echo h\u00e9llo"}'.encode('utf-8')
+        with patch('cook.codec.ujson') as mock_ujson:
+            mock_ujson.dumps.return_value = encoded
+            self.assertEquals(Codec('ujson').dumps({'command': u'echo h\u00e9llo'}), encoded)
+
+    def test_loads_arrays(self):
+        for codec in self._codecs():
+            self.assertEquals(codec.loads_arrays([b'[{"a": 1}, {"b": 2}]', b' [] ', b'[{"c": 3}]\n']),
+                              [{'a': 1}, {'b': 2}, {'c': 3}])
+            self.assertEquals(codec.loads_arrays([b'[]', b'[]']), [])
+            self.assertEquals(codec.loads_arrays([b'[1]']), [1])
+            with self.assertRaises(ValueError):
+                codec.loads_arrays([b'[1]', b'{"error": "oops"}'])
+
+
+if __name__ == "__main__":
+    unittest.main()
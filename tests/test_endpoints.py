@@ -0,0 +1,88 @@
+import unittest
+from datetime import datetime
+from mock import patch
+
+from cook.endpoints import EndpointPool
+from cook.jobclient import JobClient
+from cook.testing import FakeCookServer
+
+
+class EndpointPoolTests(unittest.TestCase):
+    def test_select(self):
+        pool = EndpointPool(['http://a/', 'http://b', 'http://c'], quarantine_secs=10)
+        self.assertEquals(pool.urls, ['http://a', 'http://b', 'http://c'])
+        self.assertEquals(sorted(pool.select() for _ in range(3)), pool.urls)
+        self.assertEquals(pool.select(write=True), 'http://a')
+
+        pool.set_leader('http://b/')
+        self.assertEquals(pool.select(write=True), 'http://b')
+        pool.set_leader('http://elsewhere')
+        self.assertIsNone(pool.leader)
+
+        with patch('cook.endpoints.time.time', return_value=100):
+            pool.mark_failed('http://a')
+            pool.mark_failed('http://b')
+            self.assertEquals(pool.healthy(), ['http://c'])
+            self.assertEquals(set(pool.select() for _ in range(3)), set(['http://c']))
+            self.assertEquals(pool.select(exclude=['http://c']), 'http://a')
+
+            pool.mark_healthy('http://b')
+            self.assertEquals(pool.healthy(), ['http://b', 'http://c'])
+
+        with patch('cook.endpoints.time.time', return_value=111):
+            self.assertEquals(pool.healthy(), pool.urls)
+
+    def test_check(self):
+        pool = EndpointPool(['http://a', 'http://b'])
+
+        def get_info(url):
+            if url == 'http://a':
+                raise IOError('unreachable')
+            return {'leader-url': 'http://b'}
+
+        pool.check(get_info)
+        self.assertEquals(pool.healthy(), ['http://b'])
+        self.assertEquals(pool.leader, 'http://b')
+
+
+class MultiEndpointClientTests(unittest.TestCase):
+    def setUp(self):
+        self.servers = [FakeCookServer(), FakeCookServer()]
+        for server in self.servers:
+            server.start()
+        for server in self.servers:
+            server.leader_url = self.servers[1].url
+
+    def tearDown(self):
+        for server in self.servers:
+            server.stop()
+
+    def test_load_balancing(self):
+        with JobClient(url=[s.url for s in self.servers], http_user='foo', http_password='secret',
+                       health_check_interval_secs=60) as client:
+            client.get_endpoints().check(client._get_info)
+            self.assertEquals(client.get_endpoints().leader, self.servers[1].url)
+
+            for _ in range(4):
+                client.list('foo', 'running', datetime.now())
+            client.submit([{'command': 'echo hello world'}])
+
+        for server in self.servers:
+            self.assertEquals(server.get_request_counts()[('GET', '/list')], 2)
+        self.assertEquals(len(self.servers[0].get_jobs()), 0)
+        self.assertEquals(len(self.servers[1].get_jobs()), 1)
+
+    def test_failover(self):
+        with JobClient(url=['http://127.0.0.1:1', self.servers[0].url], http_user='foo',
+                       http_password='secret') as client:
+            uuids = client.submit([{'command': 'echo hello world'}])
+            self.assertEquals(len(client.query(uuids)), 1)
+            self.assertEquals(client.get_endpoints().healthy(), [self.servers[0].url])
+
+        with JobClient(url=['http://127.0.0.1:1'], http_user='foo', http_password='secret') as client:
+            with self.assertRaises(Exception):
+                client.query(uuids)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,20 @@
 import os
+import threading
+import time
 import unittest
 import json
-from mock import patch, Mock
-from requests import HTTPError
+from datetime import datetime, timedelta
+from mock import patch
+from requests import ConnectionError, ConnectTimeout, HTTPError, Timeout
 from schema import SchemaError
 from uuid import UUID
 from cook.jobclient import JobClient, JobClientError
-from cook.utils import generate_batch_request
-from requests_kerberos import HTTPKerberosAuth
+from cook.auth import KerberosAuth
+from cook.exceptions import JobSubmitError, JobValidationError
+from cook.testing import FakeCookServer
+from cook.utils import generate_batch_request, generate_batch_queries
+
+from .helpers import mock_response
 
 
 class JobClientTests(unittest.TestCase):
@@ -28,11 +35,32 @@ class JobClientTests(unittest.TestCase):
         self.assertEquals(client.get_auth(), ('foo', 'secret'))
 
         client = JobClient(url='http://localhost:12310', auth='kerberos')
-        self.assertIs(type(client.get_auth()), HTTPKerberosAuth)
+        self.assertIs(type(client.get_auth()), KerberosAuth)
 
     def test_url(self):
         self.assertEquals(self.client.get_url(), 'http://localhost:12310')
 
+    def test_session(self):
+        with JobClient(url='http://localhost:12310', http_user='foo', http_password='secret', pool_size=4) as client:
+            adapter = client._session.get_adapter('http://localhost:12310')
+            self.assertEquals(adapter._pool_maxsize, 4)
+            self.assertEquals(client._session.auth, ('foo', 'secret'))
+
+        with patch('requests.Session.close') as mock_close:
+            with JobClient(url='http://localhost:12310', http_user='foo', http_password='secret') as client:
+                pass
+        self.assertTrue(mock_close.called)
+
+    @patch('requests.Session.get')
+    def test_session_reuse(self, mock_get):
+        mock_get.return_value = mock_response(json_data=self._jobs)
+
+        session = self.client._session
+        self.client.query([job['uuid'] for job in self._jobs])
+        self.client.list()
+        self.assertIs(self.client._session, session)
+        self.assertEquals(mock_get.call_count, 2)
+
     def test_default_job_settings(self):
         self.assertDictEqual(self.client.get_default_job_settings(), {'max_retries': 10})
 
@@ -57,32 +85,44 @@ class JobClientTests(unittest.TestCase):
 
         self.assertEquals(generate_batch_request([job['uuid'] for job in self._jobs], 4), expected)
 
-    @staticmethod
-    def _mock_response(status_code=200, json_data=None):
-        mock_resp = Mock()
-        mock_resp.status_code = status_code
+    def test_batch_queries(self):
+        uuids = [job['uuid'] for job in self._jobs]
 
-        if json_data:
-            mock_resp.json = Mock(
-                return_value=json_data
-            )
+        batch = generate_batch_queries('/rawscheduler?', uuids, 4)
+        self.assertEquals([b for b, _ in batch], [uuids[i:i + 4] for i in range(0, 30, 4)])
+        self.assertEquals([q for _, q in batch],
+                          ['/rawscheduler?' + '&'.join(r) for r in generate_batch_request(uuids, 4)])
 
-        if status_code >= 300:
-            mock_resp.raise_for_status = Mock()
-            mock_resp.raise_for_status.side_effect = HTTPError()
+        # as many jobs as fit in the maximum length
+        batch = generate_batch_queries('/retry?', uuids, max_length=200, suffix='&retries=3')
+        self.assertTrue(all(len(q) <= 200 for _, q in batch))
+        self.assertEquals([len(b) for b, _ in batch], [4] * 7 + [2])
+        self.assertEquals([u for b, _ in batch for u in b], uuids)
+        self.assertTrue(batch[0][1].startswith('/retry?job=') and batch[0][1].endswith('&retries=3'))
 
-        return mock_resp
+        # a job longer than the maximum length still gets its own query
+        self.assertEquals(generate_batch_queries('/rawscheduler?', uuids[:2], max_length=10),
+                          [([u], '/rawscheduler?job=' + u) for u in uuids[:2]])
+
+    @patch('requests.Session.get')
+    def test_query_url_length(self, mock_get):
+        mock_get.return_value = mock_response(json_data=self._jobs)
+        client = JobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                           batch_request_size=None, max_url_length=512)
+        client.query([job['uuid'] for job in self._jobs])
+        self.assertEquals(mock_get.call_count, 3)
+        self.assertTrue(all(len(c[0][0]) <= 512 for c in mock_get.call_args_list))
 
     @patch('requests.Session.get')
     def test_query(self, mock_get):
-        mock_resp = self._mock_response(json_data=self._jobs)
+        mock_resp = mock_response(json_data=self._jobs)
         mock_get.return_value = mock_resp
 
         jobs = self.client.query([job['uuid'] for job in self._jobs])
         self.assertSequenceEqual(jobs, self._jobs)
 
         job = [j for j in self._jobs if j['uuid'] == '15dd9380-a628-11e7-b27b-3cfdfea21a98']
-        mock_resp = self._mock_response(json_data=job)
+        mock_resp = mock_response(json_data=job)
         mock_get.return_value = mock_resp
 
         # should work with a list parameter
@@ -99,16 +139,36 @@ class JobClientTests(unittest.TestCase):
 
         # test a number of failed requests
         for code in [400, 401, 403, 404]:
-            mock_resp = self._mock_response(status_code=code)
+            mock_resp = mock_response(status_code=code)
             mock_get.return_value = mock_resp
 
             with self.assertRaises(JobClientError):
                 self.client.query(['2413bf75-1587-4a69-82e2-63cc4b0d656d'])
 
-    @patch('requests.post')
+    @patch('requests.Session.get')
+    def test_query_concurrent(self, mock_get):
+        jobs = dict((job['uuid'], job) for job in self._jobs)
+
+        def get(url, **kwargs):
+            uuids = [p.split('=')[1] for p in url.split('?')[1].split('&')]
+            return mock_response(json_data=[jobs[u] for u in uuids])
+
+        mock_get.side_effect = get
+        with JobClient(url='http://localhost:12310', http_user='foo', http_password='secret', batch_request_size=3,
+                       max_concurrency=4) as client:
+            self.assertSequenceEqual(client.query([job['uuid'] for job in self._jobs]), self._jobs)
+            self.assertEquals(mock_get.call_count, 10)
+
+            # the first failure is raised
+            mock_get.side_effect = None
+            mock_get.return_value = mock_response(status_code=500)
+            with self.assertRaises(JobClientError):
+                client.query([job['uuid'] for job in self._jobs])
+
+    @patch('requests.Session.post')
     def test_submit(self, mock_post):
         expected = ['15dd97d6-a628-11e7-b27b-3cfdfea21a98']
-        mock_resp = self._mock_response(status_code=201)
+        mock_resp = mock_response(status_code=201)
         mock_post.return_value = mock_resp
         self.assertSequenceEqual(self.client.submit([{
             'uuid': '15dd97d6-a628-11e7-b27b-3cfdfea21a98',
@@ -382,7 +442,7 @@ class JobClientTests(unittest.TestCase):
 
         # test a number of failed requests
         for code in [400, 401, 409, 500]:
-            mock_resp = self._mock_response(status_code=code)
+            mock_resp = mock_response(status_code=code)
             mock_post.return_value = mock_resp
 
             with self.assertRaises(JobClientError):
@@ -392,9 +452,137 @@ class JobClientTests(unittest.TestCase):
                     }
                 ])
 
-    @patch('requests.delete')
+    @patch('requests.Session.post')
+    def test_validation(self, mock_post):
+        mock_post.return_value = mock_response(status_code=201)
+
+        # every error of every job is reported at once
+        with self.assertRaises(JobValidationError) as ctx:
+            self.client.submit([
+                {'command': 'echo hello world'},
+                {'cpus': 0, 'priority': 101},
+                {'foo': 'bar'}
+            ])
+        self.assertEquals(sorted(ctx.exception.job_errors.keys()), [1, 2])
+        self.assertEquals(len(ctx.exception.job_errors[1]), 2)
+        self.assertIn('foo', ctx.exception.job_errors[2][0])
+        self.assertFalse(mock_post.called)
+
+        # values are cast like schema's Use() did
+        self.client.submit([{'priority': '50', 'max_retries': 2.0}])
+
+        with self.assertRaises(SchemaError):
+            self.client.submit([{'priority': 'high'}])
+
+        # validation can be turned off for trusted producers
+        client = JobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                           validate_jobs=False)
+        self.assertEquals(len(client.submit([{'cpus': 0}])), 1)
+
+    @patch('requests.Session.post')
+    def test_submit_chunks(self, mock_post):
+        jobs = [{'command': 'echo hello world'} for _ in range(10)]
+
+        client = JobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                           submit_batch_size=4)
+        mock_post.return_value = mock_response(status_code=201)
+        uuids = client.submit(jobs)
+        self.assertSequenceEqual(uuids, [j['uuid'] for j in jobs])
+        self.assertEquals(mock_post.call_count, 3)
+        self.assertEquals([len(json.loads(c[1]['data'])['jobs']) for c in mock_post.call_args_list], [4, 4, 2])
+
+        # the second chunk fails, the last one is never sent
+        mock_post.reset_mock()
+        mock_post.return_value = None
+        mock_post.side_effect = [mock_response(status_code=201), mock_response(status_code=500)]
+        with self.assertRaises(JobSubmitError) as ctx:
+            client.submit(jobs)
+        self.assertSequenceEqual(ctx.exception.submitted, uuids[:4])
+        self.assertSequenceEqual(ctx.exception.failed, uuids[4:])
+        self.assertEquals(mock_post.call_count, 2)
+
+        # so does a chunk timing out, Cook may have accepted it
+        mock_post.reset_mock()
+        mock_post.side_effect = [mock_response(status_code=201), Timeout()]
+        with self.assertRaises(JobSubmitError) as ctx:
+            client.submit(jobs)
+        self.assertSequenceEqual(ctx.exception.submitted, uuids[:4])
+        self.assertSequenceEqual(ctx.exception.unknown, uuids[4:8])
+        self.assertSequenceEqual(ctx.exception.failed, uuids[8:])
+
+        # unlike a chunk which could not connect
+        mock_post.reset_mock()
+        mock_post.side_effect = [mock_response(status_code=201), ConnectTimeout()]
+        with self.assertRaises(JobSubmitError) as ctx:
+            client.submit(jobs)
+        self.assertSequenceEqual(ctx.exception.unknown, [])
+        self.assertSequenceEqual(ctx.exception.failed, uuids[4:])
+
+        # in parallel, every chunk is sent
+        client = JobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                           submit_batch_size=4, max_concurrency=4)
+        mock_post.reset_mock()
+        mock_post.side_effect = None
+        mock_post.return_value = mock_response(status_code=201)
+        self.assertSequenceEqual(client.submit(jobs), uuids)
+        self.assertEquals(mock_post.call_count, 3)
+        client.close()
+
+    @patch('requests.Session.post')
+    def test_submit_iter(self, mock_post):
+        mock_post.return_value = mock_response(status_code=201)
+
+        def generate(n):
+            for i in range(n):
+                yield {'name': 'cookjob_{}'.format(i), 'command': 'echo hello world'}
+
+        uuids = list(self.client.submit_iter(generate(10), batch_size=4))
+        self.assertEquals(len(uuids), 10)
+        self.assertEquals(mock_post.call_count, 3)
+        bodies = [json.loads(c[1]['data']) for c in mock_post.call_args_list]
+        self.assertEquals([j['uuid'] for b in bodies for j in b['jobs']], uuids)
+        self.assertEquals(bodies[0]['jobs'][0]['max_retries'], 10)
+
+        # batches are capped in bytes as well
+        mock_post.reset_mock()
+        self.assertEquals(len(list(self.client.submit_iter(generate(3), max_batch_bytes=300))), 3)
+        self.assertEquals(mock_post.call_count, 2)
+        self.assertTrue(all(len(c[1]['data']) <= 300 for c in mock_post.call_args_list))
+
+        # jobs are validated one by one
+        with self.assertRaises(SchemaError):
+            list(self.client.submit_iter(iter([{'cpus': 0}])))
+
+        # concurrent batches
+        with JobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                       max_concurrency=3) as client:
+            mock_post.reset_mock()
+            self.assertEquals(len(list(client.submit_iter(generate(10), batch_size=2))), 10)
+            self.assertEquals(mock_post.call_count, 5)
+
+            mock_post.reset_mock()
+            mock_post.return_value = mock_response(status_code=500)
+            with self.assertRaises(JobSubmitError) as ctx:
+                list(client.submit_iter(generate(10), batch_size=2))
+            self.assertEquals(ctx.exception.submitted, [])
+            self.assertTrue(len(ctx.exception.failed) > 0)
+
+            mock_post.return_value = None
+            mock_post.side_effect = ConnectionError()
+            with self.assertRaises(JobSubmitError):
+                list(client.submit_iter(generate(10), batch_size=2))
+
+        # a timed out batch may have been accepted
+        mock_post.side_effect = [mock_response(status_code=201), Timeout()]
+        with self.assertRaises(JobSubmitError) as ctx:
+            list(self.client.submit_iter(generate(4), batch_size=2))
+        self.assertEquals(len(ctx.exception.submitted), 2)
+        self.assertEquals(len(ctx.exception.unknown), 2)
+        self.assertEquals(ctx.exception.failed, [])
+
+    @patch('requests.Session.delete')
     def test_delete(self, mock_delete):
-        mock_resp = self._mock_response(status_code=204)
+        mock_resp = mock_response(status_code=204)
         mock_delete.return_value = mock_resp
         self.assertIsNone(self.client.delete([job['uuid'] for job in self._jobs]))
 
@@ -411,20 +599,55 @@ class JobClientTests(unittest.TestCase):
 
         # test failures
         for code in [400, 403]:
-            mock_resp = self._mock_response(status_code=code)
+            mock_resp = mock_response(status_code=code)
             mock_delete.return_value = mock_resp
 
             with self.assertRaises(JobClientError):
                 self.client.delete(["15dd9380-a629-11e7-b27b-3cfdfea21a98G"])
 
-    @patch('requests.post')
-    def test_delete(self, mock_post):
-        mock_resp = self._mock_response(status_code=204)
+    def test_delete_where(self):
+        with FakeCookServer(job_runtime_secs=60) as server:
+            with JobClient(url=server.url, http_user='foo', http_password='secret', max_concurrency=3) as client:
+                start = datetime.utcnow() - timedelta(minutes=1)
+                uuids = client.submit([{'command': 'echo hello world', 'name': "job-{}".format(i % 2)}
+                                       for i in range(20)])
+
+                progress = list()
+                outcomes = client.delete_where(user='foo', start_time=start, predicate=lambda j: j['name'] == 'job-0',
+                                               batch_size=3, progress=lambda *c: progress.append(c))
+
+                self.assertEquals(sorted(outcomes), sorted(uuids[::2]))
+                self.assertTrue(all(e is None for e in outcomes.values()))
+                self.assertEquals(len(progress), 4)
+                self.assertEquals(max(progress), (20, 10, 0))
+                states = dict((job['uuid'], job['state']) for job in server.get_jobs())
+                self.assertEquals(set(states[u] for u in uuids[::2]), set(['failed']))
+                self.assertEquals(set(states[u] for u in uuids[1::2]), set(['running']))
+
+                # killed jobs are not listed anymore, the last week is listed by default
+                self.assertEquals(client.delete_where(user='foo', predicate=lambda j: j['name'] == 'job-0'), {})
+
+                with patch.object(client, '_api_request', side_effect=HTTPError('boom')):
+                    with patch.object(client, 'iter_list', return_value=iter(server.get_jobs())):
+                        outcomes = client.delete_where(user='foo', start_time=start, batch_size=5)
+                self.assertEquals(len(outcomes), 20)
+                self.assertTrue(all(isinstance(e, JobClientError) for e in outcomes.values()))
+
+    @patch('requests.Session.post')
+    def test_retry(self, mock_post):
+        mock_resp = mock_response(status_code=204)
         mock_post.return_value = mock_resp
-        self.assertIsNone(self.client.retry([job['uuid'] for job in self._jobs], retries=10))
+        uuids = [job['uuid'] for job in self._jobs]
+        self.assertEquals(self.client.retry(uuids, retries=10), dict((u, None) for u in uuids))
+
+        # jobs are retried in batches
+        self.assertEquals(mock_post.call_count, 1)
+        self.assertEquals(mock_post.call_args[0][0].count('job='), 30)
+        self.assertTrue(mock_post.call_args[0][0].endswith('&retries=10'))
 
         # should work with a list parameter
-        self.assertIsNone(self.client.retry(['15dd9380-a628-11e7-b27b-3cfdfea21a98'], retries=10))
+        self.assertEquals(self.client.retry(['15dd9380-a628-11e7-b27b-3cfdfea21a98'], retries=10),
+                          {'15dd9380-a628-11e7-b27b-3cfdfea21a98': None})
 
         # should fail with a string
         with self.assertRaises(AssertionError):
@@ -448,34 +671,187 @@ class JobClientTests(unittest.TestCase):
 
         # test failures
         for code in [400, 403]:
-            mock_resp = self._mock_response(status_code=code)
+            mock_resp = mock_response(status_code=code)
             mock_post.return_value = mock_resp
 
-            with self.assertRaises(JobClientError):
-                self.client.retry(["15dd9380-a629-11e7-b27b-3cfdfea21a98G"], retries=10)
+            ret = self.client.retry(["15dd9380-a629-11e7-b27b-3cfdfea21a98G"], retries=10)
+            self.assertIsInstance(ret["15dd9380-a629-11e7-b27b-3cfdfea21a98G"], JobClientError)
+
+        # a failed batch does not stop the other ones
+        client = JobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                           batch_request_size=10, max_concurrency=2)
+        mock_post.reset_mock()
+        mock_post.return_value = None
+        mock_post.side_effect = lambda url, **kwargs: mock_response(
+            status_code=500 if uuids[10] in url else 201)
+        ret = client.retry(uuids, retries=10)
+        self.assertEquals(mock_post.call_count, 3)
+        self.assertEquals(sorted(u for u, e in ret.items() if e is not None), sorted(uuids[10:20]))
+
+        # so does a batch timing out
+        def post(url, **kwargs):
+            if uuids[10] in url:
+                raise Timeout()
+            return mock_response(status_code=201)
+
+        mock_post.side_effect = post
+        ret = client.retry(uuids, retries=10)
+        self.assertEquals(len(ret), len(uuids))
+        self.assertEquals(sorted(u for u, e in ret.items() if e is not None), sorted(uuids[10:20]))
+        self.assertIsInstance(ret[uuids[10]], JobClientError)
+
+        # a rejected batch is split until the unknown job is found
+        def post(url, **kwargs):
+            if uuids[3] in url:
+                return mock_response(status_code=400)
+            return mock_response(status_code=201)
+
+        mock_post.side_effect = post
+        mock_post.reset_mock()
+        ret = client.retry(uuids, retries=10)
+        self.assertEquals([u for u, e in ret.items() if e is not None], [uuids[3]])
+        self.assertIsInstance(ret[uuids[3]], JobClientError)
+        self.assertEquals(len(ret), len(uuids))
+        self.assertEquals(mock_post.call_count, 3 + 2 * 4)
+        client.close()
 
     @patch('requests.Session.get')
     def test_list(self, mock_get):
-        mock_resp = self._mock_response(status_code=200, json_data=self._jobs)
+        mock_resp = mock_response(status_code=200, json_data=self._jobs)
         mock_get.return_value = mock_resp
 
         self.assertSequenceEqual(self.client.list(), self._jobs)
 
         # test failures
         for code in [400, 403]:
-            mock_resp = self._mock_response(status_code=code)
+            mock_resp = mock_response(status_code=code)
             mock_get.return_value = mock_resp
 
             with self.assertRaises(JobClientError):
                 self.client.list()
 
+    @patch('requests.Session.get')
+    def test_iter_list(self, mock_get):
+        epoch = datetime.utcfromtimestamp(0)
+        submit_times = dict((job['uuid'], job['submit_time']) for job in self._jobs)
+
+        def get(url, **kwargs):
+            params = dict(p.split('=') for p in url.split('?')[1].split('&'))
+            jobs = [job for job in self._jobs
+                    if float(params['start_ms']) <= job['submit_time'] <= float(params['stop_ms'])]
+            return mock_response(json_data=jobs[:int(params['limit'])])
+
+        mock_get.side_effect = get
+        start = epoch + timedelta(milliseconds=min(submit_times.values()))
+        stop = epoch + timedelta(milliseconds=max(submit_times.values()) + 1)
+
+        jobs = list(self.client.iter_list(user='foo', start_time=start, stop_time=stop, limit=4,
+                                          window=stop - start, min_window=timedelta(milliseconds=1)))
+        self.assertEquals(sorted(job['uuid'] for job in jobs), sorted(submit_times.keys()))
+
+        # the jobs are lazily listed
+        calls = mock_get.call_count
+        mock_get.reset_mock()
+        next(self.client.iter_list(user='foo', start_time=start, stop_time=stop, limit=4, window=stop - start,
+                                   min_window=timedelta(milliseconds=1)))
+        self.assertTrue(mock_get.call_count < calls)
+
+        # the last week is listed by default
+        mock_get.reset_mock()
+        mock_get.side_effect = None
+        mock_get.return_value = mock_response(json_data=[])
+        self.assertEquals(list(self.client.iter_list(user='foo', stop_time=stop, window=timedelta(days=7))), [])
+        params = dict(p.split('=') for p in mock_get.call_args[0][0].split('?')[1].split('&'))
+        self.assertEquals(int(params['stop_ms']) - int(params['start_ms']), 7 * 24 * 3600 * 1000)
+        self.assertEquals(list(self.client.iter_list(user='foo')), [])
+
+    @patch('requests.Session.get')
+    def test_list_many(self, mock_get):
+        def get(url, **kwargs):
+            params = dict(p.split('=') for p in url.split('?')[1].split('&'))
+            return mock_response(json_data=[job for job in self._jobs if job['user'] == params['user']])
+
+        mock_get.side_effect = get
+        users = sorted(set(job['user'] for job in self._jobs))
+
+        with JobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                       max_concurrency=3) as client:
+            jobs = list(client.list_many(users))
+            self.assertEquals(sorted(job['uuid'] for job in jobs), sorted(job['uuid'] for job in self._jobs))
+            self.assertEquals(mock_get.call_count, len(users))
+
+            # shards overlapping on the same jobs do not yield them twice
+            mock_get.reset_mock()
+            jobs = list(client.list_many(users, start_time=datetime(2017, 1, 1), stop_time=datetime(2018, 1, 1),
+                                         shards=4))
+            self.assertEquals(len(jobs), len(self._jobs))
+            self.assertEquals(mock_get.call_count, len(users) * 4)
+
+            # without concurrency the users are listed one after the other
+            self.assertEquals(len(list(self.client.list_many(users))), len(self._jobs))
+
+            mock_get.side_effect = None
+            mock_get.return_value = mock_response(status_code=500)
+            with self.assertRaises(JobClientError):
+                list(client.list_many(users))
+
     @patch('requests.Session.get')
     def test_wait(self, mock_get):
-        mock_resp = self._mock_response(status_code=200, json_data=self._jobs)
+        mock_resp = mock_response(status_code=200, json_data=self._jobs)
         mock_get.return_value = mock_resp
 
         self.assertSequenceEqual(list(self.client.wait([job['uuid'] for job in self._jobs])), self._jobs)
 
+        # a wait stopped by another thread returns without sleeping out the polling interval
+        running = dict(self._jobs[0], status='running')
+        mock_get.return_value = mock_response(json_data=[running])
+        stop = threading.Event()
+        timer = threading.Timer(0.1, stop.set)
+        timer.start()
+        start = time.time()
+        self.assertEquals(list(self.client.wait([running['uuid']], stop=stop)), [])
+        self.assertLess(time.time() - start, 5)
+        timer.join()
+
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_wait_pending(self, mock_get, mock_sleep):
+        running = dict(self._jobs[1], status='running')
+        mock_get.side_effect = [mock_response(json_data=[self._jobs[0], running]),
+                                mock_response(json_data=[running]),
+                                mock_response(json_data=[self._jobs[1]])]
+
+        client = JobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                           status_update_interval_secs=10, status_update_min_interval_secs=2)
+        uuids = [self._jobs[0]['uuid'], self._jobs[1]['uuid']]
+        self.assertSequenceEqual(list(client.wait(uuids)), [self._jobs[0], self._jobs[1]])
+
+        # the caller's list is left untouched and only the pending jobs are polled again
+        self.assertEquals(len(uuids), 2)
+        self.assertIn('job={}'.format(self._jobs[1]['uuid']), mock_get.call_args_list[1][0][0])
+        self.assertNotIn(self._jobs[0]['uuid'], mock_get.call_args_list[1][0][0])
+
+        # polling slows down after each round
+        self.assertEquals([c[0][0] for c in mock_sleep.call_args_list], [2, 4])
+
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_wait_any_all(self, mock_get, mock_sleep):
+        running = dict(self._jobs[1], status='running')
+        mock_get.return_value = mock_response(json_data=[self._jobs[0], running])
+        uuids = [self._jobs[0]['uuid'], self._jobs[1]['uuid']]
+
+        done, pending = self.client.wait_any(uuids)
+        self.assertSequenceEqual(done, [self._jobs[0]])
+        self.assertEquals(pending, set([self._jobs[1]['uuid']]))
+
+        with patch('time.time') as mock_time:
+            mock_time.side_effect = [0, 5, 20]
+            done, pending = self.client.wait_all(uuids, timeout=15)
+        self.assertSequenceEqual(done, [self._jobs[0]])
+        self.assertEquals(pending, set([self._jobs[1]['uuid']]))
+        self.assertEquals(mock_sleep.call_count, 1)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,77 @@
+import logging
+import unittest
+from mock import Mock
+
+from cook.jobclient import JobClient, JobClientError
+from cook.metrics import Histogram, MetricsCollector, PrometheusExporter, LoggingExporter
+from cook.testing import FakeCookServer
+
+
+class MetricsTests(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeCookServer()
+        self.server.start()
+        self.metrics = MetricsCollector()
+        self.client = JobClient(url=self.server.url, http_user='foo', http_password='secret', batch_request_size=4,
+                                instrumentation=self.metrics)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_histogram(self):
+        h = Histogram([1, 10])
+        for v in (0.5, 1, 5, 50):
+            h.observe(v)
+        self.assertEquals(h.cumulative(), [(1, 2), (10, 3), (float('inf'), 4)])
+        self.assertEquals((h.count, h.sum), (4, 56.5))
+
+    def test_collector(self):
+        uuids = self.client.submit([{'command': 'echo hello world'} for _ in range(10)])
+        self.client.query(uuids)
+        with self.assertRaises(JobClientError):
+            self.client.query(['2413bf75-1587-4a69-82e2-63cc4b0d656d'])
+
+        snapshot = self.metrics.snapshot()
+        self.assertEquals(snapshot['in_flight'], 0)
+        self.assertEquals(snapshot['max_in_flight'], 1)
+
+        submit = snapshot['series'][('POST', '/rawscheduler')]
+        self.assertEquals(submit['status'], {'201': 1})
+        self.assertEquals(submit['batch_size']['sum'], 10)
+        self.assertTrue(submit['request_bytes']['sum'] > 0)
+
+        query = snapshot['series'][('GET', '/rawscheduler')]
+        self.assertEquals(query['status'], {'200': 3, '404': 1})
+        self.assertEquals(query['batch_size']['count'], 4)
+        self.assertEquals(query['batch_size']['sum'], 11)
+        self.assertTrue(query['response_bytes']['sum'] > 0)
+        self.assertEquals(query['latency_secs']['buckets'][-1][1], 4)
+
+        # connection errors are recorded too
+        with JobClient(url='http://127.0.0.1:1', http_user='foo', http_password='secret',
+                       instrumentation=self.metrics) as client:
+            with self.assertRaises(Exception):
+                client.query(uuids[:1])
+        self.assertEquals(self.metrics.snapshot()['series'][('GET', '/rawscheduler')]['status']['error'], 1)
+
+    def test_exporters(self):
+        self.client.submit([{'command': 'echo hello world'}])
+
+        text = PrometheusExporter(self.metrics).render()
+        self.assertIn('cook_jobclient_requests_total{method="POST",endpoint="/rawscheduler",status="201"} 1', text)
+        self.assertIn('cook_jobclient_request_latency_secs_bucket{method="POST",endpoint="/rawscheduler",le="+Inf"} 1',
+                      text)
+        self.assertIn('cook_jobclient_request_batch_size_count{method="POST",endpoint="/rawscheduler"} 1', text)
+        self.assertIn('cook_jobclient_requests_in_flight 0', text)
+
+        logger = Mock()
+        LoggingExporter(self.metrics, logger=logger, level=logging.DEBUG).export()
+        self.assertEquals(logger.log.call_count, 2)
+        args = logger.log.call_args_list[0][0]
+        self.assertEquals(args[0], logging.DEBUG)
+        self.assertIn('POST /rawscheduler: 1 requests', args[1] % args[2:])
+
+
+if __name__ == "__main__":
+    unittest.main()
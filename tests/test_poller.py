@@ -0,0 +1,87 @@
+import os
+import json
+import threading
+import unittest
+from mock import patch
+
+from cook.exceptions import JobClientError
+from cook.jobclient import JobClient
+
+from .helpers import mock_response
+
+
+class StatusPollerTests(unittest.TestCase):
+    def setUp(self):
+        self.client = JobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                                batch_request_size=4)
+
+        with open("{}/test_jobs.json".format(os.path.dirname(__file__)), 'r') as f:
+            self._jobs = json.loads(f.read())
+
+    def tearDown(self):
+        self.client.close()
+
+    @patch('requests.Session.get')
+    def test_register(self, mock_get):
+        running = dict(self._jobs[2], status='running')
+        mock_get.return_value = mock_response(json_data=[self._jobs[0], self._jobs[1], running])
+
+        poller = self.client.get_status_poller()
+        self.assertIs(poller, self.client.get_status_poller())
+
+        # overlapping waiters get their own futures
+        with patch('threading.Thread.start'):
+            first = poller.register([self._jobs[0]['uuid'], self._jobs[1]['uuid']])
+            completed = list()
+            second = poller.register([self._jobs[1]['uuid'], self._jobs[2]['uuid']], callback=completed.append)
+            third = poller.register([self._jobs[2]['uuid']])
+        self.assertIsNot(first[1], second[0])
+        self.assertEquals(len(poller.pending()), 3)
+
+        # a single request covers all the waiters
+        poller.poll()
+        self.assertEquals(mock_get.call_count, 1)
+        self.assertIn('partial=true', mock_get.call_args[0][0])
+        self.assertEquals(first[0].result(), self._jobs[0])
+        self.assertEquals(first[1].result(), self._jobs[1])
+        self.assertEquals(second[0].result(), self._jobs[1])
+        self.assertEquals(completed, [self._jobs[1]])
+        self.assertFalse(second[1].done())
+        self.assertEquals(poller.pending(), [self._jobs[2]['uuid']])
+
+        # a job is polled until all of its waiters cancel
+        second[1].cancel()
+        poller.poll()
+        self.assertEquals(mock_get.call_count, 2)
+        self.assertFalse(third[0].done())
+        third[0].cancel()
+        poller.poll()
+        self.assertEquals(poller.pending(), [])
+        self.assertEquals(mock_get.call_count, 2)
+
+        # unknown jobs fail their waiters rather than being polled forever
+        with patch('threading.Thread.start'):
+            unknown = poller.register(['2413bf75-1587-4a69-82e2-63cc4b0d656d'])
+        poller.poll()
+        self.assertIsInstance(unknown[0].exception(), JobClientError)
+        self.assertEquals(poller.pending(), [])
+
+    @patch('requests.Session.get')
+    def test_background(self, mock_get):
+        mock_get.return_value = mock_response(json_data=self._jobs)
+        done = threading.Event()
+
+        futures = self.client.get_status_poller().register([job['uuid'] for job in self._jobs],
+                                                           callback=lambda job: done.set())
+        self.assertEquals([f.result(timeout=5) for f in futures], self._jobs)
+        self.assertTrue(done.wait(5))
+
+        # pending futures are cancelled when the client is closed
+        mock_get.return_value = mock_response(json_data=[])
+        futures = self.client.get_status_poller().register([self._jobs[0]['uuid']])
+        self.client.close()
+        self.assertTrue(futures[0].cancelled())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import threading
+import unittest
+from mock import patch, Mock
+from requests import ConnectionError
+
+from cook.jobclient import JobClient
+from cook.ratelimit import AdaptiveConcurrency, RateLimiter, TokenBucket
+from cook.testing import FakeCookServer
+
+from .helpers import mock_response
+
+
+class RateLimitTests(unittest.TestCase):
+    def test_token_bucket(self):
+        with patch('cook.ratelimit.time.time', return_value=100):
+            bucket = TokenBucket(rate=2, burst=3)
+            self.assertEquals([bucket.reserve() for _ in range(5)], [0, 0, 0, 0.5, 1])
+
+        # refilled at rate, up to burst
+        with patch('cook.ratelimit.time.time', return_value=102):
+            self.assertEquals(bucket.reserve(), 0)
+        with patch('cook.ratelimit.time.time', return_value=200):
+            self.assertEquals([bucket.reserve() for _ in range(4)], [0, 0, 0, 0.5])
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter({'/rawscheduler': 10, '/list': (1, 2)})
+        with patch('cook.ratelimit.time.time', return_value=100):
+            self.assertEquals([limiter.reserve('/list') for _ in range(3)], [0, 0, 1])
+            self.assertEquals(limiter.reserve('/rawscheduler'), 0)
+            self.assertEquals(limiter.reserve('/retry'), 0)
+
+    def test_adaptive_concurrency(self):
+        limit = AdaptiveConcurrency(initial_limit=2, max_limit=4, latency_target_secs=1, cooldown_secs=10)
+        self.assertTrue(limit.try_acquire())
+        self.assertTrue(limit.try_acquire())
+        self.assertFalse(limit.try_acquire())
+
+        # additive increase, about once per round of requests
+        limit.release(0.1, 200)
+        limit.release(0.1, 200)
+        self.assertEquals(limit.limit, 2)
+        for _ in range(3):
+            limit.acquire()
+            limit.release(0.1, 200)
+        self.assertEquals(limit.limit, 3)
+        self.assertEquals(limit.in_flight, 0)
+
+        # client errors say nothing about the load
+        limit.acquire()
+        limit.release(0.1, 404)
+        self.assertEquals(limit.limit, 3)
+
+        # multiplicative decrease, once per cooldown
+        with patch('cook.ratelimit.time.time', return_value=100):
+            for status in (429, 503, None):
+                limit.acquire()
+                limit.release(0.1, status)
+        self.assertEquals(limit.limit, 1)
+        with patch('cook.ratelimit.time.time', return_value=110):
+            limit.acquire()
+            limit.release(5, 200)
+        self.assertEquals(limit.limit, 1)
+
+        for _ in range(100):
+            limit.acquire()
+            limit.release(0.1, 200)
+        self.assertEquals(limit.limit, 4)
+
+    def test_blocking_acquire(self):
+        limit = AdaptiveConcurrency(initial_limit=1)
+        limit.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            limit.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        limit.release(0.1, 200)
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+
+    @patch('cook.jobclient.requests.Session.get')
+    def test_client_feedback(self, mock_get):
+        limit = AdaptiveConcurrency(initial_limit=8, cooldown_secs=0)
+        limiter = Mock(spec=RateLimiter)
+        client = JobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                           rate_limiter=limiter, concurrency_limit=limit)
+
+        mock_get.return_value = mock_response(429)
+        with self.assertRaises(Exception):
+            client.query(['2413bf75-1587-4a69-82e2-63cc4b0d656d'])
+        self.assertEquals(limit.limit, 4)
+
+        mock_get.side_effect = ConnectionError()
+        with self.assertRaises(ConnectionError):
+            client.list('foo')
+        self.assertEquals(limit.limit, 2)
+        self.assertEquals(limit.in_flight, 0)
+        self.assertEquals([c[0][0] for c in limiter.acquire.call_args_list], ['/rawscheduler', '/list'])
+
+    def test_throughput(self):
+        limit = AdaptiveConcurrency(initial_limit=2, max_limit=8)
+        with FakeCookServer() as server:
+            with JobClient(url=server.url, http_user='foo', http_password='secret', batch_request_size=1,
+                           max_concurrency=8, rate_limiter=RateLimiter({'/rawscheduler': 1000}),
+                           concurrency_limit=limit) as client:
+                uuids = client.submit([{'command': 'echo hello world'} for _ in range(20)])
+                self.assertEquals(len(client.query(uuids)), 20)
+        self.assertGreater(limit.limit, 2)
+        self.assertEquals(limit.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import json
+import unittest
+
+from cook.jobclient import JobClient
+from cook.records import InstanceRecord, JobRecord, Projection
+from cook.testing import FakeCookServer
+
+
+class JobRecordTests(unittest.TestCase):
+    def setUp(self):
+        with open("{}/test_jobs.json".format(os.path.dirname(__file__)), 'r') as f:
+            self._jobs = json.loads(f.read())
+
+    def test_record(self):
+        job = self._jobs[0]
+        record = JobRecord(job)
+        self.assertEquals(record, job)
+        self.assertEquals(record.to_dict(), job)
+        self.assertEquals(record.uuid, job['uuid'])
+        self.assertEquals(record['status'], job['status'])
+        self.assertIsInstance(record.instances[0], InstanceRecord)
+        self.assertEquals(record.instances[-1].status, job['instances'][-1]['status'])
+
+        # the fields which are not slots are decoded on access
+        self.assertEquals(record.env, job['env'])
+        self.assertEquals(record.get('uris'), job['uris'])
+        self.assertIn('env', record)
+
+        self.assertNotIn('unknown', record)
+        self.assertIsNone(record.get('unknown'))
+        with self.assertRaises(KeyError):
+            record['unknown']
+        with self.assertRaises(AttributeError):
+            record.unknown
+
+    def test_projection(self):
+        job = self._jobs[0]
+        job['instances'] = [dict(job['instances'][0], status='failed'), dict(job['instances'][0], status='success')]
+
+        record = JobRecord(job, Projection(['state', 'instances[-1].status']))
+        self.assertEquals(record.to_dict(), {'uuid': job['uuid'], 'status': job['status'], 'state': job['state'],
+                                             'instances': [{'status': 'success'}]})
+        self.assertIsNone(record.get('env'))
+        with self.assertRaises(AttributeError):
+            record.command
+        with self.assertRaises(AttributeError):
+            record.instances[-1].hostname
+
+        record = JobRecord(job, Projection(['instances[0]', 'instances[-1].hostname']))
+        self.assertEquals(len(record.instances), 2)
+        self.assertEquals(record.instances[0], job['instances'][0])
+
+        record = JobRecord(job, Projection(['instances.status']))
+        self.assertEquals([i.to_dict() for i in record.instances], [{'status': 'failed'}, {'status': 'success'}])
+
+        record = JobRecord(dict(job, instances=[]), Projection(['instances[-1].status']))
+        self.assertEquals(record.instances, ())
+
+        with self.assertRaises(ValueError):
+            Projection(['instances[last]'])
+
+    def test_client(self):
+        with FakeCookServer() as server:
+            with JobClient(url=server.url, http_user='foo', http_password='secret', status_update_interval_secs=0.1,
+                           job_fields=['state', 'instances[-1].status']) as client:
+                uuids = client.submit([{'command': 'echo hello world'}])
+                jobs = list(client.wait(uuids, timeout=10))
+                self.assertIsInstance(jobs[0], JobRecord)
+                self.assertEquals(jobs[0].instances[-1].status, 'success')
+                self.assertEquals(client.query(uuids)[0].state, 'success')
+                self.assertEquals(set(client.list('foo', 'success')[0].to_dict()),
+                                  set(['uuid', 'status', 'state', 'instances']))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import unittest
+from email.utils import formatdate
+from mock import patch
+from requests import ConnectionError
+from requests.exceptions import ChunkedEncodingError
+
+from cook.exceptions import CircuitOpenError, JobClientError
+from cook.jobclient import JobClient
+from cook.metrics import MetricsCollector
+from cook.retry import CircuitBreaker, RetryPolicy, parse_retry_after
+
+from .helpers import mock_response
+
+
+class RetryTests(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsCollector()
+        self.client = JobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                                retry_policy=RetryPolicy(max_retries=2, backoff_secs=1),
+                                circuit_breaker=CircuitBreaker(failure_threshold=3, reset_timeout_secs=30),
+                                instrumentation=self.metrics)
+
+    def test_policy(self):
+        policy = RetryPolicy(backoff_secs=1, max_backoff_secs=3)
+        for attempt in range(1, 5):
+            self.assertTrue(0 <= policy.delay(attempt) <= min(2 ** (attempt - 1), 3))
+        self.assertEquals(policy.delay(1, '2'), 2)
+        self.assertEquals(policy.delay(1, '120'), 3)
+
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after('soon'))
+        with patch('cook.retry.time.time', return_value=1000):
+            self.assertEquals(parse_retry_after(formatdate(1030, usegmt=True)), 30)
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout_secs=10)
+        with patch('cook.retry.time.time', return_value=100):
+            breaker.record_failure()
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+            self.assertTrue(breaker.is_open())
+            self.assertFalse(breaker.allow())
+
+        with patch('cook.retry.time.time', return_value=111):
+            # a single trial request once the timeout expired
+            self.assertFalse(breaker.is_open())
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())
+            breaker.record_failure()
+            self.assertFalse(breaker.allow())
+
+        with patch('cook.retry.time.time', return_value=122):
+            self.assertTrue(breaker.allow())
+            breaker.record_success()
+            self.assertTrue(breaker.allow())
+            self.assertTrue(breaker.allow())
+
+        # a trial whose outcome is never recorded is given up on
+        with patch('cook.retry.time.time', return_value=190):
+            breaker.record_failure()
+            breaker.record_failure()
+        with patch('cook.retry.time.time', return_value=200):
+            self.assertTrue(breaker.allow())
+        with patch('cook.retry.time.time', return_value=205):
+            self.assertFalse(breaker.allow())
+        with patch('cook.retry.time.time', return_value=211):
+            self.assertTrue(breaker.allow())
+
+    @patch('cook.jobclient.time.sleep')
+    @patch('requests.Session.get')
+    def test_retry_transient_failures(self, mock_get, mock_sleep):
+        jobs = [{'uuid': '2413bf75-1587-4a69-82e2-63cc4b0d656d'}]
+        mock_get.side_effect = [ConnectionError(), mock_response(503, headers={'Retry-After': '5'}),
+                                mock_response(200, jobs)]
+
+        self.assertEquals(self.client.query([jobs[0]['uuid']]), jobs)
+        self.assertEquals(mock_get.call_count, 3)
+        self.assertEquals(mock_sleep.call_args_list[1][0][0], 5)
+        self.assertEquals(self.metrics.snapshot()['series'][('GET', '/rawscheduler')]['retries'], 2)
+
+    @patch('cook.jobclient.time.sleep')
+    @patch('requests.Session.get')
+    def test_retry_gives_up(self, mock_get, mock_sleep):
+        mock_get.return_value = mock_response(503)
+        with self.assertRaises(JobClientError):
+            self.client.query(['2413bf75-1587-4a69-82e2-63cc4b0d656d'])
+        self.assertEquals(mock_get.call_count, 3)
+
+        # the circuit is now open, requests fail without reaching Cook
+        with self.assertRaises(CircuitOpenError):
+            self.client.query(['2413bf75-1587-4a69-82e2-63cc4b0d656d'])
+        self.assertEquals(mock_get.call_count, 3)
+
+    @patch('requests.Session.get')
+    def test_server_errors_open_circuit(self, mock_get):
+        # not retried, server errors still count as failures
+        client = JobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                           circuit_breaker=CircuitBreaker(failure_threshold=3, reset_timeout_secs=30))
+        mock_get.return_value = mock_response(500)
+        for _ in range(3):
+            with self.assertRaises(JobClientError):
+                client.query(['2413bf75-1587-4a69-82e2-63cc4b0d656d'])
+        with self.assertRaises(CircuitOpenError):
+            client.query(['2413bf75-1587-4a69-82e2-63cc4b0d656d'])
+        self.assertEquals(mock_get.call_count, 3)
+
+        # client errors do not
+        client = JobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                           circuit_breaker=CircuitBreaker(failure_threshold=3, reset_timeout_secs=30))
+        mock_get.return_value = mock_response(404)
+        for _ in range(4):
+            with self.assertRaises(JobClientError):
+                client.query(['2413bf75-1587-4a69-82e2-63cc4b0d656d'])
+        self.assertEquals(mock_get.call_count, 7)
+
+    @patch('requests.Session.get')
+    def test_other_errors_open_circuit(self, mock_get):
+        client = JobClient(url='http://localhost:12310', http_user='foo', http_password='secret',
+                           circuit_breaker=CircuitBreaker(failure_threshold=1, reset_timeout_secs=30))
+        mock_get.side_effect = ChunkedEncodingError()
+        with self.assertRaises(ChunkedEncodingError):
+            client.query(['2413bf75-1587-4a69-82e2-63cc4b0d656d'])
+        with self.assertRaises(CircuitOpenError):
+            client.query(['2413bf75-1587-4a69-82e2-63cc4b0d656d'])
+        self.assertEquals(mock_get.call_count, 1)
+
+    @patch('cook.jobclient.time.sleep')
+    @patch('requests.Session.get')
+    def test_no_retry(self, mock_get, mock_sleep):
+        mock_get.return_value = mock_response(404)
+        with self.assertRaises(JobClientError):
+            self.client.query(['2413bf75-1587-4a69-82e2-63cc4b0d656d'])
+        self.assertEquals(mock_get.call_count, 1)
+        self.assertFalse(mock_sleep.called)
+
+        # retries are disabled by default
+        client = JobClient(url='http://localhost:12310', http_user='foo', http_password='secret')
+        mock_get.side_effect = ConnectionError()
+        with self.assertRaises(ConnectionError):
+            client.query(['2413bf75-1587-4a69-82e2-63cc4b0d656d'])
+        self.assertEquals(mock_get.call_count, 2)
+
+    @patch('cook.jobclient.time.sleep')
+    @patch('requests.Session.post')
+    def test_submit_conflict_after_retry(self, mock_post, mock_sleep):
+        # the first attempt got the jobs in before failing
+        mock_post.side_effect = [ConnectionError(), mock_response(409)]
+        uuids = self.client.submit([{'command': 'echo hello world'}])
+        self.assertEquals(len(uuids), 1)
+        self.assertEquals(mock_post.call_count, 2)
+
+        # a conflict on the first attempt is a genuine error
+        mock_post.side_effect = [mock_response(409)]
+        with self.assertRaises(Exception):
+            self.client.submit([{'command': 'echo hello world'}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import threading
+import time
+import unittest
+from mock import patch
+
+from cook.exceptions import JobClientError, JobSubmitError, JobValidationError
+from cook.jobclient import JobClient
+from cook.router import ClusterRouter, LeastLoadedPolicy, ResourcePolicy, WeightedPolicy
+from cook.testing import FakeCookServer
+
+
+class ClusterRouterTests(unittest.TestCase):
+    def setUp(self):
+        self.servers = {'east': FakeCookServer(), 'west': FakeCookServer()}
+        for server in self.servers.values():
+            server.start()
+        self.router = ClusterRouter(dict((name, self._client(server)) for name, server in self.servers.items()))
+
+    def tearDown(self):
+        self.router.close()
+        for server in self.servers.values():
+            server.stop()
+
+    @staticmethod
+    def _client(server):
+        return JobClient(url=server.url, http_user='foo', http_password='secret', status_update_interval_secs=0.1,
+                         status_update_min_interval_secs=0.01)
+
+    @staticmethod
+    def _jobs(n, **kwargs):
+        return [dict(command='echo hello world', **kwargs) for _ in range(n)]
+
+    def _counts(self, method, path):
+        return dict((name, s.get_request_counts().get((method, path), 0)) for name, s in self.servers.items())
+
+    def test_weighted(self):
+        policy = WeightedPolicy({'east': 3, 'west': 1})
+        names = [policy.select(self.router, {}) for _ in range(8)]
+        self.assertEquals(names.count('east'), 6)
+        self.assertEquals(names.count('west'), 2)
+        # smooth round-robin interleaves the clusters
+        self.assertEquals(names[:4].count('west'), 1)
+
+    def test_least_loaded(self):
+        self.servers['east'].job_runtime_secs = 60
+        self.router.clusters['east'].submit(self._jobs(3))
+        policy = LeastLoadedPolicy(user='foo')
+        self.assertEquals([policy.select(self.router, {}) for _ in range(5)],
+                          ['west', 'west', 'west', 'east', 'west'])
+
+    def test_resource(self):
+        policy = ResourcePolicy([('east', 1, 1024), ('west', None, 65536)], 'east')
+        self.assertEquals(policy.select(self.router, {'cpus': 0.5, 'mem': 128}), 'east')
+        self.assertEquals(policy.select(self.router, {'cpus': 16, 'mem': 4096}), 'west')
+        self.assertEquals(policy.select(self.router, {'cpus': 16, 'mem': 131072}), 'east')
+
+    def test_routing(self):
+        uuids = self.router.submit(self._jobs(4))
+        self.assertEquals(len(uuids), 4)
+        self.assertEquals(self._counts('POST', '/rawscheduler'), {'east': 1, 'west': 1})
+        owners = [self.router.owner(uuid) for uuid in uuids]
+        self.assertEquals(sorted(owners), ['east', 'east', 'west', 'west'])
+
+        # queries only reach the owning clusters
+        self.assertEquals([job['uuid'] for job in self.router.query(uuids)], uuids)
+        self.assertEquals(self._counts('GET', '/rawscheduler'), {'east': 1, 'west': 1})
+        self.assertEquals(self.router.query(uuids[:1])[0]['uuid'], uuids[0])
+        self.assertEquals(sum(self._counts('GET', '/rawscheduler').values()), 3)
+
+        self.assertEquals(self.router.retry(uuids, 3), dict((uuid, None) for uuid in uuids))
+        self.assertEquals(self._counts('POST', '/retry'), {'east': 1, 'west': 1})
+
+        done = list(self.router.wait(uuids, timeout=10))
+        self.assertEquals(sorted(job['uuid'] for job in done), sorted(uuids))
+
+        self.router.delete(uuids)
+        self.assertEquals(self._counts('DELETE', '/rawscheduler'), {'east': 1, 'west': 1})
+
+    def test_wait_stop(self):
+        self.servers['west'].job_runtime_secs = 60
+        uuids = self.router.submit(self._jobs(2))
+        waiting = self.router.wait(uuids, timeout=60)
+        self.assertEquals(self.router.owner(next(waiting)['uuid']), 'east')
+        waiting.close()
+
+        # the thread waiting for the west job stops polling
+        threads = [t for t in threading.enumerate() if t.name == 'cook-router-wait-west']
+        for thread in threads:
+            thread.join(5)
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+        polls = self._counts('GET', '/rawscheduler')['west']
+        time.sleep(0.3)
+        self.assertEquals(self._counts('GET', '/rawscheduler')['west'], polls)
+
+    def test_unknown_owner(self):
+        uuids = self.router.clusters['west'].submit(self._jobs(2))
+        self.assertIsNone(self.router.owner(uuids[0]))
+
+        self.assertEquals([job['uuid'] for job in self.router.query(uuids)], uuids)
+        self.assertEquals(self.router.owner(uuids[0]), 'west')
+        self.assertEquals(self._counts('GET', '/rawscheduler'), {'east': 1, 'west': 1})
+
+        with self.assertRaises(JobClientError):
+            self.router.query(['2413bf75-1587-4a69-82e2-63cc4b0d656d'])
+        errors = self.router.retry(uuids + ['2413bf75-1587-4a69-82e2-63cc4b0d656d'], 1)
+        self.assertIsNone(errors[uuids[0]])
+        self.assertIsInstance(errors['2413bf75-1587-4a69-82e2-63cc4b0d656d'], JobClientError)
+
+    def test_submit_failure(self):
+        self.servers['west'].error_rate = 1
+        jobs = self._jobs(4)
+        with self.assertRaises(JobSubmitError) as cm:
+            self.router.submit(jobs)
+        self.assertEquals(len(cm.exception.submitted), 2)
+        self.assertEquals(len(cm.exception.failed), 2)
+        self.assertTrue(all(self.router.owner(uuid) == 'east' for uuid in cm.exception.submitted))
+
+        # any error of a cluster still reports what the other clusters accepted
+        self.servers['west'].error_rate = 0
+        with patch.object(self.router.clusters['west'], 'submit', side_effect=ValueError('boom')):
+            with self.assertRaises(JobSubmitError) as cm:
+                self.router.submit(self._jobs(4))
+        self.assertEquals(len(cm.exception.submitted), 2)
+        self.assertEquals(len(cm.exception.failed), 2)
+        self.assertTrue(all(self.router.owner(uuid) == 'east' for uuid in cm.exception.submitted))
+
+    def test_submit_invalid(self):
+        jobs = self._jobs(4)
+        jobs[3]['cpus'] = 0
+        with self.assertRaises(JobValidationError) as cm:
+            self.router.submit(jobs)
+        self.assertEquals(list(cm.exception.job_errors), [3])
+        self.assertEquals(self._counts('POST', '/rawscheduler'), {'east': 0, 'west': 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
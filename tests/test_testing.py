@@ -0,0 +1,77 @@
+import unittest
+from datetime import datetime, timedelta
+
+from cook.jobclient import JobClient, JobClientError
+from cook.testing import FakeCookServer
+
+
+class FakeCookServerTests(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeCookServer(job_runtime_secs=0.2, seed=42)
+        self.server.start()
+        self.client = JobClient(url=self.server.url, http_user='foo', http_password='secret', batch_request_size=4,
+                                max_concurrency=4, status_update_interval_secs=0.1,
+                                status_update_min_interval_secs=0.05)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_lifecycle(self):
+        uuids = self.client.submit([{'command': 'echo hello world'} for _ in range(10)])
+
+        jobs = self.client.query(uuids)
+        self.assertEquals([job['uuid'] for job in jobs], uuids)
+        self.assertTrue(all(job['status'] == 'running' and job['user'] == 'foo' for job in jobs))
+
+        done, pending = self.client.wait_all(uuids, timeout=5)
+        self.assertEquals(pending, set())
+        self.assertTrue(all(job['state'] == 'success' for job in done))
+        self.assertEquals(self.server.get_request_counts()[('POST', '/rawscheduler')], 1)
+
+        # unknown jobs and duplicated submissions are rejected
+        with self.assertRaises(JobClientError):
+            self.client.query(['2413bf75-1587-4a69-82e2-63cc4b0d656d'])
+        with self.assertRaises(JobClientError):
+            self.client.submit([{'uuid': uuids[0]}])
+
+    def test_delete_retry(self):
+        self.server.job_runtime_secs = 60
+        uuids = self.client.submit([{'command': 'sleep 60'} for _ in range(5)])
+
+        self.client.delete(uuids)
+        jobs = self.client.query(uuids)
+        self.assertTrue(all(job['status'] == 'completed' and job['state'] == 'failed' for job in jobs))
+
+        self.assertEquals(self.client.retry(uuids, retries=3), dict((u, None) for u in uuids))
+        jobs = self.client.query(uuids)
+        self.assertTrue(all(job['status'] == 'running' and job['max_retries'] == 3 for job in jobs))
+
+    def test_list(self):
+        uuids = self.client.submit([{'command': 'echo hello world'} for _ in range(5)])
+
+        start = datetime.utcnow() - timedelta(minutes=1)
+        self.assertEquals([job['uuid'] for job in self.client.list(user='foo', start_time=start)], uuids)
+        self.assertEquals(len(self.client.list(user='foo', state='waiting')), 0)
+        self.assertEquals(len(self.client.list(user='bar')), 0)
+        self.assertEquals(len(self.client.list(user='foo', limit=2)), 2)
+        self.assertEquals(len(self.client.list(user='foo', state=['running', 'completed'])), 5)
+
+        # a raw + decodes to a space, as with Cook
+        with self.assertRaises(JobClientError):
+            self.client.list(user='foo', state='running+waiting')
+
+    def test_failures(self):
+        self.server.error_rate = 1
+        with self.assertRaises(JobClientError):
+            self.client.submit([{'command': 'echo hello world'}])
+
+        self.server.error_rate = 0
+        self.server.failure_rate = 1
+        uuids = self.client.submit([{'command': 'echo hello world'}])
+        done, _ = self.client.wait_all(uuids, timeout=5)
+        self.assertEquals(done[0]['state'], 'failed')
+
+
+if __name__ == "__main__":
+    unittest.main()
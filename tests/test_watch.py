@@ -0,0 +1,57 @@
+import unittest
+
+from cook.jobclient import JobClient
+from cook.testing import FakeCookServer
+from cook.watch import Change, JobTracker
+
+
+class JobTrackerTests(unittest.TestCase):
+    @staticmethod
+    def _job(status, state, instances=()):
+        return {'uuid': '2413bf75-1587-4a69-82e2-63cc4b0d656d', 'status': status, 'state': state, 'env': {},
+                'instances': [{'task_id': t, 'status': s, 'hostname': h} for t, s, h in instances]}
+
+    def test_update(self):
+        tracker = JobTracker()
+        change = tracker.update(self._job('waiting', 'waiting'))
+        self.assertEquals(change.uuid, '2413bf75-1587-4a69-82e2-63cc4b0d656d')
+        self.assertEquals(change.changes, [Change('status', None, None, 'waiting'),
+                                           Change('state', None, None, 'waiting')])
+        self.assertIsNone(tracker.update(self._job('waiting', 'waiting')))
+
+        change = tracker.update(self._job('running', 'running', [('t1', 'running', 'host1')]))
+        self.assertEquals(change.changes, [Change('status', None, 'waiting', 'running'),
+                                           Change('state', None, 'waiting', 'running'),
+                                           Change('instance', 't1', None, 'running')])
+
+        change = tracker.update(self._job('running', 'running', [('t1', 'failed', 'host1'), ('t2', 'running', 'h2')]))
+        self.assertEquals(change.changes, [Change('instance_status', 't1', 'running', 'failed'),
+                                           Change('instance', 't2', None, 'running')])
+
+        change = tracker.update(self._job('running', 'running', [('t1', 'failed', 'host1'), ('t2', 'running', 'h3')]))
+        self.assertEquals(change.changes, [Change('hostname', 't2', 'h2', 'h3')])
+
+        # other fields are not tracked
+        job = self._job('running', 'running', [('t1', 'failed', 'host1'), ('t2', 'running', 'h3')])
+        job['env'] = {'FOO': 'bar'}
+        self.assertIsNone(tracker.update(job))
+
+        tracker.forget([job['uuid']])
+        self.assertEquals(len(tracker.update(job).changes), 4)
+
+    def test_watch(self):
+        with FakeCookServer(scheduling_delay_secs=0.2, job_runtime_secs=0.2) as server:
+            with JobClient(url=server.url, http_user='foo', http_password='secret', status_update_interval_secs=0.05,
+                           status_update_min_interval_secs=0.05) as client:
+                uuids = client.submit([{'command': 'echo hello world'}])
+                changes = list(client.watch(uuids, timeout=10))
+
+        statuses = [c.new for change in changes for c in change.changes if c.field == 'status']
+        self.assertEquals(statuses, ['waiting', 'running', 'completed'])
+        self.assertTrue(all(change.uuid == uuids[0] for change in changes))
+        self.assertEquals(changes[-1].job['state'], 'success')
+        self.assertEquals(len(changes), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()